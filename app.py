@@ -1,61 +1,2213 @@
 import os
 import re
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
 import threading
-import requests
-from PIL import Image, ImageTk
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from io import BytesIO
 import tempfile
 import time
 import shutil
+import subprocess
+import array
+import random
 import configparser
-import yt_dlp
 import html
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3, APIC, TIT2, TPE1, TALB, TDRC, TCON, USLT, TRCK
-import musicbrainzngs
 import argparse
+import glob
 import sys
 import json
-from rich.console import Console
-from rich.table import Table
-from rich.progress import Progress, TaskID
+import hashlib
+import hmac
+import secrets
+import functools
+import contextlib
+import heapq
+import itertools
+import atexit
+from collections import OrderedDict, Counter
+import sqlite3
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
-class ArtworkSelectorDialog(tk.Toplevel):
+# Heavy third-party packages (yt_dlp, requests, musicbrainzngs, mutagen, PIL, rich) are imported
+# inside the functions that use them so each CLI command only pays for what it touches, and the
+# GUI toolkit is only loaded by _load_gui_modules() when the window is opened.
+
+def _load_gui_modules():
+    """Import tkinter and the other GUI-only modules into the module namespace"""
+    global asyncio, tk, ttk, filedialog, messagebox, Image, ImageTk
+    import asyncio
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+    from PIL import Image, ImageTk
+
+# Default (connect, read) timeouts in seconds; overridable in the [Network] config section
+HTTP_TIMEOUT = (5, 20)
+HTTP_RETRIES = 3
+HTTP_POOL_SIZE = 16
+
+_http_session = None
+_http_session_config = None
+_http_session_lock = threading.Lock()
+
+def _build_http_session(config=None):
+    """Build a pooled HTTP session from the [Network] config section"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    class TimeoutSession(requests.Session):
+        """requests.Session that applies default connect/read timeouts to every request"""
+        
+        def __init__(self, timeout):
+            super().__init__()
+            self.timeout = timeout
+        
+        def request(self, method, url, **kwargs):
+            kwargs.setdefault('timeout', self.timeout)
+            return super().request(method, url, **kwargs)
+    
+    timeout = HTTP_TIMEOUT
+    retries = HTTP_RETRIES
+    pool_size = HTTP_POOL_SIZE
+    if config is not None and 'Network' in config:
+        section = config['Network']
+        try:
+            timeout = (float(section.get('connect_timeout', timeout[0])), float(section.get('read_timeout', timeout[1])))
+            retries = int(section.get('retries', retries))
+            pool_size = int(section.get('pool_size', pool_size))
+        except ValueError as e:
+            print(f"Invalid network settings: {e}")
+    
+    retry_args = {
+        'total': retries,
+        'backoff_factor': 0.5,
+        'status_forcelist': (429, 500, 502, 503, 504),
+        'allowed_methods': frozenset(['GET', 'HEAD']),
+        'respect_retry_after_header': True,
+        'raise_on_status': False,
+    }
+    try:
+        retry = Retry(backoff_jitter=0.5, **retry_args)
+    except TypeError:
+        # urllib3 < 2 has no jitter support
+        retry = Retry(**retry_args)
+    
+    # urllib3 keeps one connection pool per host, so each API gets its own keep-alive connections
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = TimeoutSession(timeout)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = "MusicLibraryExtender/1.0.0 ( https://github.com/TheBeaconCrafter/MusicLibraryExtender )"
+    return session
+
+def configure_http_session(config=None):
+    """Use the given config for the shared HTTP session, which is built on first use"""
+    global _http_session, _http_session_config
+    
+    with _http_session_lock:
+        _http_session_config = config
+        _http_session = None
+
+def get_http_session():
+    """Return the process-wide pooled HTTP session"""
+    global _http_session
+    
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = _build_http_session(_http_session_config)
+        return _http_session
+
+def _fsync_directory(path):
+    """Flush a directory entry to disk so a rename survives a crash (no-op where unsupported)"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def move_into_place(src, dest):
+    """Atomically move a finished file to dest
+    
+    Uses a plain rename when both paths are on the same filesystem. Otherwise the
+    file is copied once into a hidden temp file next to dest, which is then renamed.
+    Data is fsynced before the rename so a half-written file never appears at dest.
+    """
+    dest_dir = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(dest_dir, exist_ok=True)
+    
+    if os.stat(src).st_dev == os.stat(dest_dir).st_dev:
+        with open(src, 'r+b') as f:
+            os.fsync(f.fileno())
+        os.replace(src, dest)
+    else:
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".part", dir=dest_dir)
+        os.close(fd)
+        try:
+            shutil.copy2(src, temp_path)
+            with open(temp_path, 'r+b') as f:
+                os.fsync(f.fileno())
+            os.replace(temp_path, dest)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        os.remove(src)
+    
+    _fsync_directory(dest_dir)
+
+# Free space reserved after the ID3 tag so later edits (e.g. re-tagging) fit without rewriting the audio
+ID3_PADDING = 16 * 1024
+ID3_MAX_PADDING = 256 * 1024
+
+def _id3_padding(info):
+    """mutagen padding policy: reuse the existing tag space when it fits, else reserve ID3_PADDING"""
+    if 0 <= info.padding <= ID3_MAX_PADDING:
+        return info.padding
+    return ID3_PADDING
+
+def save_id3_tags(tags, file_path, v1=0):
+    """Write an in-memory ID3 tag over the file's existing tags in a single pass
+    
+    Any previous ID3v2 tag is replaced and by default a trailing ID3v1 tag is dropped,
+    which matches what MP3.delete() followed by a fresh save used to do. Pass v1=1 to
+    keep (and update) an existing ID3v1 tag instead.
+    """
+    tags.save(file_path, v1=v1, padding=_id3_padding)
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response served from the HTTP cache"""
+    
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = True
+    
+    @property
+    def text(self):
+        match = re.search(r'charset=([\w-]+)', self.headers.get('Content-Type', ''))
+        return self.content.decode(match.group(1) if match else 'utf-8', errors='replace')
+    
+    def json(self):
+        return json.loads(self.content)
+
+class HTTPCache:
+    """Persistent SQLite cache for metadata, artwork and lyrics lookups"""
+    
+    # Seconds each source stays fresh; overridable with ttl_<source> in the [Cache] config section
+    DEFAULT_TTLS = {
+        'musicbrainz': 7 * 24 * 3600,
+        'coverart': 30 * 24 * 3600,
+        'itunes': 7 * 24 * 3600,
+        'lyrics': 30 * 24 * 3600,
+        'thumbnail': 7 * 24 * 3600,
+        'default': 24 * 3600,
+    }
+    DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+    
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE, ttls=None):
+        self.path = path
+        self.max_size = max_size
+        self.ttls = dict(self.DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    
+    @staticmethod
+    def make_key(method, url, params=None, extra=None):
+        """Build a stable key from the normalized request"""
+        parts = urlsplit(url)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        if params:
+            query.extend((str(k), str(v)) for k, v in params.items())
+        normalized_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/',
+                                     urlencode(sorted(query)), ''))
+        
+        key_source = f"{method.upper()} {normalized_url}"
+        if extra:
+            key_source += " " + json.dumps(extra, sort_keys=True, default=str)
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+    
+    def get(self, key, source):
+        """Return the cached entry as (status, headers, content), or None if missing or stale"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, content, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            
+            status, headers, content, created = row
+            if now - created > self.ttls.get(source, self.ttls['default']):
+                self._delete(key)
+                self._conn.commit()
+                return None
+            
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        
+        return status, json.loads(headers), bytes(content)
+    
+    def set(self, key, source, status, headers, content):
+        """Store an entry and evict least recently used entries beyond the size cap"""
+        now = time.time()
+        with self._lock:
+            self._delete(key)
+            self._conn.execute(
+                "INSERT INTO responses (key, source, status, headers, content, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source, status, json.dumps(dict(headers)), sqlite3.Binary(content), len(content), now, now)
+            )
+            self._total_size += len(content)
+            self._evict()
+            self._conn.commit()
+    
+    def _delete(self, key):
+        row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_size -= row[0]
+    
+    def _evict(self):
+        while self._total_size > self.max_size:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                self._total_size = 0
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_size -= size
+                if self._total_size <= self.max_size:
+                    break
+    
+    def clear(self):
+        """Remove every entry, returning how many were deleted"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._total_size = 0
+        return count
+    
+    def stats(self):
+        """Return entry counts and sizes per source"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, COUNT(*), COALESCE(SUM(size), 0) FROM responses GROUP BY source ORDER BY source"
+            ).fetchall()
+        return [{"source": source, "entries": count, "size": size} for source, count, size in rows]
+
+HTTP_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache.sqlite")
+
+_http_cache = None
+_http_cache_settings = {}
+_http_cache_enabled = True
+_http_cache_lock = threading.Lock()
+
+def configure_http_cache(config=None, enabled=True):
+    """Read the [Cache] config section; the cache file itself is only opened on first use"""
+    global _http_cache, _http_cache_settings, _http_cache_enabled
+    
+    settings = {}
+    if config is not None and 'Cache' in config:
+        section = config['Cache']
+        try:
+            max_size_mb = section.get('max_size_mb', HTTPCache.DEFAULT_MAX_SIZE / (1024 * 1024))
+            settings['max_size'] = int(float(max_size_mb) * 1024 * 1024)
+            settings['ttls'] = {source: int(section[f'ttl_{source}']) for source in HTTPCache.DEFAULT_TTLS
+                                if f'ttl_{source}' in section}
+        except ValueError as e:
+            print(f"Invalid cache settings: {e}")
+    
+    with _http_cache_lock:
+        _http_cache_enabled = enabled
+        _http_cache_settings = settings
+        _http_cache = None
+
+def get_http_cache():
+    """Return the shared HTTP cache, opening it on first use, or None when caching is disabled or unavailable"""
+    global _http_cache
+    
+    with _http_cache_lock:
+        if not _http_cache_enabled:
+            return None
+        if _http_cache is None:
+            try:
+                _http_cache = HTTPCache(HTTP_CACHE_FILE, **_http_cache_settings)
+            except Exception as e:
+                print(f"Could not open HTTP cache: {e}")
+        return _http_cache
+
+# Only responses that describe the resource itself are worth keeping
+CACHEABLE_STATUSES = (200, 301, 302, 307, 308, 404)
+
+def cached_request(method, url, source='default', throttle=None, **kwargs):
+    """Perform an HTTP request, serving repeated lookups from the on-disk cache
+    
+    throttle, if given, is called right before a request actually goes out to the network.
+    """
+    cache = get_http_cache()
+    key = HTTPCache.make_key(method, url, kwargs.get('params'))
+    
+    if cache:
+        hit = cache.get(key, source)
+        if hit:
+            status, headers, content = hit
+            return CachedResponse(url, status, headers, content)
+    
+    kwargs.pop('stream', None)
+    if method.upper() == 'HEAD':
+        # Like requests.head(): report a redirect instead of following it
+        kwargs.setdefault('allow_redirects', False)
+    if throttle:
+        throttle()
+    response = get_http_session().request(method, url, **kwargs)
+    
+    if cache and response.status_code in CACHEABLE_STATUSES:
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() in ('content-type', 'location')}
+        try:
+            cache.set(key, source, response.status_code, headers, response.content)
+        except Exception as e:
+            print(f"Could not write HTTP cache entry: {e}")
+    return response
+
+def cached_get(url, source='default', throttle=None, **kwargs):
+    """GET a URL through the on-disk cache"""
+    return cached_request('GET', url, source, throttle, **kwargs)
+
+def cached_head(url, source='default', throttle=None, **kwargs):
+    """HEAD a URL through the on-disk cache"""
+    return cached_request('HEAD', url, source, throttle, **kwargs)
+
+def cached_call(source, name, func, *args, **kwargs):
+    """Call a JSON-returning API function (e.g. musicbrainzngs) through the on-disk cache"""
+    cache = get_http_cache()
+    key = HTTPCache.make_key('CALL', f"call://{source}/{name}", extra=[args, kwargs])
+    
+    if cache:
+        hit = cache.get(key, source)
+        if hit:
+            return json.loads(hit[2])
+    
+    result = func(*args, **kwargs)
+    
+    if cache:
+        try:
+            cache.set(key, source, 200, {}, json.dumps(result).encode('utf-8'))
+        except Exception as e:
+            print(f"Could not write HTTP cache entry: {e}")
+    return result
+
+class SearchCache:
+    """Recent YouTube search result sets, reused for repeat searches and addressable by ID
+    
+    Sets are keyed on the normalized query and the slice of results they cover. Once
+    older than the TTL a set is no longer served for repeat searches, but its ID keeps
+    working for numbered downloads until it falls out of the max_entries most recently used.
+    """
+    
+    DEFAULT_TTL = 6 * 3600
+    DEFAULT_MAX_ENTRIES = 200
+    
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS result_sets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                query TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                results TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS result_sets_key ON result_sets (key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS result_sets_accessed ON result_sets (accessed)")
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(query, start, count):
+        return f"{start}:{count}:{' '.join(query.casefold().split())}"
+    
+    def _touch(self, row):
+        self._conn.execute("UPDATE result_sets SET accessed = ? WHERE id = ?", (time.time(), row[0]))
+        self._conn.commit()
+        return row[0], json.loads(row[1])
+    
+    def lookup(self, query, start, count):
+        """Return (set_id, results) for a fresh set covering this slice, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, results FROM result_sets WHERE key = ? AND created >= ? ORDER BY id DESC LIMIT 1",
+                (self.make_key(query, start, count), time.time() - self.ttl)
+            ).fetchone()
+            return self._touch(row) if row else None
+    
+    def get(self, set_id):
+        """Return (set_id, results) for a stored set, or None if it has been dropped"""
+        with self._lock:
+            row = self._conn.execute("SELECT id, results FROM result_sets WHERE id = ?", (set_id,)).fetchone()
+            return self._touch(row) if row else None
+    
+    def latest(self):
+        """Return (set_id, results) for the set shown most recently, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, results FROM result_sets ORDER BY accessed DESC, id DESC LIMIT 1"
+            ).fetchone()
+            return self._touch(row) if row else None
+    
+    def store(self, query, start, count, results):
+        """Save a result set and return its ID"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO result_sets (key, query, start, count, results, created, accessed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.make_key(query, start, count), query, start, count, json.dumps(results), now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM result_sets WHERE id NOT IN "
+                "(SELECT id FROM result_sets ORDER BY accessed DESC, id DESC LIMIT ?)", (self.max_entries,)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+_search_cache = None
+_search_cache_settings = {}
+_search_cache_lock = threading.Lock()
+
+def configure_search_cache(config=None):
+    """Read the [Search] config section; the cache file itself is only opened on first use"""
+    global _search_cache, _search_cache_settings
+    
+    settings = {}
+    if config is not None and 'Search' in config:
+        section = config['Search']
+        try:
+            settings['ttl'] = int(section.get('cache_ttl', SearchCache.DEFAULT_TTL))
+            settings['max_entries'] = int(section.get('cache_entries', SearchCache.DEFAULT_MAX_ENTRIES))
+        except ValueError as e:
+            print(f"Invalid search cache settings: {e}")
+    
+    with _search_cache_lock:
+        _search_cache_settings = settings
+        _search_cache = None
+
+def get_search_cache():
+    """Return the shared search cache, opening it on first use, or None if it cannot be opened"""
+    global _search_cache
+    
+    with _search_cache_lock:
+        if _search_cache is None:
+            cache_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".search_cache.sqlite")
+            try:
+                _search_cache = SearchCache(cache_file, **_search_cache_settings)
+            except Exception as e:
+                print(f"Could not open search cache: {e}")
+        return _search_cache
+
+# Interactive lookups jump ahead of queued background work in the rate limiters
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out tokens to waiting callers in priority order"""
+    
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._waiters = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+    
+    def acquire(self, priority=PRIORITY_INTERACTIVE):
+        """Block until a token is available and no higher-priority caller is waiting"""
+        with self._condition:
+            ticket = (priority, next(self._counter))
+            heapq.heappush(self._waiters, ticket)
+            
+            while True:
+                self._refill()
+                if self._waiters[0] == ticket and self._tokens >= 1:
+                    heapq.heappop(self._waiters)
+                    self._tokens -= 1
+                    self._condition.notify_all()
+                    return
+                
+                if self._waiters[0] == ticket:
+                    self._condition.wait((1 - self._tokens) / self.rate)
+                else:
+                    self._condition.wait()
+
+class RequestCoalescer:
+    """Runs concurrent identical requests once and hands every caller the same result"""
+    
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+    
+    def run(self, key, func):
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+class MusicBrainzClient:
+    """Process-wide MusicBrainz and Cover Art Archive access with rate limiting and request coalescing"""
+    
+    # MusicBrainz allows one request per second per client; the Cover Art Archive is more lenient
+    MUSICBRAINZ_RATE = 1.0
+    COVERART_RATE = 5.0
+    
+    def __init__(self):
+        self.musicbrainz_bucket = TokenBucket(self.MUSICBRAINZ_RATE)
+        self.coverart_bucket = TokenBucket(self.COVERART_RATE, capacity=5)
+        
+        self._coalescer = RequestCoalescer()
+        self._configured = False
+    
+    def _api(self):
+        """Import and configure musicbrainzngs the first time a lookup needs it"""
+        import musicbrainzngs
+        
+        if not self._configured:
+            musicbrainzngs.set_useragent("MusicLibraryExtender", "1.0.0", "https://github.com/TheBeaconCrafter/MusicLibraryExtender")
+            # Our own bucket replaces musicbrainzngs' global one-call-per-second lock
+            musicbrainzngs.set_rate_limit(False)
+            self._configured = True
+        return musicbrainzngs
+    
+    def _call(self, name, func, priority, *args, **kwargs):
+        def limited(*call_args, **call_kwargs):
+            self.musicbrainz_bucket.acquire(priority)
+            return func(*call_args, **call_kwargs)
+        
+        key = HTTPCache.make_key('CALL', f"call://musicbrainz/{name}", extra=[args, kwargs])
+        return self._coalescer.run(key, lambda: cached_call('musicbrainz', name, limited, *args, **kwargs))
+    
+    def search_recordings(self, query, limit=1, priority=PRIORITY_INTERACTIVE):
+        """Rate-limited, cached musicbrainzngs.search_recordings"""
+        return self._call('search_recordings', self._api().search_recordings, priority, query=query, limit=limit)
+    
+    def get_release_by_id(self, release_id, includes=None, priority=PRIORITY_INTERACTIVE):
+        """Rate-limited, cached musicbrainzngs.get_release_by_id"""
+        return self._call('get_release_by_id', self._api().get_release_by_id, priority,
+                          release_id, includes=includes or [])
+    
+    def coverart_request(self, method, url, priority=PRIORITY_INTERACTIVE):
+        """Rate-limited, cached request to the Cover Art Archive"""
+        key = HTTPCache.make_key(method, url)
+        return self._coalescer.run(key, lambda: cached_request(
+            method, url, 'coverart', throttle=lambda: self.coverart_bucket.acquire(priority)))
+    
+    def coverart_get(self, url, priority=PRIORITY_INTERACTIVE):
+        return self.coverart_request('GET', url, priority)
+    
+    def coverart_head(self, url, priority=PRIORITY_INTERACTIVE):
+        return self.coverart_request('HEAD', url, priority)
+
+_musicbrainz_client = None
+_musicbrainz_client_lock = threading.Lock()
+
+def get_musicbrainz_client():
+    """Return the process-wide MusicBrainz client"""
+    global _musicbrainz_client
+    
+    with _musicbrainz_client_lock:
+        if _musicbrainz_client is None:
+            _musicbrainz_client = MusicBrainzClient()
+        return _musicbrainz_client
+
+class ArtworkStore:
+    """Downloads each artwork URL once and keeps one decoded, size-capped copy in memory
+    
+    Entries are dicts with the decoded 'image' (RGB, at most max_size pixels per side),
+    the embeddable JPEG 'data', the original 'resolution' and 'original_size' in bytes.
+    """
+    
+    DEFAULT_MAX_SIZE = 1000
+    DEFAULT_QUALITY = 90
+    DEFAULT_MEMORY_LIMIT = 128 * 1024 * 1024
+    
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, quality=DEFAULT_QUALITY, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.max_size = max_size
+        self.quality = quality
+        self.memory_limit = memory_limit
+        
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._lock = threading.Lock()
+        self._coalescer = RequestCoalescer()
+    
+    @property
+    def memory_used(self):
+        """Approximate bytes held by decoded images and their JPEG data"""
+        with self._lock:
+            return self._memory
+    
+    def get(self, key):
+        """Return a stored entry without downloading anything"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def fetch(self, url, source='default', fetcher=None):
+        """Return the entry for url, downloading and decoding it only the first time
+        
+        fetcher(url) may be given to route the request (e.g. through the rate-limited
+        Cover Art Archive client). Returns None if the server has no image.
+        """
+        entry = self.get(url)
+        if entry:
+            return entry
+        
+        def download():
+            response = fetcher(url) if fetcher else cached_get(url, source=source)
+            if response.status_code != 200:
+                return None
+            return self.add(url, response.content)
+        
+        return self._coalescer.run(url, download)
+    
+    def add(self, key, data):
+        """Decode image bytes once, normalize them for embedding and store the result"""
+        from PIL import Image
+        
+        img = Image.open(BytesIO(data))
+        image_format = img.format
+        resolution = img.size
+        
+        # JPEG can decode straight to a reduced scale, which is much cheaper than a full decode
+        if image_format == 'JPEG':
+            img.draft('RGB', (self.max_size, self.max_size))
+        img = img.convert('RGB')
+        img.thumbnail((self.max_size, self.max_size), Image.Resampling.LANCZOS)
+        
+        if image_format == 'JPEG' and max(resolution) <= self.max_size:
+            # Already small enough; re-encoding would only lose quality
+            embed_data = data
+        else:
+            buffer = BytesIO()
+            img.save(buffer, 'JPEG', quality=self.quality, optimize=True)
+            embed_data = buffer.getvalue()
+        
+        entry = {
+            'key': key,
+            'image': img,
+            'data': embed_data,
+            'resolution': resolution,
+            'original_size': len(data),
+        }
+        cost = img.width * img.height * 3 + len(embed_data)
+        
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._memory -= old['cost']
+            entry['cost'] = cost
+            self._entries[key] = entry
+            self._memory += cost
+            
+            while self._memory > self.memory_limit and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory -= evicted['cost']
+        
+        return entry
+
+_artwork_store = None
+_artwork_store_lock = threading.Lock()
+
+def configure_artwork_store(config=None):
+    """Create the shared artwork store from the [Artwork] config section"""
+    global _artwork_store
+    
+    max_size = ArtworkStore.DEFAULT_MAX_SIZE
+    quality = ArtworkStore.DEFAULT_QUALITY
+    if config is not None and 'Artwork' in config:
+        section = config['Artwork']
+        try:
+            max_size = int(section.get('max_size', max_size))
+            quality = int(section.get('quality', quality))
+        except ValueError as e:
+            print(f"Invalid artwork settings: {e}")
+    
+    with _artwork_store_lock:
+        _artwork_store = ArtworkStore(max_size=max_size, quality=quality)
+        return _artwork_store
+
+def get_artwork_store():
+    """Return the process-wide artwork store"""
+    global _artwork_store
+    
+    with _artwork_store_lock:
+        if _artwork_store is None:
+            _artwork_store = ArtworkStore()
+        return _artwork_store
+
+class LyricsEngine:
+    """Races lyrics providers in parallel and keeps per-provider latency and hit statistics"""
+    
+    PROVIDER_NAMES = ['genius', 'musixmatch', 'lyricsovh']
+    MIN_LYRICS_LENGTH = 20
+    # Lookups recorded between writes of the stats file; the rest is written at exit
+    SAVE_EVERY = 20
+    
+    def __init__(self, providers, timeout=20, stats_file=None):
+        """providers is a priority-ordered list of (name, func) where func(artist, title) returns (lyrics, source)"""
+        self.providers = providers
+        self.timeout = timeout
+        self.stats_file = stats_file
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(providers)) * 4, thread_name_prefix="lyrics")
+        
+        self._stats_lock = threading.Lock()
+        self._unsaved = 0
+        self.stats = {}
+        if stats_file and os.path.exists(stats_file):
+            try:
+                with open(stats_file, 'r') as f:
+                    self.stats = json.load(f)
+            except Exception as e:
+                print(f"Could not load lyrics stats: {e}")
+        if stats_file:
+            atexit.register(self.flush)
+    
+    @classmethod
+    def from_config(cls, config, available, stats_file=None):
+        """Build an engine using the provider order from the [Lyrics] config section"""
+        names = cls.PROVIDER_NAMES
+        timeout = 20
+        if config is not None and 'Lyrics' in config:
+            section = config['Lyrics']
+            if section.get('providers'):
+                names = [name.strip().lower() for name in section['providers'].split(',') if name.strip()]
+            try:
+                timeout = float(section.get('timeout', timeout))
+            except ValueError as e:
+                print(f"Invalid lyrics timeout: {e}")
+        
+        providers = [(name, available[name]) for name in names if name in available]
+        return cls(providers, timeout=timeout, stats_file=stats_file)
+    
+    def is_acceptable(self, lyrics):
+        """Reject empty or stub results"""
+        return bool(lyrics) and len(lyrics.strip()) >= self.MIN_LYRICS_LENGTH
+    
+    def _run_provider(self, name, func, artist, title):
+        start = time.monotonic()
+        try:
+            lyrics, source = func(artist, title)
+        except Exception as e:
+            print(f"Error fetching lyrics from {name}: {str(e)}")
+            lyrics, source = None, None
+        
+        if not self.is_acceptable(lyrics):
+            lyrics, source = None, None
+        self._record(name, time.monotonic() - start, bool(lyrics))
+        return lyrics, source
+    
+    def _record(self, name, latency, hit):
+        with self._stats_lock:
+            entry = self.stats.setdefault(name, {"requests": 0, "hits": 0, "total_latency": 0.0})
+            entry["requests"] += 1
+            entry["hits"] += int(hit)
+            entry["total_latency"] += latency
+            
+            self._unsaved += 1
+            if self._unsaved >= self.SAVE_EVERY:
+                self._save()
+    
+    def flush(self):
+        """Write statistics recorded since the last save to the stats file"""
+        with self._stats_lock:
+            if self._unsaved:
+                self._save()
+    
+    def _save(self):
+        # Called with the stats lock held. Written next to the stats file and renamed over it,
+        # so a crash mid-write leaves the previous file intact
+        if not self.stats_file:
+            return
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(self.stats_file)))
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self.stats, f)
+                os.replace(temp_path, self.stats_file)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            self._unsaved = 0
+        except Exception as e:
+            print(f"Could not save lyrics stats: {e}")
+    
+    def fetch(self, artist, title):
+        """Return (lyrics, source) from the highest-priority provider that has them"""
+        if not self.providers:
+            return None, None
+        
+        futures = [self.executor.submit(self._run_provider, name, func, artist, title)
+                   for name, func in self.providers]
+        results = [None] * len(futures)
+        
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                results[futures.index(future)] = future.result()
+                
+                # The answer is settled once every higher-priority provider has missed
+                for result in results:
+                    if result is None:
+                        break
+                    if result[0]:
+                        return result
+                else:
+                    return None, None
+        except FuturesTimeoutError:
+            print(f"Lyrics lookup timed out after {self.timeout}s")
+        finally:
+            # Providers still queued are dropped; running ones finish in the background and are ignored
+            for future in futures:
+                future.cancel()
+        
+        for result in results:
+            if result and result[0]:
+                return result
+        return None, None
+    
+    def get_stats(self):
+        """Return a snapshot of per-provider request counts, hit rate and average latency"""
+        enabled = [name for name, _ in self.providers]
+        with self._stats_lock:
+            names = enabled + [name for name in self.stats if name not in enabled]
+            rows = []
+            for name in names:
+                entry = self.stats.get(name, {"requests": 0, "hits": 0, "total_latency": 0.0})
+                requests_made = entry["requests"]
+                rows.append({
+                    "provider": name,
+                    "enabled": name in enabled,
+                    "requests": requests_made,
+                    "hits": entry["hits"],
+                    "hit_rate": entry["hits"] / requests_made if requests_made else 0.0,
+                    "avg_latency": entry["total_latency"] / requests_made if requests_made else 0.0,
+                })
+        return rows
+
+# Owner string MusicBrainz Picard uses for the recording ID in the ID3 UFID frame
+MUSICBRAINZ_UFID_OWNER = "http://musicbrainz.org"
+
+def normalize_name(value):
+    """Normalize an artist or title for duplicate lookups"""
+    value = re.sub(r'\(.*?\)|\[.*?\]', ' ', (value or '').casefold())
+    value = re.sub(r'[^\w]+', ' ', value)
+    return ' '.join(value.split())
+
+def extract_video_id(url):
+    """Return the YouTube video ID from a watch/short/youtu.be URL or a bare ID"""
+    if not url:
+        return None
+    if re.fullmatch(r'[A-Za-z0-9_-]{11}', url):
+        return url
+    match = re.search(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/)([A-Za-z0-9_-]{11})', url)
+    return match.group(1) if match else None
+
+def build_id3_frames(metadata, artwork=None):
+    """Build the ID3 frames for a metadata dict; artwork is the cover as JPEG data"""
+    from mutagen.id3 import APIC, TALB, TCON, TDRC, TIT2, TPE1, TRCK, UFID, USLT, WOAS
+    
+    frames = []
+    
+    # Set title
+    if metadata.get('title'):
+        frames.append(TIT2(encoding=3, text=metadata['title']))
+    
+    # Set artist
+    if metadata.get('artist'):
+        frames.append(TPE1(encoding=3, text=metadata['artist']))
+    
+    # Set album
+    if metadata.get('album'):
+        frames.append(TALB(encoding=3, text=metadata['album']))
+    
+    # Set year
+    if metadata.get('year'):
+        frames.append(TDRC(encoding=3, text=metadata['year']))
+    
+    # Set genre
+    if metadata.get('genre'):
+        frames.append(TCON(encoding=3, text=metadata['genre']))
+        
+    # Set track number
+    if metadata.get('track_number'):
+        frames.append(TRCK(encoding=3, text=metadata['track_number']))
+    
+    # Add lyrics if provided
+    if metadata.get('lyrics'):
+        frames.append(USLT(
+            encoding=3,  # UTF-8
+            lang='eng',  # Language code (English)
+            desc='',     # Description
+            text=metadata['lyrics']
+        ))
+    
+    # Remember where the track came from so the library index can spot it again
+    if metadata.get('source_url'):
+        frames.append(WOAS(url=metadata['source_url']))
+    if metadata.get('recording_id'):
+        frames.append(UFID(owner=MUSICBRAINZ_UFID_OWNER, data=metadata['recording_id'].encode('ascii')))
+    
+    if artwork:
+        frames.append(APIC(
+            encoding=3,  # UTF-8
+            mime='image/jpeg',
+            type=3,  # Cover image
+            desc='Cover',
+            data=artwork
+        ))
+    
+    return frames
+
+def _write_id3_tags(file_path, metadata, artwork, replace=True):
+    from mutagen.id3 import ID3, ID3NoHeaderError
+    
+    # Build the whole tag in memory; saving it replaces any existing tag in one write
+    tags = ID3()
+    if not replace:
+        try:
+            tags = ID3(file_path)
+        except ID3NoHeaderError:
+            pass
+    for frame in build_id3_frames(metadata, artwork):
+        tags.setall(frame.FrameID, [frame])
+    # Only the tag at the start of the file is rewritten, the audio frames are left alone
+    save_id3_tags(tags, file_path, v1=0 if replace else 1)
+
+def _read_id3_tags(file_path):
+    from mutagen.id3 import ID3, ID3NoHeaderError
+    
+    try:
+        tags = ID3(file_path)
+    except ID3NoHeaderError:
+        return {}
+    
+    values = {key: str(tags[frame_id]) for key, frame_id in (('title', 'TIT2'), ('artist', 'TPE1'), ('album', 'TALB'),
+                                                             ('year', 'TDRC'), ('genre', 'TCON'), ('track_number', 'TRCK'))
+              if frame_id in tags}
+    lyrics = next((frame.text for frame in tags.getall('USLT') if frame.text.strip()), None)
+    if lyrics:
+        values['lyrics'] = lyrics
+    values['artwork'] = bool(tags.getall('APIC'))
+    return values
+
+# Freeform MP4 atoms, named the way MusicBrainz Picard and yt-dlp write them
+MP4_RECORDING_ID_KEY = '----:com.apple.iTunes:MusicBrainz Track Id'
+MP4_SOURCE_URL_KEY = '----:com.apple.iTunes:purl'
+
+def _split_track_number(value):
+    """'3' or '3/12' as (3, 12), with 0 for an unknown total"""
+    match = re.match(r'\s*(\d+)(?:\s*/\s*(\d+))?', str(value or ''))
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2) or 0)
+
+# Text atoms for the plain metadata fields
+MP4_ATOMS = (('title', '\xa9nam'), ('artist', '\xa9ART'), ('album', '\xa9alb'),
+             ('year', '\xa9day'), ('genre', '\xa9gen'), ('lyrics', '\xa9lyr'))
+
+def _write_mp4_tags(file_path, metadata, artwork, replace=True):
+    from mutagen.mp4 import MP4, MP4Cover, MP4FreeForm
+    
+    audio = MP4(file_path)
+    if audio.tags is None:
+        audio.add_tags()
+    if replace:
+        audio.tags.clear()
+    
+    for key, atom in MP4_ATOMS:
+        if metadata.get(key):
+            audio.tags[atom] = [str(metadata[key])]
+    track = _split_track_number(metadata.get('track_number'))
+    if track:
+        audio.tags['trkn'] = [track]
+    if metadata.get('source_url'):
+        audio.tags[MP4_SOURCE_URL_KEY] = [MP4FreeForm(metadata['source_url'].encode('utf-8'))]
+    if metadata.get('recording_id'):
+        audio.tags[MP4_RECORDING_ID_KEY] = [MP4FreeForm(metadata['recording_id'].encode('ascii'))]
+    if artwork:
+        audio.tags['covr'] = [MP4Cover(artwork, imageformat=MP4Cover.FORMAT_JPEG)]
+    audio.save()
+
+def _read_mp4_tags(file_path):
+    from mutagen.mp4 import MP4
+    
+    tags = MP4(file_path).tags or {}
+    values = {key: str(tags[atom][0]) for key, atom in MP4_ATOMS if tags.get(atom)}
+    if tags.get('trkn'):
+        number, total = tags['trkn'][0]
+        values['track_number'] = f"{number}/{total}" if total else str(number)
+    values['artwork'] = bool(tags.get('covr'))
+    return values
+
+# Vorbis comment fields, shared by Ogg Opus and FLAC
+VORBIS_FIELDS = (('title', 'TITLE'), ('artist', 'ARTIST'), ('album', 'ALBUM'), ('year', 'DATE'),
+                 ('genre', 'GENRE'), ('track_number', 'TRACKNUMBER'), ('lyrics', 'LYRICS'),
+                 ('source_url', 'PURL'), ('recording_id', 'MUSICBRAINZ_TRACKID'))
+
+def _vorbis_picture(artwork):
+    from mutagen.flac import Picture
+    
+    picture = Picture()
+    picture.type = 3  # Cover image
+    picture.mime = 'image/jpeg'
+    picture.desc = 'Cover'
+    picture.data = artwork
+    return picture
+
+def _write_vorbis_tags(audio, metadata, replace=True):
+    if audio.tags is None:
+        audio.add_tags()
+    if replace:
+        audio.tags.clear()
+    for key, field in VORBIS_FIELDS:
+        if metadata.get(key):
+            audio.tags[field] = [str(metadata[key])]
+
+def _read_vorbis_tags(tags):
+    return {key: tags[field][0] for key, field in VORBIS_FIELDS if tags and tags.get(field)}
+
+def _write_opus_tags(file_path, metadata, artwork, replace=True):
+    import base64
+    from mutagen.oggopus import OggOpus
+    
+    audio = OggOpus(file_path)
+    _write_vorbis_tags(audio, metadata, replace)
+    if artwork:
+        # Ogg has no picture block, so the FLAC picture structure goes into a comment
+        audio.tags['METADATA_BLOCK_PICTURE'] = [base64.b64encode(_vorbis_picture(artwork).write()).decode('ascii')]
+    audio.save()
+
+def _read_opus_tags(file_path):
+    from mutagen.oggopus import OggOpus
+    
+    tags = OggOpus(file_path).tags
+    values = _read_vorbis_tags(tags)
+    values['artwork'] = bool(tags and tags.get('METADATA_BLOCK_PICTURE'))
+    return values
+
+def _write_flac_tags(file_path, metadata, artwork, replace=True):
+    from mutagen.flac import FLAC
+    
+    audio = FLAC(file_path)
+    _write_vorbis_tags(audio, metadata, replace)
+    if replace or artwork:
+        audio.clear_pictures()
+    if artwork:
+        audio.add_picture(_vorbis_picture(artwork))
+    audio.save()
+
+def _read_flac_tags(file_path):
+    from mutagen.flac import FLAC
+    
+    audio = FLAC(file_path)
+    values = _read_vorbis_tags(audio.tags)
+    values['artwork'] = bool(audio.pictures)
+    return values
+
+# Output formats, each named after the file extension yt-dlp gives it. 'source' is the yt-dlp
+# format selection: it prefers a stream already in the target codec, which FFmpegExtractAudio
+# then only remuxes (AAC into M4A, Opus from WebM into Ogg) instead of decoding and re-encoding.
+# 'reader' returns the current text tags by metadata key, plus whether there is artwork.
+AUDIO_FORMATS = {
+    'mp3': {'source': 'bestaudio/best', 'tagger': _write_id3_tags, 'reader': _read_id3_tags},
+    'm4a': {'source': 'bestaudio[acodec^=mp4a]/bestaudio/best', 'tagger': _write_mp4_tags, 'reader': _read_mp4_tags},
+    'opus': {'source': 'bestaudio[acodec=opus]/bestaudio/best', 'tagger': _write_opus_tags, 'reader': _read_opus_tags},
+    'flac': {'source': 'bestaudio/best', 'tagger': _write_flac_tags, 'reader': _read_flac_tags},
+}
+# Quality is a bitrate in kbps, or a VBR level from 0 (best) to 10 for MP3 and AAC, as in yt-dlp's --audio-quality
+DEFAULT_AUDIO_OUTPUT = {'format': 'mp3', 'quality': '192'}
+
+_audio_output = dict(DEFAULT_AUDIO_OUTPUT)
+
+def resolve_audio_output(output_format=None, quality=None, default=None):
+    """Output settings for a format and quality, taking what is not given from the configured defaults"""
+    default = default or _audio_output
+    output_format = (output_format or default['format']).strip().lower()
+    if output_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}' (choose from {', '.join(AUDIO_FORMATS)})")
+    
+    quality = str(quality or default['quality']).strip().lower().removesuffix('k')
+    try:
+        if float(quality) < 0:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"Output quality must be a bitrate in kbps or a VBR level from 0 to 10, not '{quality}'")
+    return {'format': output_format, 'quality': quality}
+
+def configure_audio_output(config=None):
+    """Read the default output format and quality from the [Output] config section"""
+    global _audio_output
+    
+    output = dict(DEFAULT_AUDIO_OUTPUT)
+    if config is not None and 'Output' in config:
+        section = config['Output']
+        try:
+            output = resolve_audio_output(section.get('format'), section.get('quality'), default=output)
+        except ValueError as e:
+            print(f"Invalid output settings: {e}")
+    _audio_output = output
+    return output
+
+def _audio_format(file_path):
+    output_format = os.path.splitext(file_path)[1][1:].lower()
+    if output_format not in AUDIO_FORMATS:
+        raise ValueError(f"Cannot tag .{output_format} files")
+    return AUDIO_FORMATS[output_format]
+
+def write_audio_tags(file_path, metadata, artwork=None, replace=True):
+    """Replace the tags of an audio file with the given metadata, in the tag format of its file type
+    
+    With replace=False only the given fields (and artwork, if any) are set; the other tags are kept.
+    """
+    _audio_format(file_path)['tagger'](file_path, metadata, artwork, replace)
+
+def read_audio_tags(file_path):
+    """The title, artist, album, year, genre, track_number and lyrics tags of an audio file,
+    plus 'artwork' telling whether it has a cover; missing tags are left out"""
+    return _audio_format(file_path)['reader'](file_path)
+
+class YoutubeDLPool:
+    """Configured yt-dlp instances that are borrowed and handed back instead of rebuilt per call
+    
+    Building a YoutubeDL sets up its extractors, HTTP handlers and postprocessors, which adds
+    up over a batch or a long-running job server. Each profile keeps a list of idle instances;
+    a worker borrows one for a single operation, so no instance is ever used by two at once.
+    """
+    
+    PROFILES = {
+        'flat': {'extract_flat': 'in_playlist'},
+        'audio': {'format': 'bestaudio/best', 'continuedl': True},
+    }
+    
+    def __init__(self):
+        self._idle = {profile: [] for profile in self.PROFILES}
+        self._borrowed = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def output_profile(output, convert=False):
+        """Profile that downloads the best source for an output format, and with convert also converts to it"""
+        if convert:
+            return f"audio:{output['format']}:{output['quality']}"
+        return f"audio:{output['format']}"
+    
+    def _params(self, profile):
+        if profile in self.PROFILES:
+            return self.PROFILES[profile]
+        
+        _, output_format, *quality = profile.split(':')
+        params = {'format': AUDIO_FORMATS[output_format]['source'], 'continuedl': True}
+        if quality:
+            params['postprocessors'] = [{'key': 'FFmpegExtractAudio', 'preferredcodec': output_format,
+                                         'preferredquality': quality[0]}]
+        return params
+    
+    def _create(self, profile):
+        import yt_dlp
+        
+        # The instance keeps one progress hook that forwards to whoever has borrowed it
+        hook_slot = [None]
+        def forward_progress(d):
+            if hook_slot[0]:
+                hook_slot[0](d)
+        
+        ydl = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True, 'progress_hooks': [forward_progress],
+                                **self._params(profile)})
+        return ydl, hook_slot, ydl.params['outtmpl']['default']
+    
+    def acquire(self, profile, outtmpl=None, progress_hook=None):
+        """Borrow an instance of a profile, set up with this caller's output template and progress hook"""
+        with self._lock:
+            idle = self._idle.setdefault(profile, [])
+            entry = idle.pop() if idle else None
+        if entry is None:
+            entry = self._create(profile)
+        
+        ydl, hook_slot, default_outtmpl = entry
+        hook_slot[0] = progress_hook
+        ydl.params['outtmpl']['default'] = outtmpl or default_outtmpl
+        with self._lock:
+            self._borrowed[id(ydl)] = (profile, entry)
+        return ydl
+    
+    def release(self, ydl):
+        """Hand a borrowed instance back for reuse"""
+        with self._lock:
+            profile, entry = self._borrowed.pop(id(ydl))
+            entry[1][0] = None
+            self._idle[profile].append(entry)
+    
+    @contextlib.contextmanager
+    def instance(self, profile, outtmpl=None, progress_hook=None):
+        """Borrow an instance for the duration of a with block"""
+        ydl = self.acquire(profile, outtmpl, progress_hook)
+        try:
+            yield ydl
+        finally:
+            self.release(ydl)
+
+_youtubedl_pool = None
+_youtubedl_pool_lock = threading.Lock()
+
+def get_youtubedl_pool():
+    """Return the process-wide pool of yt-dlp instances"""
+    global _youtubedl_pool
+    
+    with _youtubedl_pool_lock:
+        if _youtubedl_pool is None:
+            _youtubedl_pool = YoutubeDLPool()
+        return _youtubedl_pool
+
+def search_entry_to_video(entry):
+    """Turn a flat yt-dlp search entry into the video dict used by the GUI and CLI"""
+    duration_secs = entry.get('duration', 0)
+    duration = time.strftime('%M:%S', time.gmtime(duration_secs)) if duration_secs else 'Unknown'
+    
+    video_url = entry.get('webpage_url')
+    if not video_url and entry.get('id'):
+        video_url = f"https://www.youtube.com/watch?v={entry['id']}"
+    
+    # Flat entries only carry the thumbnail list; the last one is the largest
+    thumbnail = entry.get('thumbnail')
+    if not thumbnail and entry.get('thumbnails'):
+        thumbnail = entry['thumbnails'][-1].get('url')
+    
+    return {
+        "id": entry['id'],
+        "title": entry.get('title', 'Unknown Title'),
+        "channel": entry.get('uploader') or entry.get('channel') or 'Unknown Uploader',
+        "duration": duration,
+        "thumbnail": thumbnail,
+        "webpage_url": video_url
+    }
+
+class YouTubeSearch:
+    """Incremental YouTube search that hands out results as yt-dlp produces them
+    
+    The search is opened without a result count and read lazily, so the first rows
+    arrive after a single API page and asking for more continues from where the
+    previous page stopped instead of running the search again. Read each instance
+    from one thread at a time; close() may be called from any thread.
+    """
+    
+    def __init__(self, query, start=0):
+        self.query = query
+        self.position = start
+        self.exhausted = False
+        self._ydl = None
+        self._entries = None
+        self._lock = threading.Lock()
+        self._reading = False
+        self._closed = False
+    
+    @property
+    def started(self):
+        """Whether yt-dlp has been asked for results yet; until then position can still be moved"""
+        return self._entries is not None
+    
+    def _open(self):
+        # Held until the stream is closed, since yt-dlp's entry generator keeps using it
+        self._ydl = get_youtubedl_pool().acquire('flat')
+        # process=False keeps the entries as yt-dlp's lazy generator instead of resolving them all up front
+        info = self._ydl.extract_info(f"ytsearchall:{self.query}", download=False, process=False)
+        return itertools.islice(iter(info.get('entries') or []), self.position, None)
+    
+    def _next_entry(self):
+        """Read one entry, or None once the stream has ended or been closed"""
+        with self._lock:
+            if self._closed:
+                return None
+            self._reading = True
+        try:
+            if self._entries is None:
+                self._entries = self._open()
+            entry = next(self._entries, None)
+        except BaseException:
+            with self._lock:
+                self._reading = False
+                self._closed = True
+                self._release()
+            raise
+        
+        with self._lock:
+            self._reading = False
+            if self._closed:
+                # close() was called while this read was running and left the release to us
+                self._release()
+                return None
+        return entry
+    
+    def iter_page(self, count):
+        """Yield up to count further results"""
+        if self.exhausted:
+            return
+        
+        produced = 0
+        while produced < count:
+            entry = self._next_entry()
+            if entry is None:
+                self.exhausted = True
+                self.close()
+                return
+            self.position += 1
+            if not entry.get('id'):
+                continue
+            produced += 1
+            yield search_entry_to_video(entry)
+    
+    def page(self, count):
+        """Return the next count results as a list"""
+        return list(self.iter_page(count))
+    
+    def _release(self):
+        if self._entries is not None:
+            self._entries = iter(())
+        if self._ydl:
+            get_youtubedl_pool().release(self._ydl)
+            self._ydl = None
+    
+    def close(self):
+        """Stop reading and hand the yt-dlp instance back to the pool, at once or when a running read returns"""
+        with self._lock:
+            self._closed = True
+            if not self._reading:
+                self._release()
+
+# Audio fingerprints in the style of Haitsma & Kalker: ffmpeg splits the first two minutes
+# into log-spaced bands between 300 and 2000 Hz and reports their smoothed energy ten times
+# a second. Each frame becomes 32 bits recording whether the energy difference between
+# neighbouring bands rose or fell since the previous frame, which survives re-encoding.
+FINGERPRINT_SECONDS = 120
+FINGERPRINT_RATE = 10
+FINGERPRINT_BANDS = 33
+FINGERPRINT_SAMPLE_RATE = 5512
+FINGERPRINT_LOW, FINGERPRINT_HIGH = 300, 2000
+# Heavy smoothing keeps the bits stable when two copies are offset by a fraction of a frame
+FINGERPRINT_SMOOTHING = 0.5
+# Unrelated tracks differ in about half of their bits; copies of one recording in a few percent
+FINGERPRINT_MAX_BIT_ERROR = 0.3
+FINGERPRINT_MIN_OVERLAP = 20 * FINGERPRINT_RATE
+
+# MinHash signatures over the set of frame values; copies share a few hundred exact values,
+# so every single hash is its own LSH band and any collision makes a candidate pair
+MINHASH_PRIME = (1 << 61) - 1
+_minhash_rng = random.Random(0x5EED)
+MINHASH_PARAMS = [(_minhash_rng.randrange(1, MINHASH_PRIME), _minhash_rng.randrange(MINHASH_PRIME)) for _ in range(24)]
+MINHASH_MIN_VALUES = 50
+
+def _fingerprint_filter():
+    """ffmpeg filter graph that outputs one band after another as smoothed energy envelopes"""
+    ratio = FINGERPRINT_HIGH / FINGERPRINT_LOW
+    edges = [FINGERPRINT_LOW * ratio ** (i / FINGERPRINT_BANDS) for i in range(FINGERPRINT_BANDS + 1)]
+    
+    chains = [f"[0:a]aformat=channel_layouts=mono,aresample={FINGERPRINT_SAMPLE_RATE},asplit={FINGERPRINT_BANDS}"
+              + "".join(f"[s{i}]" for i in range(FINGERPRINT_BANDS))]
+    for i in range(FINGERPRINT_BANDS):
+        low, high = edges[i], edges[i + 1]
+        chains.append(f"[s{i}]bandpass=f={(low * high) ** 0.5:.1f}:width_type=h:w={high - low:.1f},"
+                      f"aeval=val(0)*val(0):c=same,lowpass=f={FINGERPRINT_SMOOTHING},aresample={FINGERPRINT_RATE}[b{i}]")
+    chains.append("".join(f"[b{i}]" for i in range(FINGERPRINT_BANDS)) + f"concat=n={FINGERPRINT_BANDS}:v=0:a=1")
+    return ";".join(chains)
+
+def compute_fingerprint(path):
+    """Decode an audio file with ffmpeg and return its fingerprint as an array of 32-bit frames"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        raise RuntimeError("FFmpeg is required for fingerprinting")
+    
+    result = subprocess.run(
+        [ffmpeg, '-nostdin', '-v', 'error', '-t', str(FINGERPRINT_SECONDS), '-i', path,
+         '-filter_complex', _fingerprint_filter(), '-f', 'f32le', '-'],
+        capture_output=True
+    )
+    if result.returncode != 0:
+        message = result.stderr.decode(errors='replace').strip().splitlines()
+        raise RuntimeError(message[-1] if message else f"ffmpeg exited with {result.returncode}")
+    
+    energies = array.array('f')
+    energies.frombytes(result.stdout[:len(result.stdout) // 4 * 4])
+    if sys.byteorder == 'big':
+        energies.byteswap()
+    
+    frames = len(energies) // FINGERPRINT_BANDS
+    bands = [energies[b * frames:(b + 1) * frames] for b in range(FINGERPRINT_BANDS)]
+    fingerprint = array.array('I')
+    previous = None
+    for n in range(frames):
+        differences = [bands[m][n] - bands[m + 1][n] for m in range(FINGERPRINT_BANDS - 1)]
+        if previous is not None:
+            value = 0
+            for m, (current, last) in enumerate(zip(differences, previous)):
+                if current > last:
+                    value |= 1 << m
+            fingerprint.append(value)
+        previous = differences
+    return fingerprint
+
+def fingerprint_minhash(fingerprint):
+    """MinHash signature of a fingerprint's frame values, or None for silence and very short files"""
+    # Near-constant frames come from silence and match everything
+    values = {value for value in fingerprint if 3 <= bin(value).count('1') <= 29}
+    if len(values) < MINHASH_MIN_VALUES:
+        return None
+    return array.array('Q', (min((a * value + b) % MINHASH_PRIME for value in values) for a, b in MINHASH_PARAMS))
+
+def compare_fingerprints(first, second):
+    """Return (bit error rate, offset in frames) of the best alignment of two fingerprints, or None"""
+    positions = {}
+    for i, value in enumerate(first):
+        positions.setdefault(value, []).append(i)
+    
+    # Frames that match exactly vote for the offset between the two files
+    votes = Counter()
+    for j, value in enumerate(second):
+        matches = positions.get(value, ())
+        if len(matches) <= 10:
+            for i in matches:
+                votes[j - i] += 1
+    
+    min_overlap = min(FINGERPRINT_MIN_OVERLAP, len(first) // 2, len(second) // 2)
+    best = None
+    for offset, _ in votes.most_common(3):
+        start, end = max(0, -offset), min(len(first), len(second) - offset)
+        if end - start < max(1, min_overlap):
+            continue
+        errors = sum(bin(first[i] ^ second[i + offset]).count('1') for i in range(start, end))
+        rate = errors / ((end - start) * 32)
+        if best is None or rate < best[0]:
+            best = (rate, offset)
+    return best
+
+class LibraryIndex:
+    """SQLite index of the tracks in a library folder, kept next to the music itself"""
+    
+    INDEX_FILENAME = ".library_index.sqlite"
+    AUDIO_EXTENSIONS = tuple(f'.{output_format}' for output_format in AUDIO_FORMATS)
+    COLUMNS = ("path", "size", "mtime", "video_id", "artist", "title", "recording_id",
+               "album", "year", "genre", "track", "has_lyrics", "has_artwork")
+    # Changed files are read on a process pool once there are enough of them to pay for starting it
+    PARALLEL_THRESHOLD = 200
+    WRITE_BATCH = 500
+    
+    def __init__(self, library_path):
+        self.library_path = os.path.abspath(library_path)
+        self.index_file = os.path.join(self.library_path, self.INDEX_FILENAME)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.index_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tracks (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                video_id TEXT,
+                artist TEXT,
+                title TEXT,
+                recording_id TEXT,
+                album TEXT,
+                year TEXT,
+                genre TEXT,
+                track TEXT,
+                has_lyrics INTEGER NOT NULL DEFAULT 0,
+                has_artwork INTEGER NOT NULL DEFAULT 0,
+                fingerprint BLOB,
+                minhash BLOB
+            )
+        """)
+        self._upgrade_schema()
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tracks_video_id ON tracks (video_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tracks_artist_title ON tracks (artist, title)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tracks_recording_id ON tracks (recording_id)")
+        self._conn.commit()
+    
+    def _upgrade_schema(self):
+        """Add columns missing from indexes written by older versions"""
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(tracks)")}
+        reread = False
+        for column, definition, from_tags in (("album", "TEXT", True), ("year", "TEXT", True),
+                                              ("genre", "TEXT", True), ("track", "TEXT", True),
+                                              ("has_lyrics", "INTEGER NOT NULL DEFAULT 0", True),
+                                              ("has_artwork", "INTEGER NOT NULL DEFAULT 0", True),
+                                              ("fingerprint", "BLOB", False), ("minhash", "BLOB", False)):
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE tracks ADD COLUMN {column} {definition}")
+                reread = reread or from_tags
+        if reread:
+            # Force the next refresh to re-read every file for the new columns
+            self._conn.execute("UPDATE tracks SET mtime = -1")
+    
+    def _relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self.library_path)
+    
+    def _absolute(self, relative_path):
+        return os.path.join(self.library_path, relative_path)
+    
+    @staticmethod
+    def read_file_info(path):
+        """Read the tags of an audio file that the index keeps (runs in worker processes)"""
+        info = {"artist": None, "title": None, "video_id": None, "recording_id": None, "album": None,
+                "year": None, "genre": None, "track": None, "has_lyrics": False, "has_artwork": False}
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.m4a':
+            return LibraryIndex._read_mp4_info(path, info)
+        if extension in ('.opus', '.flac'):
+            return LibraryIndex._read_vorbis_info(path, info)
+        return LibraryIndex._read_id3_info(path, info)
+    
+    @staticmethod
+    def _read_id3_info(path, info):
+        from mutagen.id3 import ID3, ID3NoHeaderError
+        
+        try:
+            tags = ID3(path)
+        except ID3NoHeaderError:
+            return info
+        
+        if 'TPE1' in tags:
+            info["artist"] = normalize_name(str(tags['TPE1']))
+        if 'TIT2' in tags:
+            info["title"] = normalize_name(str(tags['TIT2']))
+        if 'TALB' in tags:
+            info["album"] = str(tags['TALB'])
+        if 'TDRC' in tags:
+            info["year"] = str(tags['TDRC'])[:4]
+        if 'TCON' in tags:
+            info["genre"] = str(tags['TCON'])
+        if 'TRCK' in tags:
+            info["track"] = str(tags['TRCK'])
+        for frame in tags.getall('WOAS'):
+            info["video_id"] = extract_video_id(frame.url) or info["video_id"]
+        ufid = tags.get(f'UFID:{MUSICBRAINZ_UFID_OWNER}')
+        if ufid:
+            info["recording_id"] = ufid.data.decode('ascii', errors='ignore')
+        info["has_lyrics"] = any(frame.text.strip() for frame in tags.getall('USLT'))
+        info["has_artwork"] = bool(tags.getall('APIC'))
+        return info
+    
+    @staticmethod
+    def _read_mp4_info(path, info):
+        from mutagen.mp4 import MP4
+        
+        tags = MP4(path).tags
+        if tags is None:
+            return info
+        
+        def text(key):
+            values = tags.get(key)
+            if not values:
+                return None
+            value = values[0]
+            return bytes(value).decode('utf-8', errors='ignore') if isinstance(value, bytes) else str(value)
+        
+        info["artist"] = normalize_name(text('\xa9ART')) or None
+        info["title"] = normalize_name(text('\xa9nam')) or None
+        info["album"] = text('\xa9alb')
+        info["year"] = (text('\xa9day') or '')[:4] or None
+        info["genre"] = text('\xa9gen')
+        if tags.get('trkn'):
+            number, total = tags['trkn'][0]
+            info["track"] = f"{number}/{total}" if total else str(number)
+        info["video_id"] = extract_video_id(text(MP4_SOURCE_URL_KEY))
+        info["recording_id"] = text(MP4_RECORDING_ID_KEY)
+        info["has_lyrics"] = bool((text('\xa9lyr') or '').strip())
+        info["has_artwork"] = bool(tags.get('covr'))
+        return info
+    
+    @staticmethod
+    def _read_vorbis_info(path, info):
+        import mutagen
+        
+        audio = mutagen.File(path)
+        tags = audio.tags if audio is not None else None
+        if not tags:
+            return info
+        
+        def text(field):
+            values = tags.get(field)
+            return values[0] if values else None
+        
+        info["artist"] = normalize_name(text('ARTIST')) or None
+        info["title"] = normalize_name(text('TITLE')) or None
+        info["album"] = text('ALBUM')
+        info["year"] = (text('DATE') or '')[:4] or None
+        info["genre"] = text('GENRE')
+        info["track"] = text('TRACKNUMBER')
+        info["video_id"] = extract_video_id(text('PURL'))
+        info["recording_id"] = text('MUSICBRAINZ_TRACKID')
+        info["has_lyrics"] = bool((text('LYRICS') or '').strip())
+        info["has_artwork"] = bool(getattr(audio, 'pictures', None) or 'METADATA_BLOCK_PICTURE' in tags)
+        return info
+    
+    @classmethod
+    def _read_file_info_safe(cls, path):
+        try:
+            return path, cls.read_file_info(path), None
+        except Exception as e:
+            return path, None, str(e)
+    
+    def _iter_audio_files(self, directory=None):
+        """Yield (path, stat) for every audio file, skipping hidden files and folders"""
+        try:
+            entries = list(os.scandir(directory or self.library_path))
+        except OSError:
+            return
+        for entry in entries:
+            # Skip hidden entries such as in-progress temp dirs and the index itself
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._iter_audio_files(entry.path)
+                elif entry.name.lower().endswith(self.AUDIO_EXTENSIONS):
+                    yield entry.path, entry.stat()
+            except OSError:
+                continue
+    
+    def refresh(self, workers=None, progress_callback=None):
+        """Bring the index up to date, re-reading only files whose size or mtime changed
+        
+        Tags of changed files are read on a process pool when there are many of them;
+        progress_callback(done, total) is called as they are read.
+        """
+        with self._lock:
+            known = {path: (size, mtime) for path, size, mtime in
+                     self._conn.execute("SELECT path, size, mtime FROM tracks")}
+        
+        counts = {"updated": 0, "removed": 0, "unchanged": 0, "errors": 0}
+        seen = set()
+        changed = {}
+        
+        for file_path, stat in self._iter_audio_files():
+            relative_path = self._relative(file_path)
+            seen.add(relative_path)
+            if known.get(relative_path) == (stat.st_size, stat.st_mtime):
+                counts["unchanged"] += 1
+            else:
+                changed[file_path] = (relative_path, stat.st_size, stat.st_mtime)
+        
+        if changed:
+            if len(changed) >= self.PARALLEL_THRESHOLD and workers != 1:
+                from concurrent.futures import ProcessPoolExecutor
+                
+                workers = workers or os.cpu_count() or 1
+                executor = ProcessPoolExecutor(max_workers=workers)
+                # Large chunks keep pickling overhead low without starving the last workers
+                chunksize = max(1, min(64, len(changed) // (workers * 4)))
+                results = executor.map(self._read_file_info_safe, changed, chunksize=chunksize)
+            else:
+                executor = None
+                results = map(self._read_file_info_safe, changed)
+            
+            try:
+                pending = []
+                for done, (file_path, info, error) in enumerate(results, 1):
+                    if error is not None:
+                        print(f"Could not read tags of {file_path}: {error}")
+                        counts["errors"] += 1
+                    pending.append(self._row(*changed[file_path], info or {}))
+                    if len(pending) >= self.WRITE_BATCH:
+                        self._upsert(pending)
+                        pending = []
+                    if progress_callback:
+                        progress_callback(done, len(changed))
+                if pending:
+                    self._upsert(pending)
+            finally:
+                if executor:
+                    executor.shutdown()
+            counts["updated"] = len(changed)
+        
+        missing = [(path,) for path in known if path not in seen]
+        if missing:
+            with self._lock:
+                self._conn.executemany("DELETE FROM tracks WHERE path = ?", missing)
+                self._conn.commit()
+        counts["removed"] = len(missing)
+        return counts
+    
+    @staticmethod
+    def _row(relative_path, size, mtime, info):
+        return (relative_path, size, mtime, info.get("video_id"), info.get("artist"), info.get("title"),
+                info.get("recording_id"), info.get("album"), info.get("year"), info.get("genre"),
+                info.get("track"), int(bool(info.get("has_lyrics"))), int(bool(info.get("has_artwork"))))
+    
+    def _upsert(self, rows):
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO tracks ({', '.join(self.COLUMNS)}) VALUES ({placeholders})", rows
+            )
+            self._conn.commit()
+    
+    def add_file(self, path, metadata):
+        """Record a freshly written file from its tags, falling back to the metadata it was tagged with"""
+        stat = os.stat(path)
+        info = self.read_file_info(path)
+        info["video_id"] = info["video_id"] or extract_video_id(metadata.get('source_url'))
+        info["artist"] = info["artist"] or normalize_name(metadata.get('artist')) or None
+        info["title"] = info["title"] or normalize_name(metadata.get('title')) or None
+        info["recording_id"] = info["recording_id"] or metadata.get('recording_id') or None
+        self._upsert([self._row(self._relative(path), stat.st_size, stat.st_mtime, info)])
+    
+    def missing_fingerprints(self):
+        """Paths of tracks that have not been fingerprinted since they last changed"""
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM tracks WHERE fingerprint IS NULL").fetchall()
+        return [self._absolute(relative_path) for (relative_path,) in rows]
+    
+    def set_fingerprints(self, rows):
+        """Store (path, fingerprint, minhash) rows; an empty fingerprint marks a file that could not be decoded"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE tracks SET fingerprint = ?, minhash = ? WHERE path = ?",
+                [(fingerprint.tobytes() if fingerprint is not None else b'',
+                  minhash.tobytes() if minhash is not None else None,
+                  self._relative(path)) for path, fingerprint, minhash in rows]
+            )
+            self._conn.commit()
+    
+    def iter_fingerprinted(self):
+        """Yield every fingerprinted track with the fields used to pick which duplicate to keep"""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT path, size, album, has_lyrics, has_artwork, fingerprint, minhash
+                FROM tracks WHERE minhash IS NOT NULL
+            """).fetchall()
+        for path, size, album, has_lyrics, has_artwork, fingerprint, minhash in rows:
+            yield {
+                "path": self._absolute(path), "size": size, "album": album,
+                "has_lyrics": bool(has_lyrics), "has_artwork": bool(has_artwork),
+                "fingerprint": array.array('I', fingerprint), "minhash": array.array('Q', minhash),
+            }
+    
+    def summary(self):
+        """Totals over the whole index for the scan report"""
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(DISTINCT artist),
+                       COALESCE(SUM(has_lyrics), 0), COALESCE(SUM(has_artwork), 0),
+                       SUM(CASE WHEN album IS NULL OR album = '' THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN video_id IS NULL THEN 1 ELSE 0 END)
+                FROM tracks
+            """).fetchone()
+        keys = ("tracks", "size", "artists", "with_lyrics", "with_artwork", "without_album", "without_source")
+        return dict(zip(keys, (value or 0 for value in row)))
+    
+    def _find(self, column_sql, params):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT path FROM tracks WHERE {column_sql}", params).fetchall()
+        for (relative_path,) in rows:
+            path = self._absolute(relative_path)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def find_by_video_id(self, video_id):
+        """Return the library path of a track downloaded from this video, if any"""
+        return self._find("video_id = ?", (video_id,)) if video_id else None
+    
+    def find_by_recording_id(self, recording_id):
+        """Return the library path of a track with this MusicBrainz recording ID, if any"""
+        return self._find("recording_id = ?", (recording_id,)) if recording_id else None
+    
+    def find_track(self, artist, title):
+        """Return the library path of a track with this (normalized) artist and title, if any"""
+        artist, title = normalize_name(artist), normalize_name(title)
+        if not artist or not title:
+            return None
+        return self._find("artist = ? AND title = ?", (artist, title))
+
+class DownloadQueue:
+    """Persistent SQLite queue of downloads, checkpointed after every stage so work survives a crash"""
+    
+    STATES = ("queued", "metadata", "downloading", "converting", "tagging", "done", "failed")
+    FINISHED_STATES = ("done", "failed")
+    # A claim lapses when its worker stops sending heartbeats, so a crashed run's jobs can be resumed
+    CLAIM_TIMEOUT = 90
+    HEARTBEAT_INTERVAL = 30
+    
+    def __init__(self, queue_file):
+        self.queue_file = queue_file
+        self.worker_id = f"{os.getpid()}-{time.time():.0f}"
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(queue_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                output_dir TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'queued',
+                metadata TEXT,
+                output_format TEXT,
+                output_quality TEXT,
+                save_path TEXT,
+                source_file TEXT,
+                audio_file TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_by TEXT,
+                claimed_at REAL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        # Queues written before output formats were configurable hold MP3 jobs
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("output_format", "output_quality"):
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+        self._conn.commit()
+        
+        self._heartbeat_thread = None
+    
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["metadata"] = json.loads(job["metadata"]) if job["metadata"] else {}
+        job["output"] = {"format": job.pop("output_format") or DEFAULT_AUDIO_OUTPUT["format"],
+                         "quality": job.pop("output_quality") or DEFAULT_AUDIO_OUTPUT["quality"]}
+        return job
+    
+    def work_dir(self, job):
+        """Hidden folder next to the library where a job keeps its partial files"""
+        return os.path.join(job["output_dir"], ".partial", f"job-{job['id']}")
+    
+    def add(self, url, output_dir, metadata=None, output=None):
+        """Queue a download, reusing an unfinished or failed job for the same URL and folder
+
+        A reused job that has not started downloading takes the new metadata and output.
+        Raises ValueError when the job is already downloading in a different format.
+        """
+        output_dir = os.path.abspath(output_dir)
+        output = output or DEFAULT_AUDIO_OUTPUT
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, state, output_format, output_quality, claimed_by, claimed_at FROM jobs "
+                "WHERE url = ? AND output_dir = ? AND state != 'done' ORDER BY id DESC LIMIT 1",
+                (url, output_dir)
+            ).fetchone()
+            if row:
+                claimed = row["claimed_by"] is not None and row["claimed_at"] >= now - self.CLAIM_TIMEOUT
+                if row["state"] == "failed" or (row["state"] in ("queued", "metadata") and not claimed):
+                    # Start over from the metadata stage; partial downloads in the work dir are kept
+                    self._conn.execute("UPDATE jobs SET state = 'queued', metadata = ?, output_format = ?, output_quality = ?, "
+                                       "error = NULL, updated = ? WHERE id = ?",
+                                       (json.dumps(metadata or {}), output["format"], output["quality"], now, row["id"]))
+                    self._conn.commit()
+                elif ((row["output_format"] or DEFAULT_AUDIO_OUTPUT["format"]) != output["format"]
+                      or (row["output_quality"] or DEFAULT_AUDIO_OUTPUT["quality"]) != output["quality"]):
+                    raise ValueError(f"Job {row['id']} is already {row['state']} as "
+                                     f"{row['output_format'] or DEFAULT_AUDIO_OUTPUT['format']}; "
+                                     f"let it finish before downloading it in another format")
+                return row["id"]
+            
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (url, output_dir, metadata, output_format, output_quality, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, output_dir, json.dumps(metadata or {}), output["format"], output["quality"], now, now)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+    
+    def claim(self, job_id=None):
+        """Claim a specific job, or the oldest unclaimed one, returning it or None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                query = ("SELECT * FROM jobs WHERE state NOT IN ('done', 'failed') "
+                         "AND (claimed_by IS NULL OR claimed_at < ?)")
+                params = [now - self.CLAIM_TIMEOUT]
+                if job_id is None:
+                    query += " ORDER BY id LIMIT 1"
+                else:
+                    query += " AND id = ?"
+                    params.append(job_id)
+                
+                row = self._conn.execute(query, params).fetchone()
+                if row:
+                    self._conn.execute("UPDATE jobs SET claimed_by = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                                       (self.worker_id, now, row["id"]))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        
+        if row:
+            self._start_heartbeat()
+        return self._job(row)
+    
+    def checkpoint(self, job_id, state, **fields):
+        """Record that a job reached a stage, along with any paths or metadata it produced"""
+        if state not in self.STATES:
+            raise ValueError(f"Unknown job state: {state}")
+        if "metadata" in fields:
+            fields["metadata"] = json.dumps(fields["metadata"] or {})
+        
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET state = ?, updated = ?, claimed_at = ?{', ' + assignments if fields else ''} WHERE id = ?",
+                [state, now, now, *fields.values(), job_id]
+            )
+            if state in self.FINISHED_STATES:
+                self._conn.execute("UPDATE jobs SET claimed_by = NULL, claimed_at = NULL WHERE id = ?", (job_id,))
+            self._conn.commit()
+    
+    def claim_save_path(self, job_id, save_path, metadata, replaceable=None):
+        """Move a job to downloading with a save path no other job is using, returning the path
+
+        A path another unfinished job is writing to, or an existing file that replaceable()
+        does not accept, gets a " (2)", " (3)", ... suffix instead of being overwritten.
+        """
+        base, extension = os.path.splitext(save_path)
+        candidate, number = save_path, 1
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    taken = self._conn.execute(
+                        "SELECT 1 FROM jobs WHERE save_path = ? AND id != ? AND state NOT IN ('done', 'failed')",
+                        (candidate, job_id)
+                    ).fetchone()
+                    if not taken and not (os.path.exists(candidate) and not (replaceable and replaceable(candidate))):
+                        break
+                    number += 1
+                    candidate = f"{base} ({number}){extension}"
+
+                self._conn.execute("UPDATE jobs SET state = 'downloading', metadata = ?, save_path = ?, updated = ?, "
+                                   "claimed_at = ? WHERE id = ?",
+                                   (json.dumps(metadata or {}), candidate, now, now, job_id))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return candidate
+
+    def fail(self, job_id, error):
+        """Mark a job as failed; adding the same download again resumes it"""
+        self.checkpoint(job_id, "failed", error=error)
+    
+    def release(self, job_id):
+        """Give up a claim without changing the job's stage, e.g. when interrupted"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET claimed_by = NULL, claimed_at = NULL WHERE id = ?", (job_id,))
+            self._conn.commit()
+    
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is not None:
+                return
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="queue-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+    
+    def _heartbeat(self):
+        """Keep this process's claims alive while long downloads run"""
+        while True:
+            time.sleep(self.HEARTBEAT_INTERVAL)
+            try:
+                with self._lock:
+                    self._conn.execute("UPDATE jobs SET claimed_at = ? WHERE claimed_by = ? AND state NOT IN ('done', 'failed')",
+                                       (time.time(), self.worker_id))
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Could not refresh download queue claims: {e}")
+    
+    def jobs(self, states=None):
+        """All jobs, optionally only those in the given states, oldest first"""
+        query = "SELECT * FROM jobs"
+        params = []
+        if states:
+            query += f" WHERE state IN ({', '.join('?' for _ in states)})"
+            params = list(states)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall()
+        return [self._job(row) for row in rows]
+    
+    def clear_finished(self):
+        """Forget done and failed jobs and delete their partial files, returning how many were removed"""
+        finished = self.jobs(self.FINISHED_STATES)
+        for job in finished:
+            shutil.rmtree(self.work_dir(job), ignore_errors=True)
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE state IN ('done', 'failed')")
+            self._conn.commit()
+        return len(finished)
+
+class AsyncRunner:
+    """One asyncio event loop on a background thread that runs the GUI's network work
+    
+    Blocking calls go to a small shared thread pool with a few concurrent calls per host,
+    so clicking through results cannot pile up threads, and cancelling a task also drops
+    the calls it had queued.
+    """
+    HOST_LIMITS = {"musicbrainz.org": 2, "coverartarchive.org": 4, "itunes.apple.com": 2, "youtube.com": 2,
+                   "prefetch": 2}
+    DEFAULT_HOST_LIMIT = 4
+    
+    def __init__(self, max_workers=8):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-io")
+        self._semaphores = {}
+        self._thread = threading.Thread(target=self._run, name="asyncio-loop", daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    def submit(self, coro):
+        """Schedule a coroutine from any thread; cancelling the returned future cancels the whole task tree"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    async def run_blocking(self, host, func, *args, **kwargs):
+        """Run a blocking call on the pool, limited per host (call from the loop)"""
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.HOST_LIMITS.get(host, self.DEFAULT_HOST_LIMIT))
+        async with semaphore:
+            return await self.loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    @staticmethod
+    def host_of(url):
+        return (urlsplit(url).hostname or "").removeprefix("www.")
+    
+    def stop(self):
+        """Cancel everything still running and stop the loop"""
+        def cancel_all():
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.stop()
+        
+        self.loop.call_soon_threadsafe(cancel_all)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class ArtworkSelectorDialog:
+    TILE_SIZE = 180
+    
     def __init__(self, parent, artwork_list):
         """Dialog for selecting from multiple artwork options"""
-        super().__init__(parent)
-        self.title("Select Cover Artwork")
-        self.geometry("600x500")
-        self.minsize(600, 500)
-        self.transient(parent)
-        self.grab_set()
+        # Wraps a Toplevel rather than subclassing it, so tkinter is only imported once the GUI starts
+        self.parent = parent
+        self.window = tk.Toplevel(parent)
+        self.window.title("Select Cover Artwork")
+        self.window.geometry("600x500")
+        self.window.minsize(600, 500)
+        self.window.transient(parent)
+        self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
         
-        self.configure(bg="#2E3440")
+        self.window.configure(bg="#2E3440")
         
         # Store artwork options
         self.artwork_list = artwork_list
         self.selected_index = None
         self.artwork_images = []  # Keep references to prevent garbage collection
         
+        # Tiles are decoded off the Tk thread, and only once they scroll into view
+        self.tiles = []
+        self.decode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="artwork-tiles")
+        self.visibility_check_pending = False
+        
         self.create_widgets()
-        self.update_idletasks()
+        self.window.update_idletasks()
         self.center_window()
+        self.schedule_visibility_check()
         
     def create_widgets(self):
-        header_label = ttk.Label(self, text="Select cover artwork:", font=("Arial", 12, "bold"))
+        header_label = ttk.Label(self.window, text="Select cover artwork:", font=("Arial", 12, "bold"))
         header_label.pack(pady=(15, 10))
         
-        gallery_frame = ttk.Frame(self)
+        gallery_frame = ttk.Frame(self.window)
         gallery_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=10)
         
         self.canvas = tk.Canvas(gallery_frame, bg="#2E3440", highlightthickness=0)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        scrollbar = ttk.Scrollbar(gallery_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = ttk.Scrollbar(gallery_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.configure(yscrollcommand=self.on_canvas_scroll)
         
         self.tiles_frame = ttk.Frame(self.canvas)
         self.canvas_window = self.canvas.create_window((0, 0), window=self.tiles_frame, anchor='nw')
@@ -70,7 +2222,7 @@ class ArtworkSelectorDialog(tk.Toplevel):
             for i, artwork_data in enumerate(self.artwork_list):
                 self.add_artwork_tile(i, artwork_data)
         
-        button_frame = ttk.Frame(self)
+        button_frame = ttk.Frame(self.window)
         button_frame.pack(fill=tk.X, padx=15, pady=15)
         
         cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel)
@@ -79,52 +2231,119 @@ class ArtworkSelectorDialog(tk.Toplevel):
     def on_frame_configure(self, event):
         """Reset the scroll region to encompass the inner frame"""
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        self.schedule_visibility_check()
     
     def on_canvas_configure(self, event):
         """Resize the inner frame to match the canvas"""
         self.canvas.itemconfig(self.canvas_window, width=event.width)
+        self.schedule_visibility_check()
+    
+    def on_canvas_scroll(self, first, last):
+        """Keep the scrollbar in sync and render tiles that scrolled into view"""
+        self.scrollbar.set(first, last)
+        self.schedule_visibility_check()
+    
+    def schedule_visibility_check(self):
+        """Coalesce bursts of scroll/resize events into one visibility check"""
+        if not self.visibility_check_pending:
+            self.visibility_check_pending = True
+            self.window.after_idle(self.load_visible_tiles)
+    
+    def load_visible_tiles(self):
+        """Start decoding tiles that are within (or one screen away from) the visible area"""
+        self.visibility_check_pending = False
+        if not self.window.winfo_exists():
+            return
         
-    def add_artwork_tile(self, index, artwork_data):
-        tile_frame = ttk.Frame(self.tiles_frame)
-        tile_frame.pack(fill=tk.X, pady=10)
+        view_height = self.canvas.winfo_height()
+        top = self.canvas.canvasy(0) - view_height
+        bottom = self.canvas.canvasy(0) + 2 * view_height
+        
+        for tile in self.tiles:
+            if tile["requested"]:
+                continue
+            tile_top = tile["frame"].winfo_y()
+            tile_bottom = tile_top + max(tile["frame"].winfo_height(), self.TILE_SIZE)
+            if tile_bottom >= top and tile_top <= bottom:
+                tile["requested"] = True
+                future = self.decode_pool.submit(self.decode_tile, tile["artwork"])
+                future.add_done_callback(lambda f, t=tile: self.window.after(0, self.show_tile_image, t, f))
+    
+    def decode_tile(self, artwork_data):
+        """Produce a tile-sized PIL image (runs on the decode pool)"""
+        if artwork_data.get("image") is not None:
+            img = artwork_data["image"].copy()
+        else:
+            img = Image.open(BytesIO(artwork_data["data"]))
+            if img.format == 'JPEG':
+                # Let libjpeg decode at a reduced scale instead of the full-size original
+                img.draft('RGB', (self.TILE_SIZE, self.TILE_SIZE))
+        img.thumbnail((self.TILE_SIZE, self.TILE_SIZE), Image.Resampling.LANCZOS)
+        return img
+    
+    def show_tile_image(self, tile, future):
+        """Swap a tile's placeholder for its decoded image (runs on the Tk thread)"""
+        if future.cancelled() or not self.window.winfo_exists():
+            return
         
         try:
-            img_data = BytesIO(artwork_data["data"])
-            img = Image.open(img_data)
-            
-            img.thumbnail((180, 180), Image.Resampling.LANCZOS)
-            
-            photo_img = ImageTk.PhotoImage(img)
-            self.artwork_images.append(photo_img)
-            
-            img_label = ttk.Label(tile_frame, image=photo_img)
-            img_label.image = photo_img
-            img_label.pack(side=tk.LEFT, padx=10)
-            
-            img_label.bind("<Button-1>", lambda e, idx=index: self.select_artwork(idx))
-            
-            info_frame = ttk.Frame(tile_frame)
-            info_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            
-            source_label = ttk.Label(info_frame, text=f"Source: {artwork_data['source']}", font=("Arial", 11))
-            source_label.pack(anchor=tk.W, pady=(10, 0))
-            
-            size_label = ttk.Label(info_frame, text=f"Size: {len(artwork_data['data']) // 1024} KB", font=("Arial", 11))
-            size_label.pack(anchor=tk.W)
-            
-            resolution = self.get_image_resolution(img)
-            res_label = ttk.Label(info_frame, text=f"Resolution: {resolution[0]}x{resolution[1]}", font=("Arial", 11))
-            res_label.pack(anchor=tk.W)
-            
-            select_button = ttk.Button(info_frame, text="Select", command=lambda idx=index: self.select_artwork(idx))
-            select_button.pack(anchor=tk.W, pady=(10, 0))
-            
-            print(f"Added artwork tile {index}: {artwork_data['source']}, {resolution}")
-            
+            img = future.result()
         except Exception as e:
             print(f"Error creating artwork tile: {str(e)}")
-            error_label = ttk.Label(tile_frame, text=f"Error loading image: {str(e)}")
-            error_label.pack(side=tk.LEFT, padx=10)
+            tile["image_label"].config(text=f"Error loading image: {str(e)}")
+            return
+        
+        photo_img = ImageTk.PhotoImage(img)
+        self.artwork_images.append(photo_img)
+        tile["image_label"].config(image=photo_img, text="")
+        tile["image_label"].image = photo_img
+        
+        if not tile["artwork"].get("resolution"):
+            width, height = self.get_image_resolution(img)
+            tile["res_label"].config(text=f"Resolution: {width}x{height} (preview)")
+        
+    def add_artwork_tile(self, index, artwork_data):
+        tile_frame = ttk.Frame(self.tiles_frame)
+        tile_frame.pack(fill=tk.X, pady=10)
+        
+        # Fixed-size holder so the layout doesn't jump when the image arrives
+        image_holder = ttk.Frame(tile_frame, width=self.TILE_SIZE, height=self.TILE_SIZE)
+        image_holder.pack_propagate(False)
+        image_holder.pack(side=tk.LEFT, padx=10)
+        
+        img_label = ttk.Label(image_holder, text="Loading...", anchor=tk.CENTER)
+        img_label.pack(fill=tk.BOTH, expand=True)
+        img_label.bind("<Button-1>", lambda e, idx=index: self.select_artwork(idx))
+        
+        info_frame = ttk.Frame(tile_frame)
+        info_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        source_label = ttk.Label(info_frame, text=f"Source: {artwork_data['source']}", font=("Arial", 11))
+        source_label.pack(anchor=tk.W, pady=(10, 0))
+        
+        size_label = ttk.Label(info_frame, text=f"Size: {len(artwork_data['data']) // 1024} KB", font=("Arial", 11))
+        size_label.pack(anchor=tk.W)
+        
+        resolution = artwork_data.get("resolution")
+        res_text = f"Resolution: {resolution[0]}x{resolution[1]}" if resolution else "Resolution: ..."
+        res_label = ttk.Label(info_frame, text=res_text, font=("Arial", 11))
+        res_label.pack(anchor=tk.W)
+        
+        select_button = ttk.Button(info_frame, text="Select", command=lambda idx=index: self.select_artwork(idx))
+        select_button.pack(anchor=tk.W, pady=(10, 0))
+        
+        self.tiles.append({
+            "frame": tile_frame,
+            "image_label": img_label,
+            "res_label": res_label,
+            "artwork": artwork_data,
+            "requested": False,
+        })
+    
+    def destroy(self):
+        """Drop pending tile decodes along with the dialog"""
+        self.decode_pool.shutdown(wait=False, cancel_futures=True)
+        self.window.destroy()
     
     def get_image_resolution(self, img):
         """Get image width and height"""
@@ -142,43 +2361,86 @@ class ArtworkSelectorDialog(tk.Toplevel):
     
     def center_window(self):
         """Center the dialog on the parent window"""
-        parent = self.master
+        parent = self.parent
         
         x = parent.winfo_x()
         y = parent.winfo_y()
         parent_width = parent.winfo_width()
         parent_height = parent.winfo_height()
         
-        dialog_width = self.winfo_width()
-        dialog_height = self.winfo_height()
+        dialog_width = self.window.winfo_width()
+        dialog_height = self.window.winfo_height()
         
         position_x = x + (parent_width - dialog_width) // 2
         position_y = y + (parent_height - dialog_height) // 2
         
-        self.geometry(f"+{position_x}+{position_y}")
+        self.window.geometry(f"+{position_x}+{position_y}")
 
 class MusicLibraryExtender:
-    def __init__(self, root):
+    # Wait this long after the selection changes before looking it up, so arrowing through results stays cheap
+    SELECTION_DEBOUNCE_MS = 300
+    
+    # Results fetched per search page and per "Load more"
+    SEARCH_PAGE_SIZE = 10
+    
+    # Search results whose metadata and artwork are fetched ahead of a click, and the share of
+    # the artwork store's memory prefetching may fill before it stops
+    PREFETCH_RESULTS = 5
+    PREFETCH_MEMORY_SHARE = 0.5
+    
+    def __init__(self, root, use_cache=True):
         self.root = root
         self.root.title("Music Library Extender")
         self.root.geometry("1300x920")
         self.root.minsize(900, 650)
         
-        # Initialize MusicBrainz API for metadata
-        musicbrainzngs.set_useragent("MusicLibraryExtender", "1.0.0", "https://github.com/TheBeaconCrafter/MusicLibraryExtender")
+        # MusicBrainz API for metadata; musicbrainzngs itself is set up on the first lookup
+        self.musicbrainz = get_musicbrainz_client()
         
         self.set_theme()
         
         self.config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
         
         self.load_settings()
+        self.use_cache = use_cache
+        configure_http_cache(self.config, enabled=use_cache)
+        configure_http_session(self.config)
+        configure_search_cache(self.config)
+        configure_audio_output(self.config)
+        self.artwork_store = configure_artwork_store(self.config)
+        
+        self.lyrics_engine = LyricsEngine.from_config(self.config, {
+            'genius': self._fetch_lyrics_from_genius,
+            'musixmatch': self._fetch_lyrics_from_musixmatch,
+            'lyricsovh': self._fetch_lyrics_from_lyricsovh,
+        }, stats_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".lyrics_stats.json"))
         
         self.search_results = []
+        self.search_stream = None
         self.selected_video = None
         self.thumbnail_image = None  # Keep reference to prevent garbage collection
         
         self.artwork_options = []
         
+        # Network work runs on one event loop; each search and selection is a task tree that gets cancelled when replaced
+        self.async_runner = AsyncRunner()
+        self.search_task = None
+        self.selection_task = None
+        self.lyrics_task = None
+        self.prefetch_task = None
+        
+        self.prefetch_results = self.PREFETCH_RESULTS
+        if 'Prefetch' in self.config:
+            try:
+                self.prefetch_results = int(self.config['Prefetch'].get('results', self.prefetch_results))
+            except ValueError as e:
+                print(f"Invalid prefetch settings: {e}")
+        
+        # Bumped on every new search and selection; results tagged with an older generation are dropped
+        self.search_generation = 0
+        self.selection_generation = 0
+        self.preview_after_id = None
+        
         self.create_widgets()
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -216,8 +2478,29 @@ class MusicLibraryExtender:
     def on_close(self):
         """Handle window close event"""
         self.save_settings()
+        if self.search_stream:
+            self.search_stream.close()
+        self.async_runner.stop()
         self.root.destroy()
     
+    def _on_ui(self, callback):
+        """Run a callback on the Tk thread"""
+        self.root.after(0, callback)
+    
+    def _on_search_ui(self, generation, callback):
+        """Run a callback on the Tk thread unless a new search has started since"""
+        def apply():
+            if generation == self.search_generation:
+                callback()
+        self.root.after(0, apply)
+    
+    def _on_selection_ui(self, generation, callback):
+        """Run a callback on the Tk thread unless the user has selected another video since"""
+        def apply():
+            if generation == self.selection_generation:
+                callback()
+        self.root.after(0, apply)
+    
     def set_theme(self):
         style = ttk.Style()
         
@@ -321,6 +2604,9 @@ class MusicLibraryExtender:
         
         self.results_tree.bind("<<TreeviewSelect>>", self.on_video_select)
         
+        self.load_more_button = ttk.Button(results_frame, text="Load more", command=self.load_more, state=tk.DISABLED)
+        self.load_more_button.pack(side=tk.RIGHT, padx=10, pady=(0, 10))
+        
         preview_container = ttk.Frame(main_frame)  # Container with fixed height
         preview_container.pack(fill=tk.X, pady=(0, 15))
         
@@ -434,69 +2720,94 @@ class MusicLibraryExtender:
         # Clear previous results
         for item in self.results_tree.get_children():
             self.results_tree.delete(item)
-            
-        # Start search in a separate thread
-        threading.Thread(target=self._search_thread, args=(query,), daemon=True).start()
+        self._cancel_selection()
+        
+        # Replace a search that is still running; rows it still produces are dropped
+        self.search_generation += 1
+        self.search_results = []
+        if self.search_stream:
+            self.search_stream.close()
+        self.search_stream = YouTubeSearch(query)
+        self.load_more_button.config(state=tk.DISABLED)
+        if self.search_task:
+            self.search_task.cancel()
+        if self.prefetch_task:
+            self.prefetch_task.cancel()
+        self._request_search_page()
+    
+    def load_more(self):
+        """Fetch the next page of the current search"""
+        if not self.search_stream or self.search_stream.exhausted:
+            return
+        if self.search_task and not self.search_task.done():
+            return
+        
+        self.status_var.set(f"Loading more results for: {self.search_stream.query}...")
+        self.load_more_button.config(state=tk.DISABLED)
+        self._request_search_page()
+    
+    def _request_search_page(self):
+        """Show the next page of the current search, from the search cache while it has it"""
+        stream = self.search_stream
+        first_page = stream.position == 0
+        
+        # Cached pages are only used before the live stream is opened, so the two never disagree on position
+        cache = get_search_cache() if self.use_cache and not stream.started else None
+        cached = cache.lookup(stream.query, stream.position, self.SEARCH_PAGE_SIZE) if cache else None
+        if cached:
+            _, videos = cached
+            for video in videos:
+                self._append_search_result(video)
+            stream.position += len(videos)
+            stream.exhausted = len(videos) < self.SEARCH_PAGE_SIZE
+            self._finish_search_page(stream, first_page)
+            return
+        
+        self.search_task = self.async_runner.submit(self._search_task(stream, self.search_generation, first_page))
+    
+    def _finish_search_page(self, stream, first_page):
+        self.status_var.set(f"Found {len(self.search_results)} results")
+        if not stream.exhausted:
+            self.load_more_button.config(state=tk.NORMAL)
+        if first_page and self.prefetch_results > 0:
+            self.prefetch_task = self.async_runner.submit(
+                self._prefetch_results(self.search_results[:self.prefetch_results]))
     
-    def _search_thread(self, query):
+    async def _search_task(self, stream, generation, first_page):
         try:
-            videos = self._ytdlp_search(query)
-            self.search_results = videos
-            self.root.after(0, self._update_search_results)
-            
+            await self.async_runner.run_blocking("youtube.com", self._read_search_page, stream, generation)
+            self._on_search_ui(generation, lambda: self._finish_search_page(stream, first_page))
         except Exception as e:
-            self.root.after(0, lambda: self.status_var.set(f"Error: {str(e)}"))
+            # e is unbound once the except block ends, so the message is built before the callback runs
+            message = f"Error: {str(e)}"
+            self._on_search_ui(generation, lambda: self.status_var.set(message))
     
-    def _ytdlp_search(self, query):
-        """Search YouTube using yt-dlp"""
-        results = []
+    def _read_search_page(self, stream, generation):
+        """Read one page from the search stream, showing each row as soon as yt-dlp yields it"""
+        start = stream.position
+        videos = []
+        for video in stream.iter_page(self.SEARCH_PAGE_SIZE):
+            if generation != self.search_generation:
+                # Superseded by a newer search; stop pulling from this one
+                stream.close()
+                return
+            videos.append(video)
+            self._on_search_ui(generation, lambda video=video: self._append_search_result(video))
         
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': 'in_playlist',
-            'default_search': 'ytsearch10', # Gets 10 results
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            try:
-                info = ydl.extract_info(f"ytsearch10:{query}", download=False)
-                if 'entries' in info:
-                    for entry in info['entries']:
-                        if not entry:
-                            continue
-                            
-                        duration_secs = entry.get('duration', 0)
-                        duration = time.strftime('%M:%S', time.gmtime(duration_secs)) if duration_secs else 'Unknown'
-                        
-                        video_url = entry.get('webpage_url')
-                        if not video_url:
-                            if entry.get('id'):
-                                video_url = f"https://www.youtube.com/watch?v={entry['id']}"
-                            
-                        video = {
-                            "id": entry['id'],
-                            "title": entry.get('title', 'Unknown Title'),
-                            "channel": entry.get('uploader', 'Unknown Uploader'),
-                            "duration": duration,
-                            "thumbnail": entry.get('thumbnail'),
-                            "webpage_url": video_url
-                        }
-                        results.append(video)
-            except Exception as e:
-                print(f"Search error: {str(e)}")
-                
-        return results
+        cache = get_search_cache() if self.use_cache else None
+        if cache and videos:
+            cache.store(stream.query, start, self.SEARCH_PAGE_SIZE, videos)
     
-    def _update_search_results(self):
-        for i, video in enumerate(self.search_results):
-            self.results_tree.insert("", tk.END, iid=i, values=(
-                video["title"],
-                video["channel"],
-                video["duration"]
-            ))
+    def _append_search_result(self, video):
+        self.search_results.append(video)
+        index = len(self.search_results) - 1
+        self.results_tree.insert("", tk.END, iid=index, values=(
+            video["title"],
+            video["channel"],
+            video["duration"]
+        ))
         
-        self.status_var.set(f"Found {len(self.search_results)} results")
+        self.status_var.set(f"Found {len(self.search_results)} results, loading...")
     
     def on_video_select(self, event):
         selected_items = self.results_tree.selection()
@@ -507,33 +2818,135 @@ class MusicLibraryExtender:
             self._update_preview()
             self.download_button.config(state=tk.NORMAL)
     
+    def _cancel_selection(self):
+        """Cancel lookups for the current selection and make any of their late results stale"""
+        self.selection_generation += 1
+        if self.selection_task:
+            self.selection_task.cancel()
+            self.selection_task = None
+        if self.lyrics_task:
+            self.lyrics_task.cancel()
+            self.lyrics_task = None
+        if self.preview_after_id:
+            self.root.after_cancel(self.preview_after_id)
+            self.preview_after_id = None
+    
+    @staticmethod
+    def _guess_artist_title(video):
+        """Split a video title into artist and song title"""
+        title_parts = video["title"].split(" - ")
+        
+        if len(title_parts) > 1:
+            artist = title_parts[0].strip()
+            title = " - ".join(title_parts[1:]).strip()
+            title = re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', title).strip()
+        else:
+            artist = video["channel"]
+            title = title_parts[0].strip()
+            title = re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', title).strip()
+            parts = re.split(r'\s+by\s+', title, flags=re.IGNORECASE)
+            if len(parts) > 1:
+                title = parts[0].strip()
+                artist = parts[1].strip()
+        
+        return artist, title
+    
+    @staticmethod
+    def _itunes_search_url(artist, title):
+        search_query = f"{artist} {title}"
+        return f"https://itunes.apple.com/search?term={search_query.replace(' ', '+')}&media=music&limit=1"
+    
+    async def _prefetch_results(self, videos):
+        """Warm the caches for the top search results so selecting one fills in at once"""
+        for video in videos:
+            if self.artwork_store.memory_used > self.artwork_store.memory_limit * self.PREFETCH_MEMORY_SHARE:
+                print("Prefetching stopped: artwork memory budget reached")
+                return
+            
+            # One result at a time, best match first
+            artist, title = self._guess_artist_title(video)
+            await self._prefetch_video(artist, title, video["thumbnail"])
+    
+    async def _prefetch_video(self, artist, title, thumbnail_url):
+        """Issue the same requests a selection would, at background priority, and keep only the cached results"""
+        run = functools.partial(self.async_runner.run_blocking, "prefetch")
+        coverart_get = functools.partial(self.musicbrainz.coverart_get, priority=PRIORITY_BACKGROUND)
+        
+        async def musicbrainz():
+            result = await run(self.musicbrainz.search_recordings, f"artist:{artist} AND recording:{title}",
+                               limit=1, priority=PRIORITY_BACKGROUND)
+            recordings = (result or {}).get('recording-list') or []
+            releases = recordings[0].get('release-list') if recordings else None
+            release_id = releases[0].get('id') if releases else None
+            if release_id:
+                await asyncio.gather(
+                    run(self.artwork_store.fetch, f"https://coverartarchive.org/release/{release_id}/front", fetcher=coverart_get),
+                    run(self.musicbrainz.get_release_by_id, release_id, includes=["recordings", "media"],
+                        priority=PRIORITY_BACKGROUND),
+                )
+        
+        async def itunes():
+            response = await run(cached_get, self._itunes_search_url(artist, title), source='itunes')
+            if response.status_code == 200:
+                results = response.json().get('results') or []
+                if results and results[0].get('artworkUrl100'):
+                    await run(self.artwork_store.fetch, results[0]['artworkUrl100'].replace('100x100', '600x600'),
+                              source='itunes')
+        
+        branches = [musicbrainz(), itunes()]
+        if thumbnail_url:
+            branches.append(run(self.artwork_store.fetch, thumbnail_url, source='thumbnail'))
+        
+        for result in await asyncio.gather(*branches, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"Prefetch for {artist} - {title} failed: {str(result)}")
+    
     def _update_preview(self):
         if self.selected_video:
-            title_parts = self.selected_video["title"].split(" - ")
-            
-            if len(title_parts) > 1:
-                artist = title_parts[0].strip()
-                title = " - ".join(title_parts[1:]).strip()
-                title = re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', title).strip()
-            else:
-                artist = self.selected_video["channel"]
-                title = title_parts[0].strip()
-                title = re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', title).strip()
-                parts = re.split(r'\s+by\s+', title, flags=re.IGNORECASE)
-                if len(parts) > 1:
-                    title = parts[0].strip()
-                    artist = parts[1].strip()
+            artist, title = self._guess_artist_title(self.selected_video)
             
             self.title_var.set(title)
             self.artist_var.set(artist)
+            self.album_var.set("")
+            self.year_var.set("")
             self.genre_var.set("")
             
-            threading.Thread(target=self._fetch_metadata, args=(artist, title), daemon=True).start()
+            # Anything still loading for the previous selection is cancelled, not left to race
+            self._cancel_selection()
             
-            if self.selected_video["thumbnail"]:
-                threading.Thread(target=self._load_thumbnail, daemon=True).start()
-            else:
+            self.artwork_options = []
+            self.artwork_counter_var.set("")
+            
+            # Reset the track number to ensure we get fresh data
+            self.track_var.set("")
+            self.recording_id = None
+            
+            if hasattr(self, 'album_art_data'):
+                delattr(self, 'album_art_data')
+            
+            if not self.selected_video["thumbnail"]:
                 self.thumbnail_label.config(text="No thumbnail available")
+            
+            # The fields above update immediately; the network lookup waits until the selection settles
+            generation = self.selection_generation
+            thumbnail_url = self.selected_video["thumbnail"]
+            self.preview_after_id = self.root.after(
+                self.SELECTION_DEBOUNCE_MS, lambda: self._start_selection_lookup(artist, title, thumbnail_url, generation)
+            )
+    
+    def _start_selection_lookup(self, artist, title, thumbnail_url, generation):
+        self.preview_after_id = None
+        if generation != self.selection_generation:
+            return
+        self.status_var.set("Looking up metadata...")
+        self.selection_task = self.async_runner.submit(self._load_selection(artist, title, thumbnail_url, generation))
+    
+    async def _load_selection(self, artist, title, thumbnail_url, generation):
+        """Task tree for one selected video; its branches are cancelled together"""
+        branches = [self._fetch_metadata(artist, title, generation), self._fetch_itunes_metadata(artist, title, generation)]
+        if thumbnail_url:
+            branches.append(self._load_thumbnail(thumbnail_url, generation))
+        await asyncio.gather(*branches)
     
     def show_artwork_selector(self, event):
         """Show the artwork selector dialog when thumbnail is clicked"""
@@ -542,7 +2955,7 @@ class MusicLibraryExtender:
             
             valid_options = []
             for i, option in enumerate(self.artwork_options):
-                if 'data' in option and option['data'] and 'source' in option:
+                if option.get('data') and 'source' in option:
                     valid_options.append(option)
                 else:
                     print(f"Skipping invalid artwork option {i}")
@@ -552,15 +2965,13 @@ class MusicLibraryExtender:
                 return
                 
             dialog = ArtworkSelectorDialog(self.root, valid_options)
-            self.root.wait_window(dialog)
+            self.root.wait_window(dialog.window)
             
             if dialog.selected_index is not None and 0 <= dialog.selected_index < len(valid_options):
                 selected_artwork = valid_options[dialog.selected_index]
                 self.album_art_data = selected_artwork['data']
                 
-                img_data = BytesIO(self.album_art_data)
-                img = Image.open(img_data)
-                img = img.resize((120, 120), Image.Resampling.LANCZOS)
+                img = selected_artwork['image'].resize((120, 120), Image.Resampling.LANCZOS)
                 
                 self.thumbnail_image = ImageTk.PhotoImage(img)
                 self.thumbnail_label.config(image=self.thumbnail_image, text="")
@@ -568,92 +2979,83 @@ class MusicLibraryExtender:
                 self.artwork_counter_var.set(f"Selected {dialog.selected_index + 1}/{len(valid_options)}")
                 print(f"Selected artwork {dialog.selected_index + 1}/{len(valid_options)}")
     
-    def _fetch_metadata(self, artist, title):
+    async def _fetch_metadata(self, artist, title, generation):
         """Fetch additional metadata from MusicBrainz or other sources"""
         try:
-            self.root.after(0, lambda: self.status_var.set("Looking up metadata..."))
-            self.artwork_options = []
-            self.artwork_counter_var.set("")
-            
-            # Reset the track number to ensure we get fresh data
-            self.track_var.set("")
-            
-            if hasattr(self, 'album_art_data'):
-                delattr(self, 'album_art_data')
-            
-            threading.Thread(target=self._fetch_itunes_metadata, args=(artist, title), daemon=True).start()
+            search_query = f"artist:{artist} AND recording:{title}"
+            result = await self.async_runner.run_blocking(
+                "musicbrainz.org", self.musicbrainz.search_recordings, search_query, limit=1
+            )
             
-            try:
-                search_query = f"artist:{artist} AND recording:{title}"
-                result = musicbrainzngs.search_recordings(query=search_query, limit=1)
+            if result and 'recording-list' in result and result['recording-list']:
+                recording = result['recording-list'][0]
+                recording_id = recording.get('id')
+                self._on_selection_ui(generation, lambda: setattr(self, 'recording_id', recording_id))
                 
-                if result and 'recording-list' in result and result['recording-list']:
-                    recording = result['recording-list'][0]
+                follow_ups = []
+                if 'release-list' in recording and recording['release-list']:
+                    release = recording['release-list'][0]
                     
-                    if 'release-list' in recording and recording['release-list']:
-                        release = recording['release-list'][0]
-                        
-                        # Set album title
-                        album_title = release.get('title', '')
-                        if album_title:
-                            self.root.after(0, lambda: self.album_var.set(album_title))
-                        
-                        # Set release date/year
-                        if 'date' in release:
-                            release_date = release['date']
-                            year_match = re.match(r'(\d{4})', release_date)
-                            if year_match:
-                                self.root.after(0, lambda: self.year_var.set(year_match.group(1)))
-                        
-                        # Try to get track number from the medium-list if available
-                        if 'medium-list' in release:
-                            for medium in release['medium-list']:
-                                if 'track-list' in medium:
-                                    for track in medium['track-list']:
-                                        if 'recording' in track and track['recording']['id'] == recording['id']:
-                                            # Found the track in this medium
-                                            track_number = track.get('number')
-                                            if track_number:
-                                                self.root.after(0, lambda tn=track_number: self.track_var.set(tn))
-                                                print(f"Found track number from MusicBrainz: {track_number}")
-                                                break
-                        
-                        # If we have a release ID, try to get more detailed track info and cover art
-                        release_id = release.get('id')
-                        if release_id:
-                            # Start thread to fetch album art
-                            threading.Thread(target=self._fetch_album_art, args=(release_id,), daemon=True).start()
-                            
-                            # Also fetch more detailed release info including track position
-                            threading.Thread(target=self._fetch_release_details, args=(release_id, recording['id']), daemon=True).start()
+                    # Set album title
+                    album_title = release.get('title', '')
+                    if album_title:
+                        self._on_selection_ui(generation, lambda: self.album_var.set(album_title))
+                    
+                    # Set release date/year
+                    if 'date' in release:
+                        release_date = release['date']
+                        year_match = re.match(r'(\d{4})', release_date)
+                        if year_match:
+                            self._on_selection_ui(generation, lambda: self.year_var.set(year_match.group(1)))
+                    
+                    # Try to get track number from the medium-list if available
+                    if 'medium-list' in release:
+                        for medium in release['medium-list']:
+                            if 'track-list' in medium:
+                                for track in medium['track-list']:
+                                    if 'recording' in track and track['recording']['id'] == recording['id']:
+                                        # Found the track in this medium
+                                        track_number = track.get('number')
+                                        if track_number:
+                                            self._on_selection_ui(generation, lambda tn=track_number: self.track_var.set(tn))
+                                            print(f"Found track number from MusicBrainz: {track_number}")
+                                            break
                     
-                    # Get genre from tags
-                    if 'tag-list' in recording:
-                        genres = []
-                        for tag in recording['tag-list']:
-                            if tag.get('name') and tag.get('count', 0) > 0:
-                                # Only use tags that might be genres
-                                tag_name = tag['name'].lower()
-                                if tag_name in ['rock', 'pop', 'jazz', 'classical', 'electronic', 'hip-hop', 'rap', 
-                                              'metal', 'country', 'folk', 'blues', 'r&b', 'reggae', 'indie', 
-                                              'dance', 'ambient', 'punk', 'latin']:
-                                    genres.append(tag['name'])
+                    # If we have a release ID, try to get more detailed track info and cover art
+                    release_id = release.get('id')
+                    if release_id:
+                        follow_ups.append(self._fetch_album_art(release_id, generation))
                         
-                        if genres:
-                            self.root.after(0, lambda: self.genre_var.set(", ".join(genres[:2])))
-            except Exception as e:
-                print(f"Error fetching metadata from MusicBrainz: {str(e)}")
+                        # Also fetch more detailed release info including track position
+                        follow_ups.append(self._fetch_release_details(release_id, recording['id'], generation))
+                
+                # Get genre from tags
+                if 'tag-list' in recording:
+                    genres = []
+                    for tag in recording['tag-list']:
+                        if tag.get('name') and tag.get('count', 0) > 0:
+                            # Only use tags that might be genres
+                            tag_name = tag['name'].lower()
+                            if tag_name in ['rock', 'pop', 'jazz', 'classical', 'electronic', 'hip-hop', 'rap', 
+                                          'metal', 'country', 'folk', 'blues', 'r&b', 'reggae', 'indie', 
+                                          'dance', 'ambient', 'punk', 'latin']:
+                                genres.append(tag['name'])
+                    
+                    if genres:
+                        self._on_selection_ui(generation, lambda: self.genre_var.set(", ".join(genres[:2])))
+                
+                await asyncio.gather(*follow_ups)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"Error in metadata fetching: {str(e)}")
-            self.root.after(0, lambda: self.status_var.set("Error fetching metadata"))
+            print(f"Error fetching metadata from MusicBrainz: {str(e)}")
+            self._on_selection_ui(generation, lambda: self.status_var.set("Error fetching metadata"))
     
-    def _fetch_itunes_metadata(self, artist, title):
+    async def _fetch_itunes_metadata(self, artist, title, generation):
         """Fetch metadata from iTunes API as a fallback"""
         try:
-            search_query = f"{artist} {title}"
-            itunes_url = f"https://itunes.apple.com/search?term={search_query.replace(' ', '+')}&media=music&limit=1"
-            
-            response = requests.get(itunes_url)
+            itunes_url = self._itunes_search_url(artist, title)
+            response = await self.async_runner.run_blocking("itunes.apple.com", cached_get, itunes_url, source='itunes')
             if response.status_code == 200:
                 data = response.json()
                 if data.get('resultCount', 0) > 0:
@@ -661,172 +3063,159 @@ class MusicLibraryExtender:
                     
                     # Set album
                     if result.get('collectionName'):
-                        self.root.after(0, lambda: self.album_var.set(result['collectionName']))
+                        self._on_selection_ui(generation, lambda: self.album_var.set(result['collectionName']))
                     
                     # Set year
                     if result.get('releaseDate'):
                         year_match = re.match(r'(\d{4})', result['releaseDate'])
                         if year_match:
-                            self.root.after(0, lambda: self.year_var.set(year_match.group(1)))
+                            self._on_selection_ui(generation, lambda: self.year_var.set(year_match.group(1)))
                     
                     # Set genre
                     if result.get('primaryGenreName'):
-                        self.root.after(0, lambda: self.genre_var.set(result['primaryGenreName']))
+                        self._on_selection_ui(generation, lambda: self.genre_var.set(result['primaryGenreName']))
+                    
+                    self._on_selection_ui(generation, lambda: self.status_var.set("Metadata found from iTunes"))
                     
                     # Get artwork
                     if result.get('artworkUrl100'):
                         artwork_url = result['artworkUrl100'].replace('100x100', '600x600')
-                        threading.Thread(target=self._fetch_itunes_art, args=(artwork_url,), daemon=True).start()
-                    
-                    self.root.after(0, lambda: self.status_var.set("Metadata found from iTunes"))
+                        await self._fetch_itunes_art(artwork_url, generation)
                 else:
-                    self.root.after(0, lambda: self.status_var.set("No iTunes metadata found"))
+                    self._on_selection_ui(generation, lambda: self.status_var.set("No iTunes metadata found"))
             else:
-                self.root.after(0, lambda: self.status_var.set("Error fetching iTunes metadata"))
+                self._on_selection_ui(generation, lambda: self.status_var.set("Error fetching iTunes metadata"))
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error fetching iTunes metadata: {str(e)}")
     
-    def _fetch_itunes_art(self, artwork_url):
+    def _fetch_artwork_preview(self, url, preview_size, **fetch_kwargs):
+        """Fetch artwork through the shared store and scale a preview of it (runs on the pool)"""
+        artwork = self.artwork_store.fetch(url, **fetch_kwargs)
+        if not artwork:
+            return None, None
+        return artwork, artwork['image'].resize(preview_size, Image.Resampling.LANCZOS)
+    
+    def _add_artwork_option(self, option, preview=None, use_as_cover=False, only_if_no_cover=False):
+        """Record a fetched artwork option on the Tk thread, optionally showing it"""
+        self.artwork_options.append(option)
+        
+        if use_as_cover:
+            if only_if_no_cover and hasattr(self, 'album_art_data'):
+                preview = None  # Keep showing the cover that was found first
+            else:
+                self.album_art_data = option['data']
+        
+        if preview is not None:
+            self.thumbnail_image = ImageTk.PhotoImage(preview)
+            self.thumbnail_label.config(image=self.thumbnail_image, text="")
+        
+        self._update_artwork_counter()
+    
+    async def _fetch_itunes_art(self, artwork_url, generation):
         """Fetch album art from iTunes"""
         try:
-            response = requests.get(artwork_url)
-            if response.status_code == 200:
-                self.album_art_data = response.content
+            artwork, preview = await self.async_runner.run_blocking(
+                "itunes.apple.com", self._fetch_artwork_preview, artwork_url, (120, 120), source='itunes'
+            )
+            if artwork:
+                self._on_selection_ui(generation, lambda: self._add_artwork_option(dict(artwork, source='iTunes'), preview, use_as_cover=True))
                 
-                self.artwork_options.append({
-                    'source': 'iTunes',
-                    'data': response.content
-                })
-                
-                img_data = BytesIO(response.content)
-                img = Image.open(img_data)
-                img = img.resize((120, 120), Image.Resampling.LANCZOS)
-                
-                self.thumbnail_image = ImageTk.PhotoImage(img)
-                self.root.after(0, lambda: self.thumbnail_label.config(
-                    image=self.thumbnail_image, text=""
-                ))
-                
-                self.root.after(0, lambda: self._update_artwork_counter())
-                
-                print(f"Successfully fetched iTunes artwork, size: {len(response.content) // 1024}KB")
+                print(f"Successfully fetched iTunes artwork, size: {artwork['original_size'] // 1024}KB")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error fetching iTunes album art: {str(e)}")
     
-    def _fetch_album_art(self, release_id):
+    async def _fetch_album_art(self, release_id, generation):
         """Try to get album art from MusicBrainz/Cover Art Archive"""
         try:
             url = f"https://coverartarchive.org/release/{release_id}/front"
-            response = requests.get(url, stream=True)
+            artwork, preview = await self.async_runner.run_blocking(
+                "coverartarchive.org", self._fetch_artwork_preview, url, (120, 120), fetcher=self.musicbrainz.coverart_get
+            )
             
-            if response.status_code == 200:
-                art_data = response.content
+            if artwork:
+                self._on_selection_ui(generation, lambda: self._add_artwork_option(dict(artwork, source='MusicBrainz'), preview,
+                                                            use_as_cover=True, only_if_no_cover=True))
                 
-                self.artwork_options.append({
-                    'source': 'MusicBrainz',
-                    'data': art_data
-                })
-                
-                if not hasattr(self, 'album_art_data'):
-                    self.album_art_data = art_data
-                    
-                    img_data = BytesIO(art_data)
-                    img = Image.open(img_data)
-                    img = img.resize((120, 120), Image.Resampling.LANCZOS)
-                    
-                    self.thumbnail_image = ImageTk.PhotoImage(img)
-                    self.root.after(0, lambda: self.thumbnail_label.config(
-                        image=self.thumbnail_image, text=""
-                    ))
-                
-                self.root.after(0, lambda: self._update_artwork_counter())
-                
-                print(f"Successfully fetched MusicBrainz artwork, size: {len(art_data) // 1024}KB")
+                print(f"Successfully fetched MusicBrainz artwork, size: {artwork['original_size'] // 1024}KB")
                 
                 try:
                     images_url = f"https://coverartarchive.org/release/{release_id}"
-                    images_response = requests.get(images_url)
+                    images_response = await self.async_runner.run_blocking(
+                        "coverartarchive.org", self.musicbrainz.coverart_get, images_url
+                    )
                     if images_response.status_code == 200:
                         images_data = images_response.json()
                         if 'images' in images_data:
+                            additional = []
                             for image in images_data['images']:
                                 if image.get('front') == True:
                                     continue  # Skip front cover, we already have it
                                     
                                 if 'image' in image:
                                     img_url = image['image']
-                                    threading.Thread(target=self._fetch_additional_art, 
-                                                    args=(img_url, f'MusicBrainz ({image.get("types", ["Additional"])[0]})'),
-                                                    daemon=True).start()
+                                    additional.append(self._fetch_additional_art(
+                                        img_url, f'MusicBrainz ({image.get("types", ["Additional"])[0]})', generation
+                                    ))
+                            await asyncio.gather(*additional)
+                except asyncio.CancelledError:
+                    raise
                 except Exception as e:
                     print(f"Error fetching additional MusicBrainz artwork: {str(e)}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error fetching MusicBrainz album art: {str(e)}")
     
-    def _fetch_additional_art(self, url, source):
+    async def _fetch_additional_art(self, url, source, generation):
         """Fetch additional artwork from a URL"""
         try:
-            response = requests.get(url, stream=True)
+            artwork = await self.async_runner.run_blocking(
+                self.async_runner.host_of(url), self.artwork_store.fetch, url, fetcher=self.musicbrainz.coverart_get
+            )
             
-            if response.status_code == 200:
-                self.artwork_options.append({
-                    'source': source,
-                    'data': response.content
-                })
-                
-                self.root.after(0, lambda: self._update_artwork_counter())
+            if artwork:
+                self._on_selection_ui(generation, lambda: self._add_artwork_option(dict(artwork, source=source)))
                 
-                print(f"Successfully fetched additional artwork from {source}, size: {len(response.content) // 1024}KB")
+                print(f"Successfully fetched additional artwork from {source}, size: {artwork['original_size'] // 1024}KB")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error fetching additional artwork: {str(e)}")
     
-    def _load_thumbnail(self):
+    async def _load_thumbnail(self, thumbnail_url, generation):
         try:
-            thumbnail_url = self.selected_video["thumbnail"]
-            
-            if not thumbnail_url:
-                self.root.after(0, lambda: self.thumbnail_label.config(
-                    text="No thumbnail available"
-                ))
-                return
-            
-            response = requests.get(thumbnail_url)
-            if response.status_code != 200:
-                self.root.after(0, lambda: self.thumbnail_label.config(
-                    text="Failed to load thumbnail"
-                ))
-                return
-                
-            img_data = BytesIO(response.content)
-            
             try:
-                img = Image.open(img_data)
-                img = img.resize((120, 90), Image.Resampling.LANCZOS)
+                artwork, preview = await self.async_runner.run_blocking(
+                    self.async_runner.host_of(thumbnail_url), self._fetch_artwork_preview,
+                    thumbnail_url, (120, 90), source='thumbnail'
+                )
+                if not artwork:
+                    self._on_selection_ui(generation, lambda: self.thumbnail_label.config(
+                        text="Failed to load thumbnail"
+                    ))
+                    return
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 print(f"Invalid image data: {str(e)}")
-                self.root.after(0, lambda: self.thumbnail_label.config(
+                self._on_selection_ui(generation, lambda: self.thumbnail_label.config(
                     text="Invalid thumbnail image"
                 ))
                 return
             
-            self.thumbnail_image = ImageTk.PhotoImage(img)
-            
-            self.artwork_options.append({
-                'source': 'Video Thumbnail',
-                'data': response.content
-            })
-            
-            self.root.after(0, lambda: self.thumbnail_label.config(
-                image=self.thumbnail_image, text=""
-            ))
-            
-            self.root.after(0, lambda: self._update_artwork_counter())
+            self._on_selection_ui(generation, lambda: self._add_artwork_option(dict(artwork, source='Video Thumbnail'), preview))
             
-            print(f"Successfully loaded video thumbnail, size: {len(response.content) // 1024}KB")
+            print(f"Successfully loaded video thumbnail, size: {artwork['original_size'] // 1024}KB")
             
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error loading thumbnail: {str(e)}")
-            self.root.after(0, lambda: self.thumbnail_label.config(
+            self._on_selection_ui(generation, lambda: self.thumbnail_label.config(
                 text="Could not load thumbnail"
             ))
     
@@ -857,14 +3246,15 @@ class MusicLibraryExtender:
         artist = self.artist_var.get()
         
         valid_filename = f"{artist} - {title}".replace("/", "-").replace("\\", "-").replace(":", "-")
-        save_path = os.path.join(save_dir, f"{valid_filename}.mp3")
+        output = resolve_audio_output()
+        save_path = os.path.join(save_dir, f"{valid_filename}.{output['format']}")
         
-        threading.Thread(target=self._download_thread, args=(save_path,), daemon=True).start()
+        threading.Thread(target=self._download_thread, args=(save_path, output), daemon=True).start()
         
         self.status_var.set("Download started...")
         self.download_button.config(state=tk.DISABLED)
     
-    def _download_thread(self, save_path):
+    def _download_thread(self, save_path, output):
         try:
             video_url = self.selected_video.get("webpage_url")
             if not video_url:
@@ -876,31 +3266,20 @@ class MusicLibraryExtender:
             with tempfile.TemporaryDirectory() as temp_dir:
                 temp_filename = os.path.join(temp_dir, "audio")
                 
-                # Configure yt-dlp options
-                ydl_opts = {
-                    'format': 'bestaudio/best',
-                    'outtmpl': temp_filename,
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }],
-                    'quiet': True,
-                    'no_warnings': True
-                }
-                
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                pool = get_youtubedl_pool()
+                with pool.instance(pool.output_profile(output, convert=True), outtmpl=temp_filename) as ydl:
                     self.root.after(0, lambda: self.status_var.set("Downloading audio..."))
-                    ydl.download([video_url])
+                    ydl.extract_info(video_url, download=True)
                 
-                downloaded_file = temp_filename + ".mp3"
+                downloaded_file = f"{temp_filename}.{output['format']}"
                 if os.path.exists(downloaded_file):
-                    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+                    # Tag the temp file so the library only ever sees the finished track
+                    self.root.after(0, lambda: self.status_var.set("Setting metadata..."))
+                    metadata_ok = self._set_metadata(downloaded_file)
                     
-                    shutil.copy2(downloaded_file, save_path)
+                    move_into_place(downloaded_file, save_path)
                     
-                    self.root.after(0, lambda: self.status_var.set("Setting metadata..."))
-                    if self._set_metadata(save_path):
+                    if metadata_ok:
                         self.root.after(0, lambda: self.status_var.set(f"Download complete: {os.path.basename(save_path)}"))
                     else:
                         self.root.after(0, lambda: self.status_var.set(f"Download complete but metadata failed: {os.path.basename(save_path)}"))
@@ -911,121 +3290,69 @@ class MusicLibraryExtender:
                     raise Exception("Downloaded file not found")
                 
         except Exception as e:
-            self.root.after(0, lambda: self._show_error(f"Download error: {str(e)}"))
+            message = f"Download error: {str(e)}"
+            self.root.after(0, lambda: self._show_error(message))
             self.root.after(0, lambda: self.download_button.config(state=tk.NORMAL))
     
     def _set_metadata(self, file_path):
-        """Set ID3 metadata for the downloaded MP3 file"""
+        """Tag the downloaded file from the form, in the tag format of its file type"""
         try:
             print(f"Setting metadata for {file_path}")
             
-            try:
-                audio = MP3(file_path)
-                audio.delete()
-                audio.save()
-                print("Deleted existing tags")
-            except Exception as e:
-                print(f"Error clearing tags: {str(e)}")
-            
-            tags = ID3()
-            
-            # Set title
-            if self.title_var.get():
-                tags.add(TIT2(encoding=3, text=self.title_var.get()))
-                print(f"Added title: {self.title_var.get()}")
-            
-            # Set artist
-            if self.artist_var.get():
-                tags.add(TPE1(encoding=3, text=self.artist_var.get()))
-                print(f"Added artist: {self.artist_var.get()}")
-            
-            # Set album if provided
-            if self.album_var.get():
-                tags.add(TALB(encoding=3, text=self.album_var.get()))
-                print(f"Added album: {self.album_var.get()}")
-            
-            # Set year if provided
-            if self.year_var.get():
-                tags.add(TDRC(encoding=3, text=self.year_var.get()))
-                print(f"Added year: {self.year_var.get()}")
-            
-            # Set genre if provided
-            if self.genre_var.get():
-                tags.add(TCON(encoding=3, text=self.genre_var.get()))
-                print(f"Added genre: {self.genre_var.get()}")
-                
-            # Set track number if provided
-            if self.track_var.get():
-                tags.add(TRCK(encoding=3, text=self.track_var.get()))
-                print(f"Added track number: {self.track_var.get()}")
+            metadata = {
+                'title': self.title_var.get(),
+                'artist': self.artist_var.get(),
+                'album': self.album_var.get(),
+                'year': self.year_var.get(),
+                'genre': self.genre_var.get(),
+                'track_number': self.track_var.get(),
+            }
+            for key, value in metadata.items():
+                if value:
+                    print(f"Added {key.replace('_', ' ')}: {value}")
             
             # Add lyrics if provided
             lyrics_text = self.lyrics_text.get(1.0, tk.END).strip()
             if lyrics_text and lyrics_text != "No lyrics found. You can add them manually.":
-                tags.add(USLT(
-                    encoding=3,  # UTF-8
-                    lang='eng',  # Language code (English)
-                    desc='',     # Description
-                    text=lyrics_text
-                ))
+                metadata['lyrics'] = lyrics_text
                 print("Added lyrics to tags")
             
+            # Remember where the track came from so the library index can spot it again
+            if self.selected_video and self.selected_video.get("webpage_url"):
+                metadata['source_url'] = self.selected_video["webpage_url"]
+            if getattr(self, 'recording_id', None):
+                metadata['recording_id'] = self.recording_id
+            
             # Add album art if we have it
-            has_art = self._add_album_art_to_tags(tags)
-            if has_art:
+            artwork = self._album_art_for_tags()
+            if artwork:
                 print("Added album art to tags")
             
-            # Save the tags to the file
-            tags.save(file_path)
+            # Save the tags to the file; this replaces any existing tags in one write
+            write_audio_tags(file_path, metadata, artwork)
             print("Tags saved to file")
-            
-            # Verify that the tags were added correctly
-            try:
-                verification = ID3(file_path)
-                if verification:
-                    print("Tag verification successful")
-                    return True
-                else:
-                    print("Tag verification failed - no tags found")
-                    return False
-            except Exception as e:
-                print(f"Tag verification error: {str(e)}")
-                return False
+            return True
                 
         except Exception as e:
             print(f"Error setting metadata: {str(e)}")
-            self.root.after(0, lambda: self._show_error(f"Metadata error: {str(e)}"))
+            message = f"Metadata error: {str(e)}"
+            self.root.after(0, lambda: self._show_error(message))
             return False
     
-    def _add_album_art_to_tags(self, tags):
-        """Add album art to ID3 tags"""
+    def _album_art_for_tags(self):
+        """Pick the album art to embed, returning the image data or None"""
         try:
             # First try to use album art we found from MusicBrainz or iTunes if available
             if hasattr(self, 'album_art_data'):
                 print("Using previously fetched album art")
-                tags.add(APIC(
-                    encoding=3,  # UTF-8
-                    mime='image/jpeg',
-                    type=3,  # Cover image
-                    desc='Cover',
-                    data=self.album_art_data
-                ))
-                return True
+                return self.album_art_data
             
             # If not, try to use the thumbnail from the video
             if self.selected_video and self.selected_video["thumbnail"]:
                 print("Using video thumbnail as album art")
-                response = requests.get(self.selected_video["thumbnail"])
-                if response.status_code == 200:
-                    # Add the image to the ID3 tag
-                    tags.add(APIC(
-                        encoding=3,  # UTF-8
-                        mime='image/jpeg',
-                        type=3,  # Cover image
-                        desc='Cover',
-                        data=response.content
-                    ))
-                    return True
+                artwork = self.artwork_store.fetch(self.selected_video["thumbnail"], source='thumbnail')
+                if artwork:
+                    return artwork['data']
             
             # If that failed, try to search for album art via iTunes API directly
             try:
@@ -1033,7 +3360,7 @@ class MusicLibraryExtender:
                 print(f"Searching iTunes for album art with query: {search_query}")
                 itunes_url = f"https://itunes.apple.com/search?term={search_query.replace(' ', '+')}&media=music&limit=1"
                 
-                response = requests.get(itunes_url)
+                response = cached_get(itunes_url, source='itunes')
                 if response.status_code == 200:
                     data = response.json()
                     if data.get('resultCount', 0) > 0:
@@ -1043,25 +3370,18 @@ class MusicLibraryExtender:
                             # Get larger image (replace '100x100' with '600x600')
                             artwork_url = artwork_url.replace('100x100', '600x600')
                             print(f"Found iTunes artwork: {artwork_url}")
-                            img_response = requests.get(artwork_url)
-                            if img_response.status_code == 200:
-                                tags.add(APIC(
-                                    encoding=3,
-                                    mime='image/jpeg',
-                                    type=3,
-                                    desc='Cover',
-                                    data=img_response.content
-                                ))
-                                return True
+                            artwork = self.artwork_store.fetch(artwork_url, source='itunes')
+                            if artwork:
+                                return artwork['data']
             except Exception as e:
                 print(f"Error in iTunes album art fallback: {str(e)}")
             
             print("No album art could be found")
-            return False
+            return None
             
         except Exception as e:
             print(f"Error adding album art to tags: {str(e)}")
-            return False
+            return None
     
     def _show_error(self, message):
         messagebox.showerror("Error", message)
@@ -1084,31 +3404,24 @@ class MusicLibraryExtender:
             
         self.status_var.set(f"Fetching lyrics for {artist} - {title}...")
         
-        threading.Thread(target=self._fetch_lyrics_thread, args=(artist, title), daemon=True).start()
+        if self.lyrics_task:
+            self.lyrics_task.cancel()
+        self.lyrics_task = self.async_runner.submit(self._fetch_lyrics_task(artist, title, self.selection_generation))
     
-    def _fetch_lyrics_thread(self, artist, title):
-        """Thread to fetch lyrics from various sources"""
-        lyrics = None
-        source = None
-        
+    async def _fetch_lyrics_task(self, artist, title, generation):
+        """Fetch lyrics from various sources"""
         try:
-            # Try Genius API first
-            lyrics, source = self._fetch_lyrics_from_genius(artist, title)
-                
-            if not lyrics:
-                # Try Musixmatch as second option
-                lyrics, source = self._fetch_lyrics_from_musixmatch(artist, title)
+            lyrics, source = await self.async_runner.run_blocking("lyrics", self.lyrics_engine.fetch, artist, title)
                 
-            if not lyrics:
-                # Try lyrics.ovh as a third option
-                lyrics, source = self._fetch_lyrics_from_lyricsovh(artist, title)
-                
-            # Update the UI with the lyrics
-            self.root.after(0, lambda: self._update_lyrics_ui(lyrics, source))
+            # Update the UI with the lyrics, unless another video has been selected meanwhile
+            self._on_selection_ui(generation, lambda: self._update_lyrics_ui(lyrics, source))
             
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error fetching lyrics: {str(e)}")
-            self.root.after(0, lambda: self.status_var.set(f"Error fetching lyrics: {str(e)}"))
+            message = f"Error fetching lyrics: {str(e)}"
+            self._on_selection_ui(generation, lambda: self.status_var.set(message))
             
     def _fetch_lyrics_from_genius(self, artist, title):
         """Fetch lyrics from Genius via their API (search only) and web scraping"""
@@ -1120,7 +3433,7 @@ class MusicLibraryExtender:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            response = requests.get(search_url, headers=headers)
+            response = cached_get(search_url, source='lyrics', headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 
@@ -1131,7 +3444,7 @@ class MusicLibraryExtender:
                                 song = section['hits'][0]['result']
                                 song_url = song['url']
                                 
-                                song_response = requests.get(song_url, headers=headers)
+                                song_response = cached_get(song_url, source='lyrics', headers=headers)
                                 if song_response.status_code == 200:
                                     import re
                                     html_content = song_response.text
@@ -1167,7 +3480,7 @@ class MusicLibraryExtender:
             search_query = f"{artist} {title}".replace(' ', '%20')
             search_url = f"https://api.musixmatch.com/ws/1.1/matcher.lyrics.get?format=json&q_track={title}&q_artist={artist}&apikey=2d782bc7a52a41ba2fc1ef05b9cf40d7"
             
-            response = requests.get(search_url)
+            response = cached_get(search_url, source='lyrics')
             if response.status_code == 200:
                 data = response.json()
                 
@@ -1191,7 +3504,7 @@ class MusicLibraryExtender:
         try:
             api_url = f"https://api.lyrics.ovh/v1/{artist.replace(' ', '%20')}/{title.replace(' ', '%20')}"
             
-            response = requests.get(api_url, timeout=10)
+            response = cached_get(api_url, source='lyrics', timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 
@@ -1256,11 +3569,13 @@ class MusicLibraryExtender:
             
             self.status_var.set("No lyrics found")
     
-    def _fetch_release_details(self, release_id, recording_id):
+    async def _fetch_release_details(self, release_id, recording_id, generation):
         """Fetch more detailed release info from MusicBrainz including track position"""
         try:
             # Get full release info with MusicBrainz API
-            release = musicbrainzngs.get_release_by_id(release_id, includes=["recordings", "media"])
+            release = await self.async_runner.run_blocking(
+                "musicbrainz.org", self.musicbrainz.get_release_by_id, release_id, includes=["recordings", "media"]
+            )
             
             if not release or 'release' not in release:
                 print(f"No detailed release info found for {release_id}")
@@ -1281,49 +3596,84 @@ class MusicLibraryExtender:
                                 if track_num:
                                     # Format as "disc/track" if multi-disc release, otherwise just track number
                                     track_number = f"{disc_num}/{track_num}" if int(disc_num) > 1 else track_num
-                                    self.root.after(0, lambda tn=track_number: self.track_var.set(tn))
+                                    self._on_selection_ui(generation, lambda tn=track_number: self.track_var.set(tn))
                                     print(f"Found detailed track position from MusicBrainz: {track_number}")
                                     return
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error fetching detailed release info from MusicBrainz: {str(e)}")
         
 class CLIHandler:
     """Command line interface handler for MusicLibraryExtender"""
     
-    def __init__(self):
+    # Seconds each metadata provider may take, counted from the start of the lookup.
+    # METADATA_DEADLINE caps the whole lookup, whatever the providers are given.
+    PROVIDER_DEADLINES = {"musicbrainz": 20, "itunes": 10, "lyrics": 20}
+    METADATA_DEADLINE = 20
+    # Threads per provider; each has its own pool so one that hangs cannot starve the others
+    PROVIDER_WORKERS = 6
+    
+    # Fields the retag command can fill, and the metadata key behind each
+    RETAG_FIELDS = {
+        "title": "title",
+        "artist": "artist",
+        "album": "album",
+        "year": "year",
+        "genre": "genre",
+        "track": "track_number",
+        "lyrics": "lyrics",
+        "artwork": "artwork_url",
+    }
+    RETAG_DEFAULT_FIELDS = ("album", "year", "genre", "track", "lyrics", "artwork")
+    
+    def __init__(self, use_cache=True):
+        from rich.console import Console
+        
         self.config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
         self.config = configparser.ConfigParser()
         self.library_location = os.path.join(os.path.expanduser("~"), "Music")
         self.load_settings()
+        self.use_cache = use_cache
+        configure_http_cache(self.config, enabled=use_cache)
+        configure_http_session(self.config)
+        configure_search_cache(self.config)
+        configure_audio_output(self.config)
+        self.artwork_store = configure_artwork_store(self.config)
         
-        # Initialize MusicBrainz API for metadata
-        musicbrainzngs.set_useragent("MusicLibraryExtender", "1.0.0", "https://github.com/TheBeaconCrafter/MusicLibraryExtender")
+        # MusicBrainz API for metadata; musicbrainzngs itself is set up on the first lookup
+        self.musicbrainz = get_musicbrainz_client()
         
         self.console = Console()
-        self.last_search_results = []
         
-        # Load cached search results if they exist
-        self.search_cache_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".search_cache.json")
-        self._load_search_cache()
-    
-    def _load_search_cache(self):
-        """Load cached search results from file"""
-        try:
-            if os.path.exists(self.search_cache_file):
-                with open(self.search_cache_file, 'r') as f:
-                    self.last_search_results = json.load(f)
-                    self.console.print(f"[dim]Loaded {len(self.last_search_results)} cached search results[/dim]")
-        except Exception as e:
-            self.console.print(f"[yellow]Could not load search cache: {e}[/yellow]")
-            self.last_search_results = []
-            
-    def _save_search_cache(self):
-        """Save search results to cache file"""
-        try:
-            with open(self.search_cache_file, 'w') as f:
-                json.dump(self.last_search_results, f)
-        except Exception as e:
-            self.console.print(f"[yellow]Could not save search cache: {e}[/yellow]")
+        self.library_indexes = {}
+        # Libraries whose index was brought up to date during this run
+        self.scanned_libraries = set()
+        self.library_indexes_lock = threading.Lock()
+        
+        # Opened on first use, so commands that never download don't create the queue file
+        self.download_queue_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".download_queue.sqlite")
+        self._download_queue = None
+        self._download_queue_lock = threading.Lock()
+        
+        # Shared by every lookup so batch workers don't each spawn their own threads
+        self.provider_pools = {name: ThreadPoolExecutor(max_workers=self.PROVIDER_WORKERS, thread_name_prefix=f"metadata-{name}")
+                               for name in self.PROVIDER_DEADLINES}
+        
+        self.lyrics_engine = LyricsEngine.from_config(self.config, {
+            'genius': self._fetch_lyrics_from_genius,
+            'musixmatch': self._fetch_lyrics_from_musixmatch,
+            'lyricsovh': self._fetch_lyrics_from_lyricsovh,
+        }, stats_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".lyrics_stats.json"))
+
+    
+    @property
+    def download_queue(self):
+        """The persistent download queue, opened the first time it is needed"""
+        with self._download_queue_lock:
+            if self._download_queue is None:
+                self._download_queue = DownloadQueue(self.download_queue_file)
+            return self._download_queue
     
     def load_settings(self):
         """Load settings from the config file or use defaults"""
@@ -1351,100 +3701,121 @@ class CLIHandler:
         except Exception as e:
             self.console.print(f"[red]Error saving settings: {e}[/red]")
     
-    def search_videos(self, query, limit=10, json_output=False):
-        """Search for videos and display results"""
-        self.console.print(f"[bold blue]Searching for:[/bold blue] {query}")
+    def _ytdlp_search(self, query, limit=10, start=0):
+        """Search YouTube using yt-dlp and return the result entries"""
+        search = YouTubeSearch(query, start)
+        try:
+            return search.page(limit)
+        finally:
+            search.close()
+    
+    def search_results(self, query, limit=10, page=1):
+        """Return one page of results without printing, as {"result_set", "results", "more"}"""
+        start = (page - 1) * limit
+        cache = get_search_cache()
+        cached = cache.lookup(query, start, limit) if cache and self.use_cache else None
+        if cached:
+            set_id, results = cached
+            return {"result_set": set_id, "results": results, "more": len(results) >= limit}
         
+        search = YouTubeSearch(query, start=start)
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': 'in_playlist',
-                'default_search': f'ytsearch{limit}',
-            }
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(f"ytsearch{limit}:{query}", download=False)
-                if 'entries' in info:
-                    results = []
-                    
-                    for i, entry in enumerate(info['entries']):
-                        if not entry:
-                            continue
-                            
-                        duration_secs = entry.get('duration', 0)
-                        duration = time.strftime('%M:%S', time.gmtime(duration_secs)) if duration_secs else 'Unknown'
-                        
-                        video_url = entry.get('webpage_url')
-                        if not video_url and entry.get('id'):
-                            video_url = f"https://www.youtube.com/watch?v={entry['id']}"
-                            
-                        result = {
-                            "id": entry['id'],
-                            "title": entry.get('title', 'Unknown Title'),
-                            "channel": entry.get('uploader', 'Unknown Uploader'),
-                            "duration": duration,
-                            "thumbnail": entry.get('thumbnail'),
-                            "webpage_url": video_url
-                        }
-                        results.append(result)
-                    
-                    # Store results for later use
-                    self.last_search_results = results
-                    # Save to cache file for persistence between commands
-                    self._save_search_cache()
-                    
-                    if json_output:
-                        print(json.dumps(results, indent=2))
-                    else:
-                        table = Table(title="Search Results")
-                        table.add_column("#", justify="right", style="cyan", no_wrap=True)
-                        table.add_column("Title", style="white")
-                        table.add_column("Channel", style="green")
-                        table.add_column("Duration", justify="right", style="blue")
-                        table.add_column("URL", style="magenta")
-                        
-                        for i, video in enumerate(results):
-                            table.add_row(
-                                str(i+1),
-                                video["title"],
-                                video["channel"],
-                                video["duration"],
-                                video["webpage_url"]
-                            )
-                        
-                        self.console.print(table)
-                    
-                    return results
+            results = search.page(limit)
+        finally:
+            search.close()
+        
+        set_id = cache.store(query, start, limit, results) if cache and results else None
+        return {"result_set": set_id, "results": results, "more": not search.exhausted}
+    
+    def _search_table(self, page):
+        from rich.table import Table
+        
+        table = Table(title="Search Results" if page == 1 else f"Search Results (page {page})")
+        table.add_column("#", justify="right", style="cyan", no_wrap=True)
+        table.add_column("Title", style="white")
+        table.add_column("Channel", style="green")
+        table.add_column("Duration", justify="right", style="blue")
+        table.add_column("URL", style="magenta")
+        return table
+    
+    @staticmethod
+    def _add_search_row(table, number, video):
+        table.add_row(str(number), video["title"], video["channel"], video["duration"], video["webpage_url"])
+    
+    def search_videos(self, query, limit=10, json_output=False, page=1):
+        """Search for videos and display results as they arrive"""
+        from rich.live import Live
+        
+        self.console.print(f"[bold blue]Searching for:[/bold blue] {query}" + (f" [dim](page {page})[/dim]" if page > 1 else ""))
+        
+        start = (page - 1) * limit
+        cache = get_search_cache()
+        cached = cache.lookup(query, start, limit) if cache and self.use_cache else None
+        
+        streamed = False
+        if cached:
+            set_id, results = cached
+            exhausted = len(results) < limit
+            if not json_output:
+                self.console.print("[dim]Using cached results[/dim]")
+        else:
+            # Earlier pages are skipped as flat entries without being resolved or shown
+            search = YouTubeSearch(query, start=start)
+            results = []
+            try:
+                if json_output or not self.console.is_terminal:
+                    results = search.page(limit)
                 else:
-                    self.console.print("[red]No results found[/red]")
-                    return []
-        except Exception as e:
-            self.console.print(f"[red]Search error: {str(e)}[/red]")
+                    streamed = True
+                    table = self._search_table(page)
+                    with Live(table, console=self.console, refresh_per_second=8):
+                        for video in search.iter_page(limit):
+                            results.append(video)
+                            self._add_search_row(table, len(results), video)
+            except Exception as e:
+                self.console.print(f"[red]Search error: {str(e)}[/red]")
+                return []
+            finally:
+                search.close()
+            exhausted = search.exhausted
+            
+            # Saved even with --no-cache so the numbers in the table can be downloaded
+            set_id = cache.store(query, start, limit, results) if cache and results else None
+        
+        if results and not json_output and not streamed:
+            table = self._search_table(page)
+            for i, video in enumerate(results):
+                self._add_search_row(table, i + 1, video)
+            self.console.print(table)
+        
+        if not results:
+            self.console.print("[red]No results found[/red]")
             return []
-    
-    def get_metadata(self, artist, title):
-        """Fetch metadata for the specified artist and title"""
-        self.console.print(f"[bold blue]Looking up metadata for:[/bold blue] {artist} - {title}")
         
-        metadata = {
-            "artist": artist,
-            "title": title,
-            "album": "",
-            "year": "",
-            "genre": "",
-            "track_number": "",
-            "artwork_url": None,
-            "lyrics": None
-        }
+        if json_output:
+            print(json.dumps(results, indent=2))
+            if set_id is not None:
+                print(f"Result set {set_id}", file=sys.stderr)
+        else:
+            if set_id is not None:
+                self.console.print(f"[dim]Result set {set_id}: download with 'download <number>' "
+                                   f"or 'download <number> --results {set_id}'[/dim]")
+            if not exhausted:
+                self.console.print(f"[dim]More results: add --page {page + 1}[/dim]")
+        
+        return results
+    
+    def _lookup_musicbrainz(self, artist, title, priority=PRIORITY_INTERACTIVE):
+        """Look up album, year, track, genre and cover art on MusicBrainz"""
+        metadata = {}
         
-        # Try to get metadata from MusicBrainz
         try:
             search_query = f"artist:{artist} AND recording:{title}"
-            result = musicbrainzngs.search_recordings(query=search_query, limit=1)
+            result = self.musicbrainz.search_recordings(search_query, limit=1, priority=priority)
             
             if result and 'recording-list' in result and result['recording-list']:
                 recording = result['recording-list'][0]
+                metadata["recording_id"] = recording.get('id')
                 
                 if 'release-list' in recording and recording['release-list']:
                     release = recording['release-list'][0]
@@ -1478,8 +3849,8 @@ class CLIHandler:
                         try:
                             # Check if artwork exists
                             url = f"https://coverartarchive.org/release/{release_id}/front-500"
-                            response = requests.head(url)
-                            if response.status_code == 307:  # Redirect to the actual image
+                            response = self.musicbrainz.coverart_head(url, priority=priority)
+                            if response.status_code in (200, 307):  # Redirect to the actual image (or the image itself)
                                 metadata["artwork_url"] = url
                         except Exception as e:
                             self.console.print(f"[yellow]Error checking artwork: {str(e)}[/yellow]")
@@ -1501,46 +3872,131 @@ class CLIHandler:
         except Exception as e:
             self.console.print(f"[yellow]MusicBrainz error: {str(e)}[/yellow]")
         
-        # If we didn't get metadata from MusicBrainz, try iTunes
-        if not metadata["album"] or not metadata["year"] or not metadata["genre"]:
-            try:
-                search_query = f"{artist} {title}"
-                itunes_url = f"https://itunes.apple.com/search?term={search_query.replace(' ', '+')}&media=music&limit=1"
-                
-                response = requests.get(itunes_url)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('resultCount', 0) > 0:
-                        result = data['results'][0]
-                        
-                        # Set album if not already set
-                        if not metadata["album"] and result.get('collectionName'):
-                            metadata["album"] = result['collectionName']
-                        
-                        # Set year if not already set
-                        if not metadata["year"] and result.get('releaseDate'):
-                            year_match = re.match(r'(\d{4})', result['releaseDate'])
-                            if year_match:
-                                metadata["year"] = year_match.group(1)
-                        
-                        # Set genre if not already set
-                        if not metadata["genre"] and result.get('primaryGenreName'):
-                            metadata["genre"] = result['primaryGenreName']
-                        
-                        # Set artwork URL if not already set
-                        if not metadata["artwork_url"] and result.get('artworkUrl100'):
-                            metadata["artwork_url"] = result['artworkUrl100'].replace('100x100', '600x600')
+        return metadata
+    
+    def _lookup_itunes(self, artist, title):
+        """Look up album, year, genre and artwork on the iTunes Search API"""
+        metadata = {}
+        
+        try:
+            search_query = f"{artist} {title}"
+            itunes_url = f"https://itunes.apple.com/search?term={search_query.replace(' ', '+')}&media=music&limit=1"
             
-            except Exception as e:
-                self.console.print(f"[yellow]iTunes API error: {str(e)}[/yellow]")
+            # A request that outlives the deadline would only keep a pool thread busy
+            response = cached_get(itunes_url, source='itunes', timeout=self.PROVIDER_DEADLINES["itunes"])
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('resultCount', 0) > 0:
+                    result = data['results'][0]
+                    
+                    if result.get('collectionName'):
+                        metadata["album"] = result['collectionName']
+                    
+                    if result.get('releaseDate'):
+                        year_match = re.match(r'(\d{4})', result['releaseDate'])
+                        if year_match:
+                            metadata["year"] = year_match.group(1)
+                    
+                    if result.get('primaryGenreName'):
+                        metadata["genre"] = result['primaryGenreName']
+                    
+                    if result.get('artworkUrl100'):
+                        metadata["artwork_url"] = result['artworkUrl100'].replace('100x100', '600x600')
         
-        # Get lyrics
+        except Exception as e:
+            self.console.print(f"[yellow]iTunes API error: {str(e)}[/yellow]")
+        
+        return metadata
+    
+    def _lookup_lyrics(self, artist, title):
+        """Look up lyrics from the lyrics providers"""
         try:
             lyrics = self._fetch_lyrics(artist, title)
             if lyrics:
-                metadata["lyrics"] = lyrics
+                return {"lyrics": lyrics}
         except Exception as e:
             self.console.print(f"[yellow]Lyrics fetching error: {str(e)}[/yellow]")
+        return {}
+    
+    def download_metadata(self, artist=None, title=None, album=None, year=None, genre=None, track=None,
+                          skip_metadata=False):
+        """Metadata for the download command from the tags given on the command line
+        
+        With artist and title but no album, year or genre, the rest is looked up online
+        unless skip_metadata is set; values given explicitly always win.
+        """
+        metadata = {}
+        if artist:
+            metadata['artist'] = artist
+        if title:
+            metadata['title'] = title
+        if album:
+            metadata['album'] = album
+        if year:
+            metadata['year'] = year
+        if genre:
+            metadata['genre'] = genre
+        if track:
+            metadata['track_number'] = track
+            
+        # If we have artist and title but not other metadata, and auto metadata is not disabled
+        if not skip_metadata and artist and title and not (album or year or genre):
+            self.console.print("[yellow]No complete metadata provided. Fetching from online sources...[/yellow]")
+            fetched_metadata = self.get_metadata(artist, title)
+            
+            # Update with fetched metadata but keep user-provided values
+            for key, value in fetched_metadata.items():
+                if key not in ['artist', 'title'] and value and key not in metadata:
+                    metadata[key] = value
+        
+        return metadata
+    
+    def get_metadata(self, artist, title, priority=PRIORITY_INTERACTIVE, quiet=False):
+        """Fetch metadata for the specified artist and title"""
+        if not quiet:
+            self.console.print(f"[bold blue]Looking up metadata for:[/bold blue] {artist} - {title}")
+        
+        metadata = {
+            "artist": artist,
+            "title": title,
+            "album": "",
+            "year": "",
+            "genre": "",
+            "track_number": "",
+            "artwork_url": None,
+            "lyrics": None
+        }
+        
+        # The providers are independent, so query them all at once
+        providers = {
+            "musicbrainz": functools.partial(self._lookup_musicbrainz, priority=priority),
+            "itunes": self._lookup_itunes,
+            "lyrics": self._lookup_lyrics,
+        }
+        start = time.monotonic()
+        futures = {name: self.provider_pools[name].submit(func, artist, title) for name, func in providers.items()}
+        
+        results = {}
+        for name, future in futures.items():
+            deadline = start + min(self.PROVIDER_DEADLINES[name], self.METADATA_DEADLINE)
+            try:
+                results[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FuturesTimeoutError:
+                future.cancel()
+                self.console.print(f"[yellow]{name} lookup timed out[/yellow]")
+                results[name] = {}
+            except Exception as e:
+                self.console.print(f"[yellow]{name} lookup error: {str(e)}[/yellow]")
+                results[name] = {}
+        
+        # MusicBrainz has priority, iTunes only fills the gaps
+        for name in ("musicbrainz", "itunes", "lyrics"):
+            for key, value in results[name].items():
+                if value and not metadata.get(key):
+                    metadata[key] = value
+        
+        if quiet:
+            return metadata
         
         # Print collected metadata
         self.console.print("\n[bold green]Metadata Results:[/bold green]")
@@ -1562,17 +4018,10 @@ class CLIHandler:
     
     def _fetch_lyrics(self, artist, title):
         """Try to fetch lyrics from multiple sources"""
-        lyrics_sources = [
-            self._fetch_lyrics_from_genius,
-            self._fetch_lyrics_from_musixmatch,
-            self._fetch_lyrics_from_lyricsovh
-        ]
-        
-        for source_func in lyrics_sources:
-            lyrics, source = source_func(artist, title)
-            if lyrics:
-                self.console.print(f"[green]Lyrics found from {source}[/green]")
-                return lyrics
+        lyrics, source = self.lyrics_engine.fetch(artist, title)
+        if lyrics:
+            self.console.print(f"[green]Lyrics found from {source}[/green]")
+            return lyrics
         
         return None
     
@@ -1586,7 +4035,7 @@ class CLIHandler:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            response = requests.get(search_url, headers=headers)
+            response = cached_get(search_url, source='lyrics', headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 
@@ -1597,7 +4046,7 @@ class CLIHandler:
                                 song = section['hits'][0]['result']
                                 song_url = song['url']
                                 
-                                song_response = requests.get(song_url, headers=headers)
+                                song_response = cached_get(song_url, source='lyrics', headers=headers)
                                 if song_response.status_code == 200:
                                     html_content = song_response.text
                                     
@@ -1632,7 +4081,7 @@ class CLIHandler:
             search_query = f"{artist} {title}".replace(' ', '%20')
             search_url = f"https://api.musixmatch.com/ws/1.1/matcher.lyrics.get?format=json&q_track={title}&q_artist={artist}&apikey=2d782bc7a52a41ba2fc1ef05b9cf40d7"
             
-            response = requests.get(search_url)
+            response = cached_get(search_url, source='lyrics')
             if response.status_code == 200:
                 data = response.json()
                 
@@ -1656,7 +4105,7 @@ class CLIHandler:
         try:
             api_url = f"https://api.lyrics.ovh/v1/{artist.replace(' ', '%20')}/{title.replace(' ', '%20')}"
             
-            response = requests.get(api_url, timeout=10)
+            response = cached_get(api_url, source='lyrics', timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 
@@ -1669,23 +4118,41 @@ class CLIHandler:
             self.console.print(f"[yellow]Error fetching lyrics from Lyrics.ovh: {str(e)}[/yellow]")
             return None, None
     
-    def download_song(self, url_or_id, metadata=None, output_dir=None):
-        """Download a song with the given metadata"""
+    def download_song(self, url_or_id, metadata=None, output_dir=None, show_progress=True, priority=PRIORITY_INTERACTIVE,
+                      skip_existing=False, result_set=None, output=None):
+        """Download a song with the given metadata, returning the saved path or False
+        
+        A number picks that entry of a cached search result set: result_set if given,
+        otherwise the set shown most recently. output is the format and quality from
+        resolve_audio_output(); the [Output] config section is used when it is None.
+        
+        With skip_existing, tracks the library index already knows (by video ID, MusicBrainz
+        recording or artist/title) are not downloaded again and their existing path is returned.
+        """
         # Check if input is a number (index from search results)
         try:
             if isinstance(url_or_id, str) and url_or_id.isdigit():
                 index = int(url_or_id) - 1  # Convert from 1-based to 0-based indexing
                 
-                if not self.last_search_results:
-                    self.console.print("[red]No search results available. Please search first with 'search' command.[/red]")
+                cache = get_search_cache()
+                found = None
+                if cache:
+                    found = cache.get(result_set) if result_set is not None else cache.latest()
+                if not found:
+                    if result_set is not None:
+                        self.console.print(f"[red]Search result set {result_set} is no longer cached. Please search again.[/red]")
+                    else:
+                        self.console.print("[red]No search results available. Please search first with 'search' command.[/red]")
                     return False
                 
-                if index < 0 or index >= len(self.last_search_results):
-                    self.console.print(f"[red]Invalid index {index+1}. Available range: 1-{len(self.last_search_results)}[/red]")
+                set_id, search_results = found
+                if index < 0 or index >= len(search_results):
+                    self.console.print(f"[red]Invalid index {index+1}. Available range: 1-{len(search_results)} "
+                                       f"(result set {set_id})[/red]")
                     return False
                     
                 # Get the video from search results
-                video = self.last_search_results[index]
+                video = search_results[index]
                 self.console.print(f"[green]Selected: {video['title']} by {video['channel']}[/green]")
                 url_or_id = video["webpage_url"]
                 
@@ -1712,7 +4179,7 @@ class CLIHandler:
                     
                     # Get enhanced metadata like in the GUI
                     self.console.print(f"[bold blue]Fetching metadata for:[/bold blue] {artist} - {title}")
-                    enhanced_metadata = self.get_metadata(artist, title)
+                    enhanced_metadata = self.get_metadata(artist, title, priority=priority)
                     
                     # Merge with the metadata we already have
                     for key, value in enhanced_metadata.items():
@@ -1729,181 +4196,971 @@ class CLIHandler:
         if not output_dir:
             output_dir = self.library_location
             
-        if not os.path.exists(output_dir):
-            try:
-                os.makedirs(output_dir)
-            except Exception as e:
-                self.console.print(f"[red]Could not create output directory: {str(e)}[/red]")
-                return False
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+        except Exception as e:
+            self.console.print(f"[red]Could not create output directory: {str(e)}[/red]")
+            return False
+                
+        # If just an ID is provided, construct the URL
+        if not url_or_id.startswith(('http://', 'https://')):
+            url_or_id = f"https://www.youtube.com/watch?v={url_or_id}"
+        
+        library_index = self.get_library_index(output_dir) if skip_existing else None
+        if library_index:
+            existing = library_index.find_by_video_id(extract_video_id(url_or_id))
+            if existing:
+                self.console.print(f"[dim]Already in library: {existing}[/dim]")
+                return existing
+        
+        # Re-running a download that was interrupted picks up its job where it stopped
+        try:
+            job_id = self.download_queue.add(url_or_id, output_dir, metadata, output or resolve_audio_output())
+        except ValueError as e:
+            self.console.print(f"[yellow]{url_or_id}: {e}[/yellow]")
+            return False
+        job =self.download_queue.claim(job_id)
+        if not job:
+            self.console.print(f"[yellow]{url_or_id} is already being downloaded by another run[/yellow]")
+            return False
+        return self._run_download_job(job, show_progress=show_progress, priority=priority, skip_existing=skip_existing)
+    
+    def _resolve_job_metadata(self, url, metadata, priority):
+        """Fill in metadata for a download from the video title and the metadata providers
+        
+        Returns (metadata, info). info is the unprocessed yt-dlp extraction when the video page
+        had to be fetched for its title, so the download can reuse it instead of fetching again.
+        """
+        info = None
+        
+        # If no metadata provided, extract some basic info from the video
+        if not metadata:
+            metadata = {}
+            try:
+                with get_youtubedl_pool().instance('audio') as ydl:
+                    # Unprocessed, so format selection happens once, at download time
+                    info = ydl.extract_info(url, download=False, process=False)
+                    title_parts = info['title'].split(" - ")
+                    
+                    if len(title_parts) > 1:
+                        metadata["artist"] = title_parts[0].strip()
+                        metadata["title"] = " - ".join(title_parts[1:]).strip()
+                        metadata["title"] = re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', metadata["title"]).strip()
+                    else:
+                        metadata["artist"] = info.get('uploader', 'Unknown')
+                        metadata["title"] = title_parts[0].strip()
+                        metadata["title"] = re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', metadata["title"]).strip()
+                
+                # Fetch additional metadata just like in the GUI
+                artist = metadata.get("artist", "")
+                title = metadata.get("title", "")
+                if artist and title:
+                    self.console.print(f"[bold blue]Fetching metadata for:[/bold blue] {artist} - {title}")
+                    enhanced_metadata = self.get_metadata(artist, title, priority=priority)
+                    
+                    # Merge with the metadata we already have
+                    for key, value in enhanced_metadata.items():
+                        if key not in ['artist', 'title'] or not metadata.get(key):
+                            metadata[key] = value
+                    
+            except Exception as e:
+                self.console.print(f"[yellow]Could not extract video info: {str(e)}[/yellow]")
+                metadata["artist"] = "Unknown"
+                metadata["title"] = "Unknown"
+        
+        metadata.setdefault("source_url", url)
+        return metadata, info
+    
+    def _run_download_job(self, job, show_progress=True, priority=PRIORITY_INTERACTIVE, skip_existing=False):
+        """Take a claimed download job through its remaining stages, checkpointing after each one
+        
+        queued -> metadata -> downloading -> converting -> tagging -> done, or failed. The
+        partial files live in a hidden work dir inside the library, so yt-dlp can continue
+        its .part download and finished stages are not repeated after a crash.
+        """
+        import yt_dlp
+        from rich.progress import Progress
+        
+        queue = self.download_queue
+        pool = get_youtubedl_pool()
+        job_id, url, output = job["id"], job["url"], job["output"]
+        info = None
+        work_dir = queue.work_dir(job)
+        # Only skip_existing needs an up-to-date index; otherwise the new file is just recorded in an existing one
+        library_index = self.get_library_index(job["output_dir"], scan=skip_existing)
+        
+        if job["state"] == "queued":
+            self.console.print(f"[bold blue]Downloading from:[/bold blue] {url}")
+        else:
+            self.console.print(f"[bold blue]Resuming ({job['state']}):[/bold blue] {url}")
+        
+        try:
+            if job["state"] in ("queued", "metadata"):
+                queue.checkpoint(job_id, "metadata")
+                metadata, info = self._resolve_job_metadata(url, job["metadata"], priority)
+                
+                if skip_existing and library_index:
+                    existing = (library_index.find_by_recording_id(metadata.get("recording_id"))
+                                or library_index.find_track(metadata.get("artist"), metadata.get("title")))
+                    if existing:
+                        self.console.print(f"[dim]Already in library: {existing}[/dim]")
+                        queue.checkpoint(job_id, "done", save_path=existing)
+                        return existing
+                
+                # Create a valid filename
+                valid_filename = f"{metadata.get('artist', 'Unknown')} - {metadata.get('title', 'Unknown')}"
+                valid_filename = valid_filename.replace("/", "-").replace("\\", "-").replace(":", "-").replace("?", "").replace('"', "")
+                save_path = os.path.join(job["output_dir"], f"{valid_filename}.{output['format']}")
+                # Batch workers can resolve two videos to the same name; only a re-download of
+                # the same video may replace an existing file
+                video_id = extract_video_id(url)
+
+                def same_video(path):
+                    existing_info = LibraryIndex._read_file_info_safe(path)[1]
+                    return video_id is not None and existing_info is not None and existing_info["video_id"] == video_id
+
+                save_path = queue.claim_save_path(job_id, save_path, metadata, replaceable=same_video)
+                job.update(state="downloading", metadata=metadata, save_path=save_path)
+            
+            metadata, save_path = job["metadata"], job["save_path"]
+            
+            # Download the song
+            # Live progress bars cannot be nested, so batch workers run without one
+            with Progress(disable=not show_progress) as progress:
+                download_task = progress.add_task("[green]Downloading...", total=100)
+                
+                if job["state"] == "downloading":
+                    os.makedirs(work_dir, exist_ok=True)
+                    
+                    def progress_hook(d):
+                        if d['status'] == 'downloading':
+                            p = d.get('_percent_str', '0%').replace('%', '')
+                            try:
+                                progress.update(download_task, completed=float(p))
+                            except:
+                                pass
+                    
+                    # The fixed name lets yt-dlp continue a .part file from an earlier run
+                    outtmpl = os.path.join(work_dir, 'source.%(ext)s')
+                    with pool.instance(pool.output_profile(output), outtmpl=outtmpl, progress_hook=progress_hook) as ydl:
+                        if info is None:
+                            info = ydl.extract_info(url, download=False, process=False)
+                        # Download from the extraction the metadata step already made; one page fetch per track
+                        info = ydl.process_ie_result(info, download=True)
+                        downloads = info.get('requested_downloads') or [info]
+                        source_file = downloads[0].get('filepath') or ydl.prepare_filename(info)
+                    
+                    if not os.path.exists(source_file):
+                        raise RuntimeError("Downloaded file not found")
+                    queue.checkpoint(job_id, "converting", source_file=source_file)
+                    job.update(state="converting", source_file=source_file)
+                
+                if job["state"] == "converting":
+                    progress.update(download_task, completed=100, description="[yellow]Converting...")
+                    source_file = job["source_file"]
+                    
+                    # A source already in the target codec is only remuxed; anything else is transcoded
+                    with pool.instance('audio') as ydl:
+                        extractor = yt_dlp.postprocessor.FFmpegExtractAudioPP(ydl, preferredcodec=output['format'],
+                                                                              preferredquality=output['quality'])
+                        _, converted = extractor.run({'filepath': source_file, 'ext': os.path.splitext(source_file)[1][1:]})
+                    
+                    audio_file = converted['filepath']
+                    queue.checkpoint(job_id, "tagging", audio_file=audio_file)
+                    job.update(state="tagging", audio_file=audio_file)
+                
+                if job["state"] == "tagging":
+                    # Tag the work file, then move it into the library in one step
+                    progress.update(download_task, completed=100, description="[yellow]Setting metadata...")
+                    audio_file = job["audio_file"]
+                    if os.path.exists(audio_file):
+                        self._set_metadata(audio_file, metadata)
+                        move_into_place(audio_file, save_path)
+                    elif not os.path.exists(save_path):
+                        raise RuntimeError("Converted file not found")
+                    
+                    if library_index:
+                        try:
+                            library_index.add_file(save_path, metadata)
+                        except Exception as e:
+                            self.console.print(f"[yellow]Could not update library index: {str(e)}[/yellow]")
+                    
+                    queue.checkpoint(job_id, "done")
+                    shutil.rmtree(work_dir, ignore_errors=True)
+                    try:
+                        os.rmdir(os.path.dirname(work_dir))
+                    except OSError:
+                        pass  # Other jobs still have partial files there
+                    progress.update(download_task, completed=100, description="[bold green]Download complete!")
+            
+            self.console.print(f"\n[bold green]Success![/bold green] File saved to: {save_path}")
+            return save_path
+        
+        except Exception as e:
+            queue.fail(job_id, str(e))
+            self.console.print(f"\n[bold red]Download failed:[/bold red] {str(e)}")
+            return False
+        except BaseException:
+            # Interrupted: leave the job at its last checkpoint for the next run
+            queue.release(job_id)
+            raise
+    
+    def resume_downloads(self, workers=1):
+        """Finish every unfinished job in the download queue"""
+        pending = self.download_queue.jobs([state for state in DownloadQueue.STATES
+                                            if state not in DownloadQueue.FINISHED_STATES])
+        if not pending:
+            self.console.print("[green]No unfinished downloads[/green]")
+            return []
+        
+        self.console.print(f"[bold blue]Resuming {len(pending)} unfinished downloads[/bold blue]")
+        
+        def worker():
+            results = []
+            while True:
+                job = self.download_queue.claim()
+                if not job:
+                    return results
+                results.append(self._run_download_job(job, show_progress=workers == 1, priority=PRIORITY_BACKGROUND))
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(worker) for _ in range(max(1, workers))]
+            results = [result for future in futures for result in future.result()]
+        
+        held = len(self.download_queue.jobs([state for state in DownloadQueue.STATES
+                                             if state not in DownloadQueue.FINISHED_STATES]))
+        if held:
+            self.console.print(f"[yellow]{held} downloads are still claimed by another run; "
+                               f"they can be resumed once it stops ({DownloadQueue.CLAIM_TIMEOUT}s after a crash)[/yellow]")
+        return results
+    
+    def show_download_queue(self):
+        """Print the jobs in the download queue"""
+        from rich.table import Table
+        
+        jobs = self.download_queue.jobs() if os.path.exists(self.download_queue_file) else []
+        if not jobs:
+            self.console.print("[green]The download queue is empty[/green]")
+            return True
+        
+        table = Table(title="Download Queue")
+        table.add_column("#", justify="right", style="cyan", no_wrap=True)
+        table.add_column("URL", style="white")
+        table.add_column("State")
+        table.add_column("File / Error", style="magenta")
+        
+        state_styles = {"done": "green", "failed": "red"}
+        for job in jobs:
+            style = state_styles.get(job["state"], "yellow")
+            table.add_row(str(job["id"]), job["url"], f"[{style}]{job['state']}[/{style}]",
+                          job["error"] if job["state"] == "failed" else (job["save_path"] or ""))
+        
+        self.console.print(table)
+        return True
+    
+    def get_library_index(self, library_path=None, refresh=False, scan=True):
+        """Return the (shared) index for a library folder, or None if it can't be opened
+        
+        The first call with scan brings the index up to date with the folder. With scan=False
+        an existing index is opened as it is, for recording a new file without walking the
+        library, and None is returned when the library has no index yet.
+        """
+        library_path = os.path.abspath(library_path or self.library_location)
+        
+        with self.library_indexes_lock:
+            library_index = self.library_indexes.get(library_path)
+            if library_index is None:
+                if not scan and not os.path.exists(os.path.join(library_path, LibraryIndex.INDEX_FILENAME)):
+                    return None
+                try:
+                    os.makedirs(library_path, exist_ok=True)
+                    library_index = LibraryIndex(library_path)
+                except Exception as e:
+                    self.console.print(f"[yellow]Could not open library index: {str(e)}[/yellow]")
+                    return None
+                self.library_indexes[library_path] = library_index
+            if scan and library_path not in self.scanned_libraries:
+                self.scanned_libraries.add(library_path)
+                refresh = True
+        
+            if refresh:
+                # Cheap when nothing changed: only files with a new size or mtime are re-read
+                counts = library_index.refresh()
+                if counts["updated"] or counts["removed"]:
+                    self.console.print(f"[dim]Library index: {counts['updated']} updated, {counts['removed']} removed, "
+                                       f"{counts['unchanged']} unchanged[/dim]")
+        return library_index
+    
+    def _read_batch_items(self, source):
+        """Read batch entries from a file or stdin ('-'), skipping blanks and comments"""
+        if source == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(source, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        
+        items = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            items.append(self._parse_batch_line(line))
+        
+        return items
+    
+    @staticmethod
+    def _parse_batch_line(line):
+        """Turn a URL, video ID, 'Artist - Title' or free-text search into a batch entry"""
+        if line.startswith(('http://', 'https://')):
+            return {"input": line, "url": line}
+        if re.fullmatch(r'[A-Za-z0-9_-]{11}', line):
+            return {"input": line, "url": f"https://www.youtube.com/watch?v={line}"}
+        if " - " in line:
+            artist, title = line.split(" - ", 1)
+            return {"input": line, "query": line, "artist": artist.strip(), "title": title.strip()}
+        return {"input": line, "query": line}
+    
+    def _download_batch_item(self, item, output_dir, skip_existing=True, output=None):
+        """Resolve and download a single batch entry"""
+        result = {"input": item["input"], "status": "failed", "path": None, "error": None}
+        
+        try:
+            url = item.get("url")
+            metadata = None
+            
+            # "Artist - Title" lines can be checked against the library before searching YouTube
+            if skip_existing and item.get("artist") and item.get("title"):
+                library_index = self.get_library_index(output_dir)
+                existing = library_index and library_index.find_track(item["artist"], item["title"])
+                if existing:
+                    self.console.print(f"[dim]Already in library: {existing}[/dim]")
+                    result["status"] = "ok"
+                    result["path"] = existing
+                    return result
+            
+            if not url:
+                videos = self._ytdlp_search(item["query"], limit=1)
+                if not videos:
+                    result["error"] = "No search results"
+                    return result
+                url = videos[0]["webpage_url"]
+                
+                # "Artist - Title" lines already tell us what to look up
+                if item.get("artist") and item.get("title"):
+                    metadata = self.get_metadata(item["artist"], item["title"], priority=PRIORITY_BACKGROUND)
+            
+            saved_path = self.download_song(url, metadata, output_dir, show_progress=False, priority=PRIORITY_BACKGROUND,
+                                            skip_existing=skip_existing, output=output)
+            if saved_path:
+                result["status"] = "ok"
+                result["path"] = saved_path
+            else:
+                result["error"] = "Download failed"
+        except Exception as e:
+            result["error"] = str(e)
+        
+        return result
+    
+    def download_entry(self, line, output_dir=None, skip_existing=True, output=None):
+        """Download one entry written like a batch file line: a URL, video ID, 'Artist - Title' or search text
+        
+        Returns a result dict with input, status ("ok" or "failed"), path and error.
+        """
+        return self._download_batch_item(self._parse_batch_line(line.strip()), output_dir,
+                                         skip_existing=skip_existing, output=output)
+    
+    def download_batch(self, source, workers=4, output_dir=None, json_output=False, skip_existing=True, output=None):
+        """Download every entry of a batch file on a pool of worker threads"""
+        from rich.table import Table
+        
+        try:
+            items = self._read_batch_items(source)
+        except Exception as e:
+            self.console.print(f"[red]Could not read batch input: {str(e)}[/red]")
+            return []
+        
+        if not items:
+            self.console.print("[yellow]No entries to download[/yellow]")
+            return []
+        
+        workers = max(1, workers)
+        if skip_existing:
+            # Opening the index also brings it up to date with files added since the last run
+            self.get_library_index(output_dir)
+        self.console.print(f"[bold blue]Downloading {len(items)} entries with {workers} workers[/bold blue]")
+        
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._download_batch_item, item, output_dir, skip_existing, output): i
+                       for i, item in enumerate(items)}
+            
+            for done, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                results[index] = future.result()
+                status = "[green]ok[/green]" if results[index]["status"] == "ok" else "[red]failed[/red]"
+                self.console.print(f"[dim][{done}/{len(items)}][/dim] {status} {results[index]['input']}")
+        
+        if json_output:
+            print(json.dumps(results, indent=2))
+        else:
+            table = Table(title="Batch Results")
+            table.add_column("#", justify="right", style="cyan", no_wrap=True)
+            table.add_column("Input", style="white")
+            table.add_column("Status")
+            table.add_column("File / Error", style="magenta")
+            
+            for i, result in enumerate(results):
+                if result["status"] == "ok":
+                    table.add_row(str(i+1), result["input"], "[green]ok[/green]", result["path"])
+                else:
+                    table.add_row(str(i+1), result["input"], "[red]failed[/red]", result["error"] or "")
+            
+            self.console.print(table)
+        
+        failed = sum(1 for result in results if result["status"] != "ok")
+        self.console.print(f"[bold]{len(results) - failed} succeeded, {failed} failed[/bold]")
+        return results
+    
+    def _iter_playlist_entries(self, url):
+        """Yield video entries of a playlist or channel as yt-dlp pages through the listing"""
+        with get_youtubedl_pool().instance('flat') as ydl:
+            # process=False keeps 'entries' as yt-dlp's lazy generator instead of a materialized list
+            info = ydl.extract_info(url, download=False, process=False)
+            if not info:
+                return
+            
+            if info.get('_type') not in ('playlist', 'multi_video'):
+                yield info
+                return
+            
+            for entry in info.get('entries') or []:
+                if not entry:
+                    continue
                 
-        # If just an ID is provided, construct the URL
-        if not url_or_id.startswith(('http://', 'https://')):
-            url_or_id = f"https://www.youtube.com/watch?v={url_or_id}"
+                # Channel pages list their tabs (Videos, Shorts, ...) as nested playlists
+                if entry.get('ie_key') == 'YoutubeTab' or entry.get('_type') == 'playlist':
+                    nested_url = entry.get('url') or entry.get('webpage_url')
+                    if nested_url:
+                        yield from self._iter_playlist_entries(nested_url)
+                    continue
+                
+                yield entry
+    
+    def _playlist_state_file(self, url):
+        """Path of the file recording which entries of a playlist are already done"""
+        state_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".playlist_state")
+        os.makedirs(state_dir, exist_ok=True)
+        return os.path.join(state_dir, hashlib.sha1(url.strip().encode('utf-8')).hexdigest() + ".done")
+    
+    def download_playlist(self, url, workers=4, output_dir=None, restart=False, skip_existing=True, output=None):
+        """Stream a playlist or channel into the download pipeline as its entries are discovered"""
+        state_file = self._playlist_state_file(url)
+        if restart and os.path.exists(state_file):
+            os.remove(state_file)
         
-        self.console.print(f"[bold blue]Downloading from:[/bold blue] {url_or_id}")
+        done_ids = set()
+        if os.path.exists(state_file):
+            with open(state_file, 'r', encoding='utf-8') as f:
+                done_ids = {line.strip() for line in f if line.strip()}
+            self.console.print(f"[dim]Resuming: {len(done_ids)} entries already downloaded[/dim]")
         
-        # If no metadata provided, extract some basic info from the video
-        if not metadata:
-            metadata = {}
+        workers = max(1, workers)
+        library_index = self.get_library_index(output_dir) if skip_existing else None
+        counts = {"ok": 0, "failed": 0, "skipped": 0}
+        failures = []
+        lock = threading.Lock()
+        # Only a couple of entries per worker are queued at a time, so memory stays flat for huge playlists
+        slots = threading.BoundedSemaphore(workers * 2)
+        
+        def process_entry(number, entry):
+            video_id = entry.get('id')
+            video_url = entry.get('url') or entry.get('webpage_url')
+            if not video_url or not video_url.startswith(('http://', 'https://')):
+                video_url = f"https://www.youtube.com/watch?v={video_id}"
+            label = entry.get('title') or video_id
+            
             try:
-                with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                    info = ydl.extract_info(url_or_id, download=False)
-                    title_parts = info['title'].split(" - ")
-                    
-                    if len(title_parts) > 1:
-                        metadata["artist"] = title_parts[0].strip()
-                        metadata["title"] = " - ".join(title_parts[1:]).strip()
-                        metadata["title"] = re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', metadata["title"]).strip()
-                    else:
-                        metadata["artist"] = info.get('uploader', 'Unknown')
-                        metadata["title"] = title_parts[0].strip()
-                        metadata["title"] = re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', metadata["title"]).strip()
-                
-                # Fetch additional metadata just like in the GUI
-                artist = metadata.get("artist", "")
-                title = metadata.get("title", "")
-                if artist and title:
-                    self.console.print(f"[bold blue]Fetching metadata for:[/bold blue] {artist} - {title}")
-                    enhanced_metadata = self.get_metadata(artist, title)
-                    
-                    # Merge with the metadata we already have
-                    for key, value in enhanced_metadata.items():
-                        if key not in ['artist', 'title'] or not metadata.get(key):
-                            metadata[key] = value
-                    
+                saved_path = self.download_song(video_url, None, output_dir, show_progress=False,
+                                                priority=PRIORITY_BACKGROUND, skip_existing=skip_existing, output=output)
             except Exception as e:
-                self.console.print(f"[yellow]Could not extract video info: {str(e)}[/yellow]")
-                metadata["artist"] = "Unknown"
-                metadata["title"] = "Unknown"
+                self.console.print(f"[red]{label}: {str(e)}[/red]")
+                saved_path = False
+            
+            with lock:
+                if saved_path:
+                    counts["ok"] += 1
+                    with open(state_file, 'a', encoding='utf-8') as f:
+                        f.write(video_id + "\n")
+                    self.console.print(f"[dim][{number}][/dim] [green]ok[/green] {label}")
+                else:
+                    counts["failed"] += 1
+                    failures.append(label)
+                    self.console.print(f"[dim][{number}][/dim] [red]failed[/red] {label}")
         
-        # Create a valid filename
-        valid_filename = f"{metadata.get('artist', 'Unknown')} - {metadata.get('title', 'Unknown')}"
-        valid_filename = valid_filename.replace("/", "-").replace("\\", "-").replace(":", "-").replace("?", "").replace('"', "")
-        save_path = os.path.join(output_dir, f"{valid_filename}.mp3")
+        def release_slot(future):
+            slots.release()
         
-        # Download the song
-        with Progress() as progress:
-            download_task = progress.add_task("[green]Downloading...", total=100)
-            
+        self.console.print(f"[bold blue]Processing playlist:[/bold blue] {url}")
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
             try:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_filename = os.path.join(temp_dir, "audio")
-                    
-                    def progress_hook(d):
-                        if d['status'] == 'downloading':
-                            p = d.get('_percent_str', '0%').replace('%', '')
-                            try:
-                                progress.update(download_task, completed=float(p))
-                            except:
-                                pass
-                    
-                    # Configure yt-dlp options
-                    ydl_opts = {
-                        'format': 'bestaudio/best',
-                        'outtmpl': temp_filename,
-                        'postprocessors': [{
-                            'key': 'FFmpegExtractAudio',
-                            'preferredcodec': 'mp3',
-                            'preferredquality': '192',
-                        }],
-                        'quiet': True,
-                        'no_warnings': True,
-                        'progress_hooks': [progress_hook]
-                    }
+                for number, entry in enumerate(self._iter_playlist_entries(url), start=1):
+                    if entry.get('id') in done_ids:
+                        counts["skipped"] += 1
+                        continue
                     
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        ydl.download([url_or_id])
+                    if library_index and library_index.find_by_video_id(entry.get('id')):
+                        counts["skipped"] += 1
+                        continue
                     
-                    downloaded_file = temp_filename + ".mp3"
-                    if os.path.exists(downloaded_file):
-                        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                        
-                        shutil.copy2(downloaded_file, save_path)
-                        
-                        # Set metadata in the MP3 file
-                        progress.update(download_task, description="[yellow]Setting metadata...")
-                        self._set_metadata(save_path, metadata)
-                        
-                        progress.update(download_task, completed=100, description="[bold green]Download complete!")
-                        self.console.print(f"\n[bold green]Success![/bold green] File saved to: {save_path}")
-                        return True
-                    else:
-                        self.console.print("[red]Error: Downloaded file not found[/red]")
-                        return False
-            
+                    slots.acquire()
+                    executor.submit(process_entry, number, entry).add_done_callback(release_slot)
             except Exception as e:
-                self.console.print(f"\n[bold red]Download failed:[/bold red] {str(e)}")
-                return False
+                self.console.print(f"[red]Could not list playlist entries: {str(e)}[/red]")
+                counts["failed"] += 1
+        
+        self.console.print(f"[bold]{counts['ok']} downloaded, {counts['skipped']} already done, {counts['failed']} failed[/bold]")
+        if failures:
+            self.console.print("[yellow]Failed entries (rerun the command to retry them):[/yellow]")
+            for label in failures:
+                self.console.print(f"  {label}")
+        return counts
+    
+    def _fetch_tag_artwork(self, metadata):
+        """Fetch the album art for the metadata's artwork URL, returning the image data or None"""
+        if not metadata.get('artwork_url'):
+            return None
+        try:
+            artwork_url = metadata['artwork_url']
+            fetcher = self.musicbrainz.coverart_get if 'coverartarchive.org' in artwork_url else None
+            artwork = self.artwork_store.fetch(artwork_url, source='coverart', fetcher=fetcher)
+            return artwork['data'] if artwork else None
+        except Exception as e:
+            self.console.print(f"[yellow]Error setting album art: {str(e)}[/yellow]")
+            return None
     
     def _set_metadata(self, file_path, metadata):
-        """Set ID3 metadata for the downloaded MP3 file"""
+        """Tag the downloaded file with the metadata, in the tag format of its file type"""
         try:
-            # First delete existing tags
-            try:
-                audio = MP3(file_path)
-                audio.delete()
-                audio.save()
-            except Exception:
-                pass
+            write_audio_tags(file_path, metadata, self._fetch_tag_artwork(metadata))
+            return True
+                
+        except Exception as e:
+            self.console.print(f"[red]Error setting metadata: {str(e)}[/red]")
+            return False
+
+    def _collect_retag_files(self, target):
+        """Expand a file, directory (recursively) or glob pattern into a sorted list of audio files"""
+        extensions = LibraryIndex.AUDIO_EXTENSIONS
+        if os.path.isdir(target):
+            paths = []
+            for dirpath, dirnames, filenames in os.walk(target):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                paths.extend(os.path.join(dirpath, filename) for filename in filenames
+                             if filename.lower().endswith(extensions) and not filename.startswith('.'))
+        elif os.path.isfile(target):
+            paths = [target]
+        else:
+            paths = glob.glob(os.path.expanduser(target), recursive=True)
+        return sorted(path for path in paths if os.path.isfile(path) and path.lower().endswith(extensions))
+    
+    @classmethod
+    def _has_tag(cls, tags, field):
+        if field == "artwork":
+            return tags.get("artwork", False)
+        return bool(str(tags.get(cls.RETAG_FIELDS[field], "")).strip())
+    
+    def _infer_artist_title(self, file_path, tags):
+        """Take artist and title from the existing tags, falling back to an 'Artist - Title' filename"""
+        artist = str(tags.get('artist', '')).strip()
+        title = str(tags.get('title', '')).strip()
+        
+        if not artist or not title:
+            name = os.path.splitext(os.path.basename(file_path))[0]
+            name = re.sub(r'^\d+[\s.\-_]+', '', name)  # Leading track numbers
+            if " - " in name:
+                file_artist, file_title = name.split(" - ", 1)
+                artist = artist or file_artist.strip()
+                title = title or re.sub(r'\(.*?\)|\[.*?\]|Official Video|Lyrics', '', file_title).strip()
+        
+        return artist, title
+    
+    def _retag_file(self, file_path, fields, overwrite=False, dry_run=False):
+        """Fill the selected tags of one file from the metadata providers"""
+        result = {"path": file_path, "status": "failed", "changes": {}, "error": None}
+        
+        try:
+            tags = read_audio_tags(file_path)
             
-            tags = ID3()
+            artist, title = self._infer_artist_title(file_path, tags)
+            if not artist or not title:
+                result["error"] = "Could not work out artist and title"
+                return result
             
-            # Set title
-            if metadata.get('title'):
-                tags.add(TIT2(encoding=3, text=metadata['title']))
+            wanted = [field for field in fields if overwrite or not self._has_tag(tags, field)]
+            if not wanted:
+                result["status"] = "complete"
+                return result
             
-            # Set artist
-            if metadata.get('artist'):
-                tags.add(TPE1(encoding=3, text=metadata['artist']))
+            metadata = self.get_metadata(artist, title, priority=PRIORITY_BACKGROUND, quiet=True)
             
-            # Set album
-            if metadata.get('album'):
-                tags.add(TALB(encoding=3, text=metadata['album']))
+            updates = {}
+            for field in wanted:
+                key = self.RETAG_FIELDS[field]
+                value = metadata.get(key)
+                if not value:
+                    continue
+                if field not in ("lyrics", "artwork") and tags.get(key) == str(value):
+                    continue
+                updates[key] = value
             
-            # Set year
-            if metadata.get('year'):
-                tags.add(TDRC(encoding=3, text=metadata['year']))
+            if not updates:
+                result["status"] = "unchanged"
+                return result
             
-            # Set genre
-            if metadata.get('genre'):
-                tags.add(TCON(encoding=3, text=metadata['genre']))
-                
-            # Set track number
-            if metadata.get('track_number'):
-                tags.add(TRCK(encoding=3, text=metadata['track_number']))
+            if dry_run:
+                result["changes"] = {field: metadata[key] for field, key in self.RETAG_FIELDS.items() if key in updates}
+                result["status"] = "would change"
+                return result
             
-            # Add lyrics if provided
-            if metadata.get('lyrics'):
-                tags.add(USLT(
-                    encoding=3,  # UTF-8
-                    lang='eng',  # Language code (English)
-                    desc='',     # Description
-                    text=metadata['lyrics']
-                ))
+            artwork = self._fetch_tag_artwork(updates)
+            if not artwork:
+                updates.pop("artwork_url", None)
+            if not updates:
+                result["status"] = "unchanged"
+                return result
             
-            # Add album art if we have a URL
-            if metadata.get('artwork_url'):
-                try:
-                    response = requests.get(metadata['artwork_url'])
-                    if response.status_code == 200:
-                        tags.add(APIC(
-                            encoding=3,  # UTF-8
-                            mime='image/jpeg',
-                            type=3,  # Cover image
-                            desc='Cover',
-                            data=response.content
-                        ))
-                except Exception as e:
-                    self.console.print(f"[yellow]Error setting album art: {str(e)}[/yellow]")
+            # Set only the fields being filled; everything else in the tag is kept as it is
+            write_audio_tags(file_path, updates, artwork, replace=False)
+            result["changes"] = {field: metadata[key] for field, key in self.RETAG_FIELDS.items() if key in updates}
+            result["status"] = "ok"
+        except Exception as e:
+            result["error"] = str(e)
+        
+        return result
+    
+    def retag(self, target, fields=None, overwrite=False, dry_run=False, workers=4):
+        """Fill missing tags of existing audio files without downloading them again"""
+        from rich.table import Table
+        
+        fields = fields or list(self.RETAG_DEFAULT_FIELDS)
+        unknown = [field for field in fields if field not in self.RETAG_FIELDS]
+        if unknown:
+            self.console.print(f"[red]Unknown field(s): {', '.join(unknown)}. "
+                               f"Choose from: {', '.join(self.RETAG_FIELDS)}[/red]")
+            return []
+        
+        files = self._collect_retag_files(target)
+        if not files:
+            self.console.print(f"[yellow]No audio files found for: {target}[/yellow]")
+            return []
+        
+        workers = max(1, workers)
+        mode = "Checking" if dry_run else "Retagging"
+        self.console.print(f"[bold blue]{mode} {len(files)} files ({', '.join(fields)}) with {workers} workers[/bold blue]")
+        
+        results = [None] * len(files)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._retag_file, path, fields, overwrite, dry_run): i
+                       for i, path in enumerate(files)}
             
-            # Save the tags to the file
-            tags.save(file_path)
+            for done, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                results[index] = future.result()
+                result = results[index]
+                if result["status"] == "failed":
+                    status = f"[red]failed[/red] [dim]{result['error']}[/dim]"
+                elif result["changes"]:
+                    status = f"[green]{result['status']}[/green] ({', '.join(result['changes'])})"
+                else:
+                    status = f"[dim]{result['status']}[/dim]"
+                self.console.print(f"[dim][{done}/{len(files)}][/dim] {os.path.basename(result['path'])}: {status}")
+        
+        if dry_run:
+            table = Table(title="Planned Tag Changes")
+            table.add_column("File", style="white")
+            table.add_column("Field", style="cyan")
+            table.add_column("New Value", style="green")
+            
+            for result in results:
+                for field, value in result["changes"].items():
+                    if field == "lyrics":
+                        value = f"({len(value)} characters)"
+                    table.add_row(os.path.basename(result["path"]), field, str(value))
+            
+            self.console.print(table)
+        
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        self.console.print("[bold]" + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())) + "[/bold]")
+        return results
+    
+    def _open_http_cache(self):
+        """The HTTP cache for the cache command, even with --no-cache; None if nothing was ever cached"""
+        if not os.path.exists(HTTP_CACHE_FILE):
+            return None
+        configure_http_cache(self.config)
+        return get_http_cache()
+    
+    def clear_cache(self):
+        """Delete every cached HTTP response"""
+        if not os.path.exists(HTTP_CACHE_FILE):
+            self.console.print("[green]The HTTP cache is empty[/green]")
             return True
-                
-        except Exception as e:
-            self.console.print(f"[red]Error setting metadata: {str(e)}[/red]")
+        cache = self._open_http_cache()
+        if not cache:
+            self.console.print("[red]HTTP cache is not available[/red]")
             return False
-
+        
+        count = cache.clear()
+        self.console.print(f"[green]Cleared {count} cached responses[/green]")
+        return True
+    
+    def show_cache_stats(self):
+        """Print entry counts and sizes of the HTTP cache per source"""
+        from rich.table import Table
+        
+        if not os.path.exists(HTTP_CACHE_FILE):
+            self.console.print("[green]The HTTP cache is empty[/green]")
+            return True
+        cache = self._open_http_cache()
+        if not cache:
+            self.console.print("[red]HTTP cache is not available[/red]")
+            return False
+        
+        table = Table(title="HTTP Cache")
+        table.add_column("Source", style="cyan")
+        table.add_column("Entries", justify="right")
+        table.add_column("Size", justify="right", style="blue")
+        table.add_column("TTL", justify="right", style="green")
+        
+        for row in cache.stats():
+            ttl = cache.ttls.get(row["source"], cache.ttls['default'])
+            table.add_row(row["source"], str(row["entries"]), f"{row['size'] // 1024} KB", f"{ttl // 3600} h")
+        
+        self.console.print(table)
+        self.console.print(f"[dim]{cache.path} (cap {cache.max_size // (1024 * 1024)} MB)[/dim]")
+        return True
+    
+    def show_lyrics_stats(self):
+        """Print per-provider lyrics latency and hit rate"""
+        from rich.table import Table
+        
+        table = Table(title="Lyrics Providers")
+        table.add_column("Priority", justify="right", style="cyan")
+        table.add_column("Provider", style="white")
+        table.add_column("Requests", justify="right")
+        table.add_column("Hit Rate", justify="right", style="green")
+        table.add_column("Avg Latency", justify="right", style="blue")
+        
+        for row in self.lyrics_engine.get_stats():
+            priority = str(len(table.rows) + 1) if row["enabled"] else "[dim]disabled[/dim]"
+            table.add_row(priority, row["provider"], str(row["requests"]),
+                          f"{row['hit_rate']:.0%}", f"{row['avg_latency']:.2f}s")
+        
+        self.console.print(table)
+        self.console.print("[dim]Reorder or disable providers with 'providers = ...' in the [Lyrics] section of config.ini[/dim]")
+        return True
+    
+    def scan_library(self, workers=None):
+        """Index the library location, reading tags of new or changed files in parallel"""
+        from rich.table import Table
+        from rich.progress import Progress
+        
+        library_path = self.library_location
+        if not os.path.isdir(library_path):
+            self.console.print(f"[red]Library location does not exist: {library_path}[/red]")
+            return False
+        
+        with self.library_indexes_lock:
+            library_index = self.library_indexes.get(os.path.abspath(library_path))
+        if library_index is None:
+            try:
+                library_index = LibraryIndex(library_path)
+            except Exception as e:
+                self.console.print(f"[red]Could not open library index: {str(e)}[/red]")
+                return False
+            with self.library_indexes_lock:
+                self.library_indexes[os.path.abspath(library_path)] = library_index
+        
+        self.console.print(f"[bold blue]Scanning library:[/bold blue] {library_path}")
+        start = time.monotonic()
+        with Progress() as progress:
+            scan_task = progress.add_task("[green]Reading tags...", total=None)
+            
+            def on_progress(done, total):
+                progress.update(scan_task, completed=done, total=total)
+            
+            counts = library_index.refresh(workers=workers, progress_callback=on_progress)
+            progress.update(scan_task, description="[bold green]Scan complete!")
+        with self.library_indexes_lock:
+            self.scanned_libraries.add(os.path.abspath(library_path))
+        elapsed = time.monotonic() - start
+        
+        summary = library_index.summary()
+        table = Table(title="Library", show_header=False)
+        table.add_column("", style="cyan")
+        table.add_column("", justify="right")
+        table.add_row("Tracks", str(summary["tracks"]))
+        table.add_row("Artists", str(summary["artists"]))
+        table.add_row("Size", f"{summary['size'] // (1024 * 1024)} MB")
+        table.add_row("With lyrics", str(summary["with_lyrics"]))
+        table.add_row("With artwork", str(summary["with_artwork"]))
+        table.add_row("Without album", str(summary["without_album"]))
+        table.add_row("Not downloaded by this tool", str(summary["without_source"]))
+        
+        self.console.print(table)
+        self.console.print(f"[dim]{counts['updated']} read, {counts['unchanged']} unchanged, {counts['removed']} removed, "
+                           f"{counts['errors']} unreadable in {elapsed:.1f}s ({library_index.index_file})[/dim]")
+        return True
+    
+    def _fingerprint_library(self, library_index, workers=None):
+        """Fingerprint every track that changed since the last run, decoding on parallel ffmpeg processes"""
+        from rich.progress import Progress
+        
+        pending = library_index.missing_fingerprints()
+        if not pending:
+            return True
+        if not shutil.which('ffmpeg'):
+            self.console.print("[red]FFmpeg is required to fingerprint the library[/red]")
+            return False
+        
+        def fingerprint_file(path):
+            try:
+                fingerprint = compute_fingerprint(path)
+                return path, fingerprint, fingerprint_minhash(fingerprint), None
+            except Exception as e:
+                return path, None, None, str(e)
+        
+        # ffmpeg does the decoding, so threads are enough to keep every core busy
+        workers = workers or os.cpu_count() or 1
+        rows = []
+        with Progress() as progress, ThreadPoolExecutor(max_workers=workers) as executor:
+            task = progress.add_task("[green]Fingerprinting...", total=len(pending))
+            for path, fingerprint, minhash, error in executor.map(fingerprint_file, pending):
+                if error:
+                    progress.console.print(f"[yellow]Could not fingerprint {path}: {error}[/yellow]")
+                rows.append((path, fingerprint, minhash))
+                if len(rows) >= 100:
+                    library_index.set_fingerprints(rows)
+                    rows = []
+                progress.advance(task)
+        if rows:
+            library_index.set_fingerprints(rows)
+        return True
+    
+    @staticmethod
+    def _keeper_rank(track):
+        """Sort key preferring the best tagged, largest copy without a video suffix in its name"""
+        name = os.path.basename(track["path"])
+        video_copy = bool(re.search(r'official|video|lyric|audio\)|\bhd\b', name, re.IGNORECASE))
+        return (not track["has_artwork"], not track["has_lyrics"], not track["album"],
+                video_copy, -(track["size"] or 0), len(name))
+    
+    def find_duplicates(self, workers=None, action=None):
+        """Find tracks in the library with the same audio and optionally hardlink or delete the extra copies"""
+        from rich.table import Table
+        
+        library_path = self.library_location
+        if not os.path.isdir(library_path):
+            self.console.print(f"[red]Library location does not exist: {library_path}[/red]")
+            return None
+        
+        library_index = self.get_library_index(library_path)
+        if not library_index or not self._fingerprint_library(library_index, workers):
+            return None
+        
+        tracks = list(library_index.iter_fingerprinted())
+        
+        # LSH: each MinHash value is a band, tracks sharing any band become candidate pairs
+        buckets = {}
+        for i, track in enumerate(tracks):
+            for band, value in enumerate(track["minhash"]):
+                buckets.setdefault((band, value), []).append(i)
+        candidates = set()
+        for members in buckets.values():
+            candidates.update(itertools.combinations(members, 2))
+        
+        # Union-find over the pairs whose aligned fingerprints really match
+        parents = list(range(len(tracks)))
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+        
+        for i, j in candidates:
+            match = compare_fingerprints(tracks[i]["fingerprint"], tracks[j]["fingerprint"])
+            if match and match[0] <= FINGERPRINT_MAX_BIT_ERROR:
+                parents[find(i)] = find(j)
+        
+        clusters = {}
+        for i in range(len(tracks)):
+            clusters.setdefault(find(i), []).append(tracks[i])
+        
+        groups = []
+        for members in clusters.values():
+            # Copies that are already hard links of each other take no extra space
+            distinct, seen_files = [], set()
+            for track in sorted(members, key=self._keeper_rank):
+                try:
+                    stat = os.stat(track["path"])
+                except OSError:
+                    continue
+                if (stat.st_dev, stat.st_ino) not in seen_files:
+                    seen_files.add((stat.st_dev, stat.st_ino))
+                    distinct.append(track)
+            if len(distinct) > 1:
+                groups.append(distinct)
+        groups.sort(key=lambda members: members[0]["path"])
+        
+        self.console.print(f"[dim]{len(tracks)} tracks fingerprinted, {len(candidates)} candidate pairs checked[/dim]")
+        if not groups:
+            self.console.print("[green]No duplicates found[/green]")
+            return []
+        
+        table = Table(title="Duplicate Tracks")
+        table.add_column("Group", justify="right", style="cyan")
+        table.add_column("File", style="white")
+        table.add_column("Size", justify="right")
+        table.add_column("", style="green")
+        for number, members in enumerate(groups, start=1):
+            for position, track in enumerate(members):
+                table.add_row(str(number) if position == 0 else "", os.path.relpath(track["path"], library_path),
+                              f"{(track['size'] or 0) // 1024} KB", "keep" if position == 0 else "")
+            table.add_section()
+        self.console.print(table)
+        
+        extra = sum(len(members) - 1 for members in groups)
+        if not action:
+            self.console.print(f"[bold]{len(groups)} groups, {extra} extra copies[/bold] "
+                               "[dim](use --hardlink or --delete to remove them)[/dim]")
+            return groups
+        
+        changed = failed = 0
+        for members in groups:
+            keeper = members[0]["path"]
+            for track in members[1:]:
+                path = track["path"]
+                try:
+                    if action == 'delete':
+                        os.remove(path)
+                    else:
+                        # Link under a temporary name first so the copy is never missing
+                        temp_path = f"{path}.dedup"
+                        os.link(keeper, temp_path)
+                        os.replace(temp_path, path)
+                    changed += 1
+                except OSError as e:
+                    self.console.print(f"[red]Could not {action} {path}: {str(e)}[/red]")
+                    failed += 1
+        
+        library_index.refresh()
+        verb = "Deleted" if action == 'delete' else "Hardlinked"
+        self.console.print(f"[bold]{verb} {changed} extra copies[/bold]" + (f" [red]({failed} failed)[/red]" if failed else ""))
+        return groups
+    
     def set_library_location(self, path):
         """Set the library location"""
         if not os.path.exists(path):
@@ -1918,20 +5175,363 @@ class CLIHandler:
         self.console.print(f"[green]Library location set to:[/green] {path}")
         return True
 
+class JobServer:
+    """Local HTTP API that runs search, metadata and download jobs on one long-lived CLIHandler
+    
+    POST /jobs with {"type": "search" | "metadata" | "download", ...} queues a job and returns
+    it; GET /jobs/<id>?wait=<seconds> polls it, optionally waiting until it has finished; GET
+    /jobs lists recent jobs. Imports, HTTP connection pools, the rate limiters and the caches
+    are set up once for the whole life of the server instead of once per command.
+    
+    Every request except GET /health needs "Authorization: Bearer <token>" and a Host header
+    naming the server itself, and jobs must be posted as application/json, so web pages open
+    in a browser cannot queue jobs, not even through DNS rebinding. The token is printed at
+    startup and written to TOKEN_FILE, where the --server client picks it up.
+    """
+    
+    DEFAULT_HOST = "127.0.0.1"
+    DEFAULT_PORT = 8765
+    DEFAULT_WORKERS = 4
+    # Finished jobs kept for polling, and the longest a single poll may block
+    MAX_FINISHED = 1000
+    MAX_WAIT = 60
+    TOKEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".server_token")
+    LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+    # Parameters each job type accepts: (required, optional). Anything else is rejected with a 400
+    JOB_PARAMS = {
+        "search": (("query",), ("limit", "page")),
+        "metadata": (("artist", "title"), ()),
+        "download": (("input",), ("output_dir", "redownload", "result_set", "format", "quality", "artist", "title",
+                                  "album", "year", "genre", "track", "skip_metadata")),
+    }
+    # Types of the non-string parameters; null is accepted for every optional one
+    PARAM_TYPES = {"limit": int, "page": int, "result_set": int, "redownload": bool, "skip_metadata": bool}
+    
+    def __init__(self, cli_handler, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, token=None):
+        self.cli = cli_handler
+        self.host = host
+        self.port = port
+        self.token = token or secrets.token_urlsafe(24)
+        # Host headers the server answers to; a wildcard bind still only answers to loopback names
+        self.allowed_hosts = set(self.LOOPBACK_HOSTS)
+        if host not in ("", "0.0.0.0", "::"):
+            self.allowed_hosts.add(host.lower())
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self.jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self.runners = {
+            "search": self._run_search,
+            "metadata": self._run_metadata,
+            "download": self._run_download,
+        }
+    
+    @classmethod
+    def from_config(cls, cli_handler, port=None):
+        """Build a server from the [Server] config section"""
+        host, config_port, workers, token = cls.DEFAULT_HOST, cls.DEFAULT_PORT, cls.DEFAULT_WORKERS, None
+        if 'Server' in cli_handler.config:
+            section = cli_handler.config['Server']
+            try:
+                host = section.get('host', host)
+                config_port = int(section.get('port', config_port))
+                workers = int(section.get('workers', workers))
+                token = section.get('token') or None
+            except ValueError as e:
+                print(f"Invalid server settings: {e}")
+        return cls(cli_handler, host=host, port=port or config_port, workers=workers, token=token)
+    
+    def _run_search(self, query, limit=10, page=1):
+        return self.cli.search_results(query, limit=int(limit), page=max(1, int(page)))
+    
+    def _run_metadata(self, artist, title):
+        return self.cli.get_metadata(artist, title, quiet=True)
+    
+    def _run_download(self, input, output_dir=None, redownload=False, result_set=None, format=None, quality=None,
+                      artist=None, title=None, album=None, year=None, genre=None, track=None, skip_metadata=False):
+        output = resolve_audio_output(format, quality)
+        # The same tags and lookup as the local download command
+        metadata = self.cli.download_metadata(artist, title, album, year, genre, track, skip_metadata=skip_metadata)
+        if input.isdigit() or metadata:
+            # A number from a search job is resolved against the shared search cache
+            path = self.cli.download_song(input, metadata, output_dir, show_progress=False,
+                                          skip_existing=not redownload, result_set=result_set, output=output)
+            result = {"input": input, "status": "ok" if path else "failed", "path": path or None,
+                      "error": None if path else "Download failed"}
+        else:
+            result = self.cli.download_entry(input, output_dir, skip_existing=not redownload, output=output)
+        
+        if result["status"] != "ok":
+            raise RuntimeError(result["error"] or "Download failed")
+        return result
+    
+    def _validate(self, job_type, params):
+        """Raise ValueError unless params are exactly what a job of this type accepts"""
+        required, optional = self.JOB_PARAMS[job_type]
+        unknown = sorted(set(params) - set(required) - set(optional))
+        if unknown:
+            raise ValueError(f"Unknown parameter(s) for a {job_type} job: {', '.join(unknown)}")
+        missing = [key for key in required if params.get(key) in (None, "")]
+        if missing:
+            raise ValueError(f"Missing parameter(s) for a {job_type} job: {', '.join(missing)}")
+        
+        descriptions = {str: "a string", int: "a whole number", bool: "true or false"}
+        for key, value in params.items():
+            expected = self.PARAM_TYPES.get(key, str)
+            # Exact types, since bool is a subclass of int and true is no page number
+            if value is not None and type(value) is not expected:
+                raise ValueError(f"{key} must be {descriptions[expected]}")
+        if job_type == "download":
+            resolve_audio_output(params.get("format"), params.get("quality"))
+    
+    def submit(self, request):
+        """Queue a job described by a request dict and return its public view"""
+        if not isinstance(request, dict) or request.get("type") not in self.runners:
+            raise ValueError(f"Job type must be one of: {', '.join(self.runners)}")
+        params = {key: value for key, value in request.items() if key != "type"}
+        self._validate(request["type"], params)
+        
+        with self._condition:
+            job = {
+                "id": next(self._ids),
+                "type": request["type"],
+                "params": params,
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "created": time.time(),
+                "finished": None,
+            }
+            self.jobs[job["id"]] = job
+            self._prune()
+            view = dict(job)
+        
+        self.executor.submit(self._run, job)
+        return view
+    
+    def _run(self, job):
+        self._update(job, status="running")
+        try:
+            result = self.runners[job["type"]](**job["params"])
+            self._update(job, status="done", result=result, finished=time.time())
+        except Exception as e:
+            self._update(job, status="failed", error=str(e), finished=time.time())
+    
+    def _update(self, job, **changes):
+        with self._condition:
+            job.update(changes)
+            self._condition.notify_all()
+    
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["finished"]]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED)]:
+            del self.jobs[job_id]
+    
+    def get(self, job_id, wait=0):
+        """Return a job's public view, waiting up to wait seconds for it to finish"""
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job and wait > 0:
+                self._condition.wait_for(lambda: job["finished"], timeout=min(wait, self.MAX_WAIT))
+            return dict(job) if job else None
+    
+    def list_jobs(self):
+        with self._condition:
+            return [{key: job[key] for key in ("id", "type", "status", "created", "finished")}
+                    for job in self.jobs.values()]
+    
+    def _authorized(self, headers, path):
+        """Whether a request may be served: a Host header naming this server and, except for /health, the token"""
+        host = urlsplit(f"//{headers.get('Host', '')}").hostname
+        if host not in self.allowed_hosts:
+            return False
+        if path == "/health":
+            return True
+        return hmac.compare_digest(headers.get("Authorization", "").encode('utf-8'),
+                                   f"Bearer {self.token}".encode('utf-8'))
+    
+    def make_http_server(self):
+        """Bind the HTTP API without starting to serve it"""
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, payload):
+                body = json.dumps(payload, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def _check(self, path):
+                if not server._authorized(self.headers, path):
+                    self._send(403, {"error": "Forbidden: a local Host and the server token are required"})
+                    return False
+                return True
+            
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = dict(parse_qsl(parts.query))
+                path = parts.path.rstrip('/')
+                if not self._check(path):
+                    return
+                
+                if path == "/health":
+                    self._send(200, {"status": "ok", "jobs": len(server.jobs)})
+                elif path == "/jobs":
+                    self._send(200, server.list_jobs())
+                elif re.fullmatch(r'/jobs/\d+', path):
+                    try:
+                        wait = float(query.get("wait", 0))
+                    except ValueError:
+                        self._send(400, {"error": "wait must be a number of seconds"})
+                        return
+                    job = server.get(int(path.rsplit('/', 1)[1]), wait=wait)
+                    if job:
+                        self._send(200, job)
+                    else:
+                        self._send(404, {"error": "No such job"})
+                else:
+                    self._send(404, {"error": "Not found"})
+            
+            def do_POST(self):
+                path = urlsplit(self.path).path.rstrip('/')
+                if not self._check(path):
+                    return
+                if path != "/jobs":
+                    self._send(404, {"error": "Not found"})
+                    return
+                if self.headers.get("Content-Type", "").split(';')[0].strip().lower() != "application/json":
+                    self._send(415, {"error": "Jobs must be posted as application/json"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    job = server.submit(json.loads(self.rfile.read(length) or b'null'))
+                except (ValueError, json.JSONDecodeError) as e:
+                    self._send(400, {"error": str(e)})
+                    return
+                self._send(202, job)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        httpd.daemon_threads = True
+        return httpd
+    
+    def serve_forever(self):
+        """Serve the API until interrupted"""
+        httpd = self.make_http_server()
+        
+        # Readable only by this user, so other accounts on the machine cannot borrow the token
+        descriptor = os.open(self.TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as f:
+            f.write(self.token)
+        
+        self.cli.console.print(f"[bold green]Serving jobs on http://{self.host}:{httpd.server_address[1]}[/bold green] "
+                               "[dim](Ctrl+C to stop)[/dim]")
+        self.cli.console.print(f"Token: {self.token} [dim](saved to {self.TOKEN_FILE} for --server clients)[/dim]")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            try:
+                os.remove(self.TOKEN_FILE)
+            except OSError:
+                pass
+
+def read_server_token():
+    """Token of the --serve instance started from this folder, or None if none is running"""
+    try:
+        with open(JobServer.TOKEN_FILE, 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def submit_job(server_url, request, wait=True, poll_interval=JobServer.MAX_WAIT, token=None):
+    """Send a job to a running --serve instance and return its final (or queued) state"""
+    from urllib.request import Request, urlopen
+    
+    base = server_url.rstrip('/')
+    headers = {"Authorization": f"Bearer {token or ''}"}
+    body = json.dumps(request).encode('utf-8')
+    with urlopen(Request(f"{base}/jobs", data=body, headers={**headers, "Content-Type": "application/json"})) as response:
+        job = json.load(response)
+    
+    while wait and job["status"] in ("queued", "running"):
+        poll = Request(f"{base}/jobs/{job['id']}?wait={poll_interval}", headers=headers)
+        with urlopen(poll, timeout=poll_interval + 30) as response:
+            job = json.load(response)
+    return job
+
+def run_remote_command(args):
+    """Send a search, metadata or download command to a --serve instance and print the job as JSON"""
+    if args.command == 'search':
+        request = {"type": "search", "query": args.query, "limit": args.limit, "page": max(1, args.page)}
+    elif args.command == 'metadata':
+        request = {"type": "metadata", "artist": args.artist, "title": args.title}
+    elif args.command == 'download':
+        # The server has its own working directory
+        output_dir = os.path.abspath(args.output_dir) if args.output_dir else None
+        request = {"type": "download", "input": args.url_or_id, "output_dir": output_dir, "result_set": args.results,
+                   "format": args.format, "quality": args.quality, "artist": args.artist, "title": args.title,
+                   "album": args.album, "year": args.year, "genre": args.genre, "track": args.track,
+                   "skip_metadata": args.skip_metadata}
+    else:
+        print(f"The {args.command} command cannot be sent to a server; run it without --server", file=sys.stderr)
+        return 2
+    
+    from urllib.error import HTTPError
+    
+    try:
+        job = submit_job(args.server, request, token=args.token or read_server_token())
+    except HTTPError as e:
+        try:
+            error = json.load(e).get("error")
+        except ValueError:
+            error = e.reason
+        print(f"The server at {args.server} refused the job: {error}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"Could not reach the server at {args.server}: {e}", file=sys.stderr)
+        return 1
+    
+    print(json.dumps(job, indent=2, default=str))
+    return 0 if job["status"] == "done" else 1
+
+def add_output_arguments(parser):
+    parser.add_argument('--format', choices=list(AUDIO_FORMATS),
+                        help='Output format; m4a and opus keep a matching source stream as is (default: [Output] format or mp3)')
+    parser.add_argument('--quality', help='Bitrate in kbps, or a VBR level from 0 (best) to 10 for mp3 and m4a '
+                                          '(default: [Output] quality or 192)')
+
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Music Library Extender - Download music from YouTube with proper metadata')
     parser.add_argument('--cli', action='store_true', help='Run in CLI mode instead of GUI')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the on-disk HTTP response cache')
+    parser.add_argument('--serve', action='store_true', help='Run a local job server for search, metadata and download jobs')
+    parser.add_argument('--port', type=int, help=f'Port for --serve (default: {JobServer.DEFAULT_PORT} or [Server] port)')
+    parser.add_argument('--server', nargs='?', const=f'http://{JobServer.DEFAULT_HOST}:{JobServer.DEFAULT_PORT}', metavar='URL',
+                        help='With --cli, send search, metadata and download commands to a running --serve instance')
+    parser.add_argument('--token', help=f'Token for --server (default: the one a local --serve wrote to {os.path.basename(JobServer.TOKEN_FILE)})')
     subparsers = parser.add_subparsers(dest='command', help='CLI commands')
 
     # Search command
     search_parser = subparsers.add_parser('search', help='Search for songs')
     search_parser.add_argument('query', help='Search query')
     search_parser.add_argument('--limit', type=int, default=10, help='Maximum number of results (default: 10)')
+    search_parser.add_argument('--page', type=int, default=1, help='Page of --limit results to show (default: 1)')
     search_parser.add_argument('--json', action='store_true', help='Output results as JSON')
 
     # Download command
     download_parser = subparsers.add_parser('download', help='Download a song')
     download_parser.add_argument('url_or_id', help='YouTube URL, video ID, or result number (1-based) from the last search')
+    download_parser.add_argument('--results', type=int, metavar='ID', help='Search result set a result number refers to (default: the last one shown)')
     download_parser.add_argument('--output-dir', '-o', help='Output directory (default: library location from settings)')
     download_parser.add_argument('--artist', help='Artist name (optional, will be auto-detected)')
     download_parser.add_argument('--title', help='Song title (optional, will be auto-detected)')
@@ -1940,6 +5540,25 @@ def parse_arguments():
     download_parser.add_argument('--genre', help='Genre (optional, will be auto-detected)')
     download_parser.add_argument('--track', help='Track number (optional, will be auto-detected)')
     download_parser.add_argument('--skip-metadata', action='store_true', help='Skip automatic metadata lookup')
+    add_output_arguments(download_parser)
+
+    # Batch download command
+    batch_parser = subparsers.add_parser('download-batch', help='Download many songs from a file or stdin')
+    batch_parser.add_argument('input', help="File with one URL, video ID or 'Artist - Title' per line ('-' for stdin)")
+    batch_parser.add_argument('--workers', '-w', type=int, default=4, help='Number of parallel downloads (default: 4)')
+    batch_parser.add_argument('--output-dir', '-o', help='Output directory (default: library location from settings)')
+    batch_parser.add_argument('--json', action='store_true', help='Output results as JSON')
+    batch_parser.add_argument('--redownload', action='store_true', help='Download tracks even if the library already has them')
+    add_output_arguments(batch_parser)
+
+    # Playlist download command
+    playlist_parser = subparsers.add_parser('download-playlist', help='Download every video of a playlist or channel')
+    playlist_parser.add_argument('url', help='YouTube playlist or channel URL')
+    playlist_parser.add_argument('--workers', '-w', type=int, default=4, help='Number of parallel downloads (default: 4)')
+    playlist_parser.add_argument('--output-dir', '-o', help='Output directory (default: library location from settings)')
+    playlist_parser.add_argument('--restart', action='store_true', help='Ignore progress from earlier runs of this playlist')
+    playlist_parser.add_argument('--redownload', action='store_true', help='Download tracks even if the library already has them')
+    add_output_arguments(playlist_parser)
 
     # Metadata command
     metadata_parser = subparsers.add_parser('metadata', help='Look up metadata without downloading')
@@ -1947,61 +5566,136 @@ def parse_arguments():
     metadata_parser.add_argument('title', help='Song title')
 
     # Library command
-    library_parser = subparsers.add_parser('library', help='Set library location')
-    library_parser.add_argument('path', help='Path to music library')
+    library_parser = subparsers.add_parser('library', help="Set library location, or 'library scan' to index it")
+    library_parser.add_argument('path', help="Path to music library, or 'scan' to index the current one (use ./scan for a folder named scan)")
+    library_parser.add_argument('--workers', '-w', type=int, help='Processes used to read tags when scanning (default: CPU count)')
+
+    # Retag command
+    retag_parser = subparsers.add_parser('retag', help='Fill in missing tags of existing audio files')
+    retag_parser.add_argument('target', help='Audio file, directory (searched recursively) or glob pattern')
+    retag_parser.add_argument('--fields', help=f"Comma-separated fields to fill (default: {','.join(CLIHandler.RETAG_DEFAULT_FIELDS)}; "
+                                               f"available: {','.join(CLIHandler.RETAG_FIELDS)})")
+    retag_parser.add_argument('--overwrite', action='store_true', help='Replace fields that already have a value')
+    retag_parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing anything')
+    retag_parser.add_argument('--workers', '-w', type=int, default=4, help='Number of files looked up in parallel (default: 4)')
+
+    # Dedup command
+    dedup_parser = subparsers.add_parser('dedup', help='Find tracks in the library that contain the same audio')
+    dedup_parser.add_argument('--workers', '-w', type=int, help='Parallel ffmpeg decoders for fingerprinting (default: CPU count)')
+    dedup_action = dedup_parser.add_mutually_exclusive_group()
+    dedup_action.add_argument('--hardlink', dest='action', action='store_const', const='hardlink',
+                              help='Replace extra copies with hard links to the copy that is kept')
+    dedup_action.add_argument('--delete', dest='action', action='store_const', const='delete',
+                              help='Delete extra copies')
+
+    # Download queue command
+    queue_parser = subparsers.add_parser('queue', help='Show, resume or clear interrupted downloads')
+    queue_parser.add_argument('action', choices=['status', 'resume', 'clear'], help='Queue action to perform')
+    queue_parser.add_argument('--workers', '-w', type=int, default=1, help='Number of parallel downloads when resuming (default: 1)')
+
+    # Lyrics stats command
+    subparsers.add_parser('lyrics-stats', help='Show lyrics provider latency and hit rate')
+
+    # Cache command
+    cache_parser = subparsers.add_parser('cache', help='Manage the HTTP response cache')
+    cache_parser.add_argument('action', choices=['clear', 'stats'], help='Cache action to perform')
 
     return parser.parse_args()
 
 if __name__ == "__main__":
+    # Lets the library scan's worker processes start in the frozen (PyInstaller) build
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
     args = parse_arguments()
     
-    if args.cli:
+    if args.serve:
+        cli_handler = CLIHandler(use_cache=not args.no_cache)
+        JobServer.from_config(cli_handler, port=args.port).serve_forever()
+    
+    elif args.cli and args.server:
+        # Thin client: nothing but the request is handled in this process
+        sys.exit(run_remote_command(args))
+    
+    elif args.cli:
         # CLI mode
-        cli_handler = CLIHandler()
+        cli_handler = CLIHandler(use_cache=not args.no_cache)
+        
+        if args.command in ('download', 'download-batch', 'download-playlist'):
+            try:
+                output = resolve_audio_output(args.format, args.quality)
+            except ValueError as e:
+                cli_handler.console.print(f"[red]{e}[/red]")
+                sys.exit(2)
         
         if args.command == 'search':
-            cli_handler.search_videos(args.query, limit=args.limit, json_output=args.json)
+            cli_handler.search_videos(args.query, limit=args.limit, json_output=args.json, page=max(1, args.page))
         
         elif args.command == 'download':
-            metadata = {}
-            if args.artist:
-                metadata['artist'] = args.artist
-            if args.title:
-                metadata['title'] = args.title
-            if args.album:
-                metadata['album'] = args.album
-            if args.year:
-                metadata['year'] = args.year
-            if args.genre:
-                metadata['genre'] = args.genre
-            if args.track:
-                metadata['track_number'] = args.track
-                
-            # If we have artist and title but not other metadata, and auto metadata is not disabled
-            if not args.skip_metadata and args.artist and args.title and not (args.album or args.year or args.genre):
-                console = Console()
-                console.print("[yellow]No complete metadata provided. Fetching from online sources...[/yellow]")
-                fetched_metadata = cli_handler.get_metadata(args.artist, args.title)
-                
-                # Update with fetched metadata but keep user-provided values
-                for key, value in fetched_metadata.items():
-                    if key not in ['artist', 'title'] and value and key not in metadata:
-                        metadata[key] = value
-            
-            cli_handler.download_song(args.url_or_id, metadata, args.output_dir)
+            metadata = cli_handler.download_metadata(args.artist, args.title, args.album, args.year, args.genre,
+                                                     args.track, skip_metadata=args.skip_metadata)
+            cli_handler.download_song(args.url_or_id, metadata, args.output_dir, result_set=args.results, output=output)
+        
+        elif args.command == 'download-batch':
+            results = cli_handler.download_batch(args.input, workers=args.workers, output_dir=args.output_dir,
+                                                 json_output=args.json, skip_existing=not args.redownload, output=output)
+            if not results or any(result["status"] != "ok" for result in results):
+                sys.exit(1)
+        
+        elif args.command == 'download-playlist':
+            counts = cli_handler.download_playlist(args.url, workers=args.workers, output_dir=args.output_dir,
+                                                   restart=args.restart, skip_existing=not args.redownload, output=output)
+            if counts["failed"]:
+                sys.exit(1)
         
         elif args.command == 'metadata':
             cli_handler.get_metadata(args.artist, args.title)
         
         elif args.command == 'library':
-            cli_handler.set_library_location(args.path)
+            if args.path == 'scan':
+                if not cli_handler.scan_library(workers=args.workers):
+                    sys.exit(1)
+            else:
+                cli_handler.set_library_location(args.path)
+        
+        elif args.command == 'retag':
+            fields = [field.strip() for field in args.fields.split(',') if field.strip()] if args.fields else None
+            results = cli_handler.retag(args.target, fields=fields, overwrite=args.overwrite,
+                                        dry_run=args.dry_run, workers=args.workers)
+            if not results or any(result["status"] == "failed" for result in results):
+                sys.exit(1)
+        
+        elif args.command == 'dedup':
+            if cli_handler.find_duplicates(workers=args.workers, action=args.action) is None:
+                sys.exit(1)
+        
+        elif args.command == 'queue':
+            if args.action == 'status':
+                cli_handler.show_download_queue()
+            elif args.action == 'resume':
+                results = cli_handler.resume_downloads(workers=args.workers)
+                if not all(results):
+                    sys.exit(1)
+            else:
+                removed = cli_handler.download_queue.clear_finished()
+                cli_handler.console.print(f"[green]Removed {removed} finished downloads from the queue[/green]")
+        
+        elif args.command == 'lyrics-stats':
+            cli_handler.show_lyrics_stats()
+        
+        elif args.command == 'cache':
+            if args.action == 'clear':
+                cli_handler.clear_cache()
+            else:
+                cli_handler.show_cache_stats()
         
         else:
-            console = Console()
+            console = cli_handler.console
             console.print("[red]Please specify a command. Use --help for options.[/red]")
             sys.exit(1)
     else:
         # GUI mode
+        _load_gui_modules()
         root = tk.Tk()
-        app = MusicLibraryExtender(root)
+        app = MusicLibraryExtender(root, use_cache=not args.no_cache)
         root.mainloop()
\ No newline at end of file
@@ -0,0 +1,58 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return app.DownloadQueue(str(tmp_path / "queue.sqlite"))
+
+
+def test_concurrent_jobs_get_distinct_paths(queue, tmp_path):
+    save_path = str(tmp_path / "A - B.mp3")
+    first = queue.add("https://youtu.be/aaaaaaaaaaa", str(tmp_path))
+    second = queue.add("https://youtu.be/bbbbbbbbbbb", str(tmp_path))
+
+    assert queue.claim_save_path(first, save_path, {}) == save_path
+    assert queue.claim_save_path(second, save_path, {}) == str(tmp_path / "A - B (2).mp3")
+
+
+def test_existing_file_is_kept_unless_replaceable(queue, tmp_path):
+    save_path = tmp_path / "A - B.mp3"
+    save_path.write_bytes(b"")
+    job_id = queue.add("https://youtu.be/aaaaaaaaaaa", str(tmp_path))
+
+    assert queue.claim_save_path(job_id, str(save_path), {}) == str(tmp_path / "A - B (2).mp3")
+    assert queue.claim_save_path(job_id, str(save_path), {}, replaceable=lambda path: True) == str(save_path)
+
+
+def test_finished_job_releases_its_path(queue, tmp_path):
+    save_path = str(tmp_path / "A - B.mp3")
+    first = queue.add("https://youtu.be/aaaaaaaaaaa", str(tmp_path))
+    second = queue.add("https://youtu.be/bbbbbbbbbbb", str(tmp_path))
+
+    queue.claim_save_path(first, save_path, {})
+    queue.fail(first, "gone")
+    assert queue.claim_save_path(second, save_path, {}) == save_path
+
+
+def test_requeued_job_takes_new_metadata_and_output(queue, tmp_path):
+    url = "https://youtu.be/aaaaaaaaaaa"
+    job_id = queue.add(url, str(tmp_path), {"artist": "A"})
+
+    assert queue.add(url, str(tmp_path), {"artist": "B"}, {"format": "opus", "quality": "160"}) == job_id
+    job = queue.claim(job_id)
+    assert job["metadata"] == {"artist": "B"}
+    assert job["output"] == {"format": "opus", "quality": "160"}
+
+
+def test_started_job_refuses_another_format(queue, tmp_path):
+    url = "https://youtu.be/aaaaaaaaaaa"
+    job_id = queue.add(url, str(tmp_path))
+    queue.claim(job_id)
+    queue.checkpoint(job_id, "converting")
+    queue.release(job_id)
+
+    assert queue.add(url, str(tmp_path), output=dict(app.DEFAULT_AUDIO_OUTPUT)) == job_id
+    with pytest.raises(ValueError):
+        queue.add(url, str(tmp_path), output={"format": "flac", "quality": "0"})
@@ -0,0 +1,70 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app
+
+
+class RedirectHandler(BaseHTTPRequestHandler):
+    """Answers like the Cover Art Archive: the art URL redirects to the image"""
+
+    def do_HEAD(self):
+        if self.path == '/image.jpg':
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+        else:
+            self.send_response(307)
+            self.send_header('Location', '/image.jpg')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RedirectHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def http_cache(tmp_path, monkeypatch):
+    cache = app.HTTPCache(str(tmp_path / "http_cache.sqlite"))
+    monkeypatch.setattr(app, '_http_cache', cache)
+    monkeypatch.setattr(app, '_http_cache_enabled', True)
+    return cache
+
+
+def test_head_reports_redirect_uncached(server, monkeypatch):
+    monkeypatch.setattr(app, '_http_cache_enabled', False)
+
+    assert app.cached_head(f"{server}/release/front-500", source='coverart').status_code == 307
+
+
+def test_head_redirect_is_cached(server, http_cache):
+    url = f"{server}/release/front-500"
+
+    assert app.cached_request('HEAD', url, 'coverart').status_code == 307
+    # The second lookup is served from the cache and still reports the redirect
+    response = app.cached_head(url, source='coverart')
+    assert isinstance(response, app.CachedResponse)
+    assert response.status_code == 307
+
+
+def test_head_follows_redirect_when_asked(server, monkeypatch):
+    monkeypatch.setattr(app, '_http_cache_enabled', False)
+
+    assert app.cached_head(f"{server}/release/front-500", allow_redirects=True).status_code == 200
+
+
+def test_coverart_head_reports_redirect(server, monkeypatch):
+    monkeypatch.setattr(app, '_http_cache_enabled', False)
+
+    response = app.MusicBrainzClient().coverart_head(f"{server}/release/front-500")
+    assert response.status_code == 307
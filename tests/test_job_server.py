@@ -0,0 +1,134 @@
+import json
+import threading
+from http.client import HTTPConnection
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def server():
+    job_server = app.JobServer(None, port=0, workers=1, token="secret")
+    httpd = job_server.make_http_server()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+    job_server.executor.shutdown(wait=False)
+
+
+def request(port, method, path, body=None, headers=None):
+    connection = HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    payload = json.loads(response.read() or b'null')
+    connection.close()
+    return response.status, payload
+
+
+AUTH = {"Authorization": "Bearer secret"}
+# An unknown job type is rejected by submit(), so a 400 means the request got past the checks
+BODY = json.dumps({"type": "nothing"})
+
+
+def test_health_needs_no_token(server):
+    assert request(server, "GET", "/health")[0] == 200
+
+
+def test_post_without_token_is_rejected(server):
+    assert request(server, "POST", "/jobs", BODY, {"Content-Type": "application/json"})[0] == 403
+    assert request(server, "POST", "/jobs", BODY, {"Content-Type": "application/json",
+                                                   "Authorization": "Bearer wrong"})[0] == 403
+
+
+def test_get_without_token_is_rejected(server):
+    assert request(server, "GET", "/jobs")[0] == 403
+
+
+def test_post_must_be_json(server):
+    # What a page can send cross-origin without a preflight
+    assert request(server, "POST", "/jobs", BODY, {**AUTH, "Content-Type": "text/plain"})[0] == 415
+
+
+def test_foreign_host_is_rejected(server):
+    # A DNS-rebound page reaches the server with its own name in the Host header
+    headers = {**AUTH, "Content-Type": "application/json", "Host": "attacker.example"}
+    assert request(server, "POST", "/jobs", BODY, headers)[0] == 403
+
+
+def test_authorized_json_post_is_accepted(server):
+    status, payload = request(server, "POST", "/jobs", BODY, {**AUTH, "Content-Type": "application/json"})
+    assert status == 400
+    assert "Job type" in payload["error"]
+    assert request(server, "GET", "/jobs", headers=AUTH) == (200, [])
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"type": "download", "input": "x", "cookiefile": "/etc/passwd"}, "Unknown parameter"),
+    ({"type": "search"}, "Missing parameter"),
+    ({"type": "search", "query": "x", "page": True}, "page must be"),
+    ({"type": "download", "input": "x", "format": "wav"}, "Unknown output format"),
+])
+def test_invalid_params_are_rejected(server, body, error):
+    status, payload = request(server, "POST", "/jobs", json.dumps(body), {**AUTH, "Content-Type": "application/json"})
+    assert status == 400
+    assert error in payload["error"]
+    assert request(server, "GET", "/jobs", headers=AUTH) == (200, [])
+
+
+def test_remote_download_forwards_tags(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["app.py", "--cli", "--server", "--token", "t", "download", "dQw4w9WgXcQ",
+                                     "--artist", "A", "--title", "B", "--album", "C", "--track", "3", "--skip-metadata"])
+    sent = {}
+
+    def fake_submit(server_url, request, token=None):
+        sent.update(request)
+        return {"status": "done"}
+
+    monkeypatch.setattr(app, "submit_job", fake_submit)
+    monkeypatch.setattr("builtins.print", lambda *args, **kwargs: None)
+
+    assert app.run_remote_command(app.parse_arguments()) == 0
+    assert {key: sent[key] for key in ("artist", "title", "album", "track", "skip_metadata")} == \
+        {"artist": "A", "title": "B", "album": "C", "track": "3", "skip_metadata": True}
+
+
+class StubCLI:
+    download_metadata = app.CLIHandler.download_metadata
+
+    def __init__(self):
+        self.calls = []
+
+    def download_song(self, url_or_id, metadata, output_dir, **kwargs):
+        self.calls.append((url_or_id, metadata))
+        return "/music/A - B.mp3"
+
+    def download_entry(self, line, output_dir=None, **kwargs):
+        self.calls.append((line, None))
+        return {"input": line, "status": "ok", "path": "/music/A - B.mp3", "error": None}
+
+
+def test_download_job_uses_given_tags():
+    cli = StubCLI()
+    job_server = app.JobServer(cli, workers=1)
+    try:
+        result = job_server._run_download("dQw4w9WgXcQ", artist="A", title="B", album="C", skip_metadata=True)
+    finally:
+        job_server.executor.shutdown(wait=False)
+
+    assert result["status"] == "ok"
+    assert cli.calls == [("dQw4w9WgXcQ", {"artist": "A", "title": "B", "album": "C"})]
+
+
+def test_download_job_without_tags_is_a_batch_entry():
+    cli = StubCLI()
+    job_server = app.JobServer(cli, workers=1)
+    try:
+        result = job_server._run_download("A - B", skip_metadata=True)
+    finally:
+        job_server.executor.shutdown(wait=False)
+
+    assert result["status"] == "ok"
+    assert cli.calls == [("A - B", None)]
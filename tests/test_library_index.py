@@ -0,0 +1,45 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def cli():
+    handler = app.CLIHandler(use_cache=False)
+    yield handler
+    for pool in handler.provider_pools.values():
+        pool.shutdown(wait=False)
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    calls = []
+    original = app.LibraryIndex.refresh
+
+    def counting_refresh(self, *args, **kwargs):
+        calls.append(self.library_path)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(app.LibraryIndex, "refresh", counting_refresh)
+    return calls
+
+
+def test_download_without_skip_does_not_create_an_index(cli, refreshes, tmp_path):
+    assert cli.get_library_index(str(tmp_path), scan=False) is None
+    assert not (tmp_path / app.LibraryIndex.INDEX_FILENAME).exists()
+    assert refreshes == []
+
+
+def test_existing_index_is_opened_without_a_scan(cli, refreshes, tmp_path):
+    app.LibraryIndex(str(tmp_path))
+
+    assert cli.get_library_index(str(tmp_path), scan=False) is not None
+    assert refreshes == []
+
+
+def test_first_skip_lookup_scans_once(cli, refreshes, tmp_path):
+    cli.get_library_index(str(tmp_path), scan=False)
+    cli.get_library_index(str(tmp_path))
+    cli.get_library_index(str(tmp_path))
+
+    assert refreshes == [str(tmp_path)]
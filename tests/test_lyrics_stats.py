@@ -0,0 +1,27 @@
+import json
+
+import app
+
+
+def test_stats_are_saved_in_batches(tmp_path):
+    stats_file = tmp_path / "lyrics_stats.json"
+    engine = app.LyricsEngine([], stats_file=str(stats_file))
+
+    for _ in range(engine.SAVE_EVERY - 1):
+        engine._record("genius", 0.5, True)
+    assert not stats_file.exists()
+
+    engine._record("genius", 0.5, False)
+    assert json.loads(stats_file.read_text())["genius"]["requests"] == engine.SAVE_EVERY
+
+
+def test_flush_writes_the_rest(tmp_path):
+    stats_file = tmp_path / "lyrics_stats.json"
+    engine = app.LyricsEngine([], stats_file=str(stats_file))
+    engine._record("genius", 0.5, True)
+    engine.flush()
+
+    assert json.loads(stats_file.read_text())["genius"]["hits"] == 1
+    assert app.LyricsEngine([], stats_file=str(stats_file)).stats == engine.stats
+    # Only the stats file is left behind, no temp files
+    assert [path.name for path in tmp_path.iterdir()] == ["lyrics_stats.json"]
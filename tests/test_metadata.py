@@ -0,0 +1,27 @@
+import threading
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def cli(monkeypatch):
+    monkeypatch.setattr(app.CLIHandler, "PROVIDER_DEADLINES", {"musicbrainz": 0.2, "itunes": 1, "lyrics": 1})
+    monkeypatch.setattr(app.CLIHandler, "PROVIDER_WORKERS", 2)
+    handler = app.CLIHandler(use_cache=False)
+    release = threading.Event()
+    handler._lookup_musicbrainz = lambda artist, title, priority=None: release.wait() and {}
+    handler._lookup_itunes = lambda artist, title: {"album": "From iTunes"}
+    handler._lookup_lyrics = lambda artist, title: {}
+    yield handler
+    release.set()
+    for pool in handler.provider_pools.values():
+        pool.shutdown(wait=False)
+
+
+def test_hung_provider_does_not_starve_the_others(cli):
+    # More lookups than MusicBrainz has threads, so its pool fills up with hung calls
+    for _ in range(app.CLIHandler.PROVIDER_WORKERS + 2):
+        metadata = cli.get_metadata("Artist", "Title", quiet=True)
+        assert metadata["album"] == "From iTunes"
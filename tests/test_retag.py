@@ -0,0 +1,47 @@
+import shutil
+import subprocess
+
+import pytest
+
+import app
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg to make audio files")
+
+ENCODERS = {"mp3": "libmp3lame", "m4a": "aac", "opus": "libopus", "flac": "flac"}
+
+
+@pytest.fixture(params=list(app.AUDIO_FORMATS))
+def audio_file(request, tmp_path):
+    path = tmp_path / f"Artist - Title.{request.param}"
+    subprocess.run(["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=duration=1",
+                    "-c:a", ENCODERS[request.param], str(path)], check=True)
+    app.write_audio_tags(str(path), {"artist": "Artist", "title": "Title", "genre": "Jazz"})
+    return str(path)
+
+
+@pytest.fixture
+def cli(monkeypatch):
+    handler = app.CLIHandler(use_cache=False)
+    monkeypatch.setattr(handler, "get_metadata", lambda artist, title, **kwargs: {
+        "artist": artist, "title": title, "album": "Album", "year": "2001", "genre": "Rock", "track_number": "3",
+        "lyrics": "La la la", "artwork_url": None,
+    })
+    yield handler
+    for pool in handler.provider_pools.values():
+        pool.shutdown(wait=False)
+
+
+def test_retag_fills_missing_tags_and_keeps_the_rest(cli, audio_file):
+    result = cli._retag_file(audio_file, ["album", "year", "genre", "track", "lyrics"])
+
+    assert result["status"] == "ok"
+    assert set(result["changes"]) == {"album", "year", "track", "lyrics"}
+    tags = app.read_audio_tags(audio_file)
+    assert {key: tags.get(key) for key in ("artist", "title", "album", "year", "genre", "track_number", "lyrics")} == {
+        "artist": "Artist", "title": "Title", "album": "Album", "year": "2001", "genre": "Jazz",
+        "track_number": "3", "lyrics": "La la la",
+    }
+
+
+def test_retag_collects_every_audio_format(cli, audio_file, tmp_path):
+    assert cli._collect_retag_files(str(tmp_path)) == [audio_file]
@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only loaded by the commands and the GUI that use them
+HEAVY_MODULES = ("tkinter", "yt_dlp", "requests", "PIL", "musicbrainzngs", "mutagen", "rich")
+# Loose enough for slow CI machines; importing everything eagerly took about ten times longer
+IMPORT_BUDGET = 1.5
+
+SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import app
+sys.argv = ["app.py", "--cli", "cache", "stats"]
+app.parse_arguments()
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def test_import_stays_lazy():
+    result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=REPO, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["loaded"] == []
+    assert report["elapsed"] < IMPORT_BUDGET